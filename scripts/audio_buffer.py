@@ -0,0 +1,297 @@
+import os
+import threading
+import wave
+
+import numpy as np
+
+
+class AudioBuffer:
+    """
+    Buffer de captura int16 preasignado y ampliable
+    
+    Sustituye a la lista de chunks en bytes: cada chunk se copia directamente a
+    su hueco del array, sin crear un objeto por chunk ni tener que unirlos al
+    final. Cuando se llena, la capacidad se duplica.
+    
+    Un único hilo escribe (el de grabación); los lectores obtienen vistas sin
+    copia con view(). Las vistas siguen siendo válidas aunque el buffer crezca
+    después, porque apuntan al array anterior, que ya contenía esas muestras.
+    """
+    
+    def __init__(self, sample_rate=16000, initial_seconds=60):
+        self.sample_rate = sample_rate
+        self._data = np.empty(max(1, int(sample_rate * initial_seconds)), dtype=np.int16)
+        self._length = 0
+    
+    def __len__(self):
+        return self._length
+    
+    @property
+    def capacity(self):
+        return len(self._data)
+    
+    @property
+    def nbytes(self):
+        """Memoria reservada por el buffer"""
+        return self._data.nbytes
+    
+    def duration(self):
+        return self._length / self.sample_rate
+    
+    def append(self, samples):
+        """Añadir muestras int16 (array o bytes PCM)"""
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        n = len(samples)
+        if n == 0:
+            return
+        
+        end = self._length + n
+        if end > len(self._data):
+            new_capacity = max(end, 2 * len(self._data))
+            grown = np.empty(new_capacity, dtype=np.int16)
+            grown[:self._length] = self._data[:self._length]
+            self._data = grown
+        
+        self._data[self._length:end] = samples
+        # Publicar la nueva longitud solo cuando las muestras ya están escritas
+        self._length = end
+    
+    def view(self, start=0, end=None):
+        """Vista int16 (sin copia) de las muestras [start, end)"""
+        length = self._length  # Leer la longitud antes que el array
+        data = self._data
+        if end is None or end > length:
+            end = length
+        return data[start:end]
+    
+    def to_float32(self, start=0, end=None):
+        """Copia float32 normalizada a [-1, 1), el formato que espera Whisper"""
+        audio = self.view(start, end).astype(np.float32)
+        audio *= 1.0 / 32768.0  # En el sitio, sin un segundo array temporal
+        return audio
+    
+    def iter_blocks(self):
+        """Recorrer el audio por trozos (aquí un único trozo sin copia)"""
+        return iter([self.view()])
+    
+    def finalize(self):
+        """Nada que volcar: todo el audio está en memoria"""
+
+
+class SegmentedAudioBuffer:
+    """
+    Buffer de captura de memoria acotada para grabaciones de varias horas
+    
+    Solo el segmento en curso (de tamaño fijo) vive en RAM. Cada vez que se
+    llena se vuelca a disco como un WAV independiente y se empieza otro, así
+    que la memoria no depende de la duración de la sesión. Las lecturas de
+    segmentos ya volcados se hacen con np.memmap, sin cargar el archivo.
+    
+    Ofrece la misma interfaz que AudioBuffer (append, view, to_float32...).
+    """
+    
+    def __init__(self, directory, sample_rate=16000, segment_seconds=300):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.segment_samples = max(1, int(sample_rate * segment_seconds))
+        os.makedirs(directory, exist_ok=True)
+        
+        self._segments = []  # Rutas de los segmentos ya volcados (todos completos)
+        self._current = np.empty(self.segment_samples, dtype=np.int16)
+        self._current_length = 0
+        self._length = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return self._length
+    
+    @property
+    def nbytes(self):
+        """Memoria reservada en RAM (solo el segmento en curso)"""
+        return self._current.nbytes
+    
+    @property
+    def segment_paths(self):
+        return list(self._segments)
+    
+    def duration(self):
+        return self._length / self.sample_rate
+    
+    def append(self, samples):
+        """Añadir muestras int16 (array o bytes PCM), volcando segmentos llenos"""
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        
+        while len(samples):
+            take = min(len(samples), self.segment_samples - self._current_length)
+            end = self._current_length + take
+            self._current[self._current_length:end] = samples[:take]
+            self._current_length = end
+            self._length += take
+            samples = samples[take:]
+            
+            if self._current_length == self.segment_samples:
+                self._flush_segment()
+    
+    def _flush_segment(self):
+        """Escribir el segmento en curso a disco y empezar uno nuevo"""
+        if self._current_length == 0:
+            return
+        
+        path = os.path.join(self.directory, f"segmento_{len(self._segments):05d}.wav")
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(self._current[:self._current_length])
+        
+        # Array nuevo (no reutilizado) para no corromper vistas que aún lo usen
+        with self._lock:
+            self._segments.append(path)
+            self._current = np.empty(self.segment_samples, dtype=np.int16)
+            self._current_length = 0
+    
+    def finalize(self):
+        """Volcar el último segmento parcial (al terminar la grabación)"""
+        self._flush_segment()
+    
+    @staticmethod
+    def _map_segment(path):
+        """Abrir un segmento WAV con memmap, saltando la cabecera"""
+        with wave.open(path, "rb") as wf:
+            n_frames = wf.getnframes()
+        offset = os.path.getsize(path) - n_frames * 2
+        if n_frames == 0:
+            return np.zeros(0, dtype=np.int16)
+        return np.memmap(path, dtype=np.int16, mode="r", offset=offset, shape=(n_frames,))
+    
+    def _blocks(self, start, end):
+        """Trozos (vistas sin copia) que cubren las muestras [start, end)"""
+        with self._lock:
+            segments = list(self._segments)
+            current = self._current
+            current_length = self._current_length
+        
+        blocks = []
+        for i in range(start // self.segment_samples, len(segments) + 1):
+            block_start = i * self.segment_samples
+            if block_start >= end:
+                break
+            if i < len(segments):
+                data = self._map_segment(segments[i])
+            else:
+                data = current[:current_length]
+            blocks.append(data[max(0, start - block_start):end - block_start])
+        return blocks
+    
+    def view(self, start=0, end=None):
+        """Muestras int16 [start, end): sin copia dentro de un segmento, copia si cruza varios"""
+        length = self._length
+        if end is None or end > length:
+            end = length
+        if start >= end:
+            return np.zeros(0, dtype=np.int16)
+        
+        blocks = self._blocks(start, end)
+        return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+    
+    def to_float32(self, start=0, end=None):
+        """Copia float32 normalizada a [-1, 1) de las muestras [start, end)"""
+        audio = np.asarray(self.view(start, end), dtype=np.float32)
+        audio *= 1.0 / 32768.0
+        return audio
+    
+    def iter_blocks(self):
+        """Recorrer todo el audio segmento a segmento, sin cargarlo entero"""
+        return iter(self._blocks(0, self._length))
+    
+    def remove(self):
+        """Borrar los segmentos del disco"""
+        for path in self._segments:
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.isdir(self.directory) and not os.listdir(self.directory):
+            os.rmdir(self.directory)
+
+
+class AudioRing:
+    """
+    Anillo int16 de capacidad fija con un escritor y un lector
+    
+    Las posiciones son absolutas (muestras escritas desde el principio). El
+    escritor copia las muestras y solo después publica la nueva posición, y
+    nunca espera al lector: si el lector se retrasa más que la capacidad, las
+    muestras más antiguas se pisan y read_from() las cuenta como perdidas en
+    lugar de devolver audio corrupto.
+    
+    `header` (int64) y `data` (int16) pueden vivir en cualquier buffer, por
+    ejemplo memoria compartida entre procesos (ver capture_process.py).
+    """
+    
+    _WRITE, _READ, _FAILED = range(3)
+    HEADER_SLOTS = 8
+    
+    def __init__(self, capacity, header=None, data=None):
+        self.capacity = int(capacity)
+        if header is None:
+            header = np.zeros(self.HEADER_SLOTS, dtype=np.int64)
+        if data is None:
+            data = np.zeros(self.capacity, dtype=np.int16)
+        self._header = header
+        self._data = data
+    
+    def write_position(self):
+        return int(self._header[self._WRITE])
+    
+    def fill(self):
+        """Muestras escritas que el lector aún no ha recogido"""
+        return int(self._header[self._WRITE] - self._header[self._READ])
+    
+    def failed(self):
+        return bool(self._header[self._FAILED])
+    
+    def set_failed(self, failed=True):
+        self._header[self._FAILED] = int(failed)
+    
+    def write(self, samples):
+        """Escribir muestras int16 (lado del productor)"""
+        n = len(samples)
+        if n == 0:
+            return
+        position = int(self._header[self._WRITE])
+        if n > self.capacity:
+            # Solo cabe el final; el resto cuenta como perdido al leer
+            samples = samples[n - self.capacity:]
+        start = (position + n - len(samples)) % self.capacity
+        first = min(len(samples), self.capacity - start)
+        self._data[start:start + first] = samples[:first]
+        self._data[:len(samples) - first] = samples[first:]
+        # Publicar la posición solo cuando las muestras ya están escritas
+        self._header[self._WRITE] = position + n
+    
+    def read_from(self, position):
+        """
+        Copiar lo escrito desde `position` (lado del lector)
+        
+        Devuelve (muestras, nueva posición, muestras perdidas). Se pierden las
+        que el escritor ya había pisado antes o durante la copia.
+        """
+        end = int(self._header[self._WRITE])
+        lost = max(0, end - position - self.capacity)
+        start = position + lost
+        
+        n = end - start
+        offset = start % self.capacity
+        first = min(n, self.capacity - offset)
+        samples = np.empty(n, dtype=np.int16)
+        samples[:first] = self._data[offset:offset + first]
+        samples[first:] = self._data[:n - first]
+        
+        # El escritor pudo pisar el principio de la copia mientras se hacía
+        overwritten = min(n, int(self._header[self._WRITE]) - self.capacity - start)
+        if overwritten > 0:
+            samples = samples[overwritten:]
+            lost += overwritten
+        self._header[self._READ] = end
+        return samples, end, lost
@@ -0,0 +1,194 @@
+import numpy as np
+from math import gcd
+
+
+def design_lowpass(up, down, half_len_factor=10, beta=5.0):
+    """
+    Diseñar el filtro paso bajo (sinc con ventana Kaiser) para remuestrear up/down
+    """
+    max_rate = max(up, down)
+    cutoff = 1.0 / max_rate  # Frecuencia de corte normalizada a la tasa sobremuestreada
+    half_len = half_len_factor * max_rate
+    n = np.arange(-half_len, half_len + 1)
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), beta)
+    return (h * up).astype(np.float32)
+
+
+class PolyphaseResampler:
+    """
+    Remuestreador polifásico en streaming (equivalente a resample_poly de SciPy)
+    
+    Procesa el audio chunk a chunk conservando el historial entre llamadas, de modo
+    que la salida concatenada es idéntica a remuestrear toda la señal de una vez.
+    Todas las muestras de salida de un chunk se calculan en una única operación
+    vectorizada de NumPy.
+    """
+    
+    def __init__(self, in_rate, out_rate):
+        g = gcd(int(in_rate), int(out_rate))
+        self.in_rate = int(in_rate)
+        self.out_rate = int(out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+        
+        # Descomponer el filtro en `up` fases de `taps` coeficientes cada una
+        h = design_lowpass(self.up, self.down)
+        # Retardo del filtro (en la tasa sobremuestreada), para alinear la salida con la entrada
+        self._delay = (len(h) - 1) // 2
+        self.taps = -(-len(h) // self.up)  # ceil
+        h = np.concatenate([h, np.zeros(self.taps * self.up - len(h), dtype=np.float32)])
+        self.phases = h.reshape(self.taps, self.up).T.copy()  # (up, taps)
+        self.reset()
+    
+    def reset(self):
+        """Olvidar el historial (nueva grabación)"""
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._consumed = 0  # Muestras de entrada recibidas
+        self._next_out = 0  # Índice de la siguiente muestra de salida
+    
+    def process(self, samples):
+        """Remuestrear un bloque de muestras float32 y devolver las nuevas muestras de salida"""
+        samples = np.asarray(samples, dtype=np.float32)
+        if self.up == self.down:
+            return samples
+        
+        buf = np.concatenate([self._history, samples])
+        buf_start = self._consumed - len(self._history)  # Índice absoluto de buf[0]
+        self._consumed += len(samples)
+        
+        # Salidas cuyo índice de entrada más reciente ya está disponible
+        t_start = self._next_out * self.down + self._delay
+        last_t = self._consumed * self.up - 1
+        if last_t < t_start:
+            self._history = buf[-(self.taps - 1):] if self.taps > 1 else buf[:0]
+            return np.zeros(0, dtype=np.float32)
+        n_out = (last_t - t_start) // self.down + 1
+        
+        t = t_start + np.arange(n_out, dtype=np.int64) * self.down
+        phase = t % self.up
+        base = t // self.up - buf_start
+        idx = base[:, None] - np.arange(self.taps)[None, :]
+        
+        # Al principio de la señal faltan muestras anteriores: equivalen a ceros
+        valid = idx >= 0
+        gathered = np.where(valid, buf[np.clip(idx, 0, None)], 0.0)
+        out = np.einsum("ij,ij->i", gathered, self.phases[phase])
+        
+        self._next_out += n_out
+        self._history = buf[-(self.taps - 1):] if self.taps > 1 else buf[:0]
+        return out.astype(np.float32)
+    
+    def process_int16(self, samples):
+        """Remuestrear muestras int16 (array o bytes PCM) y devolver un array int16"""
+        if isinstance(samples, (bytes, bytearray)):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        out = self.process(samples.astype(np.float32))
+        return np.clip(np.round(out), -32768, 32767).astype(np.int16)
+
+
+def chunk_rms(samples):
+    """RMS normalizado (0-1) de un bloque int16 o float, sin desbordamiento"""
+    samples = np.asarray(samples)
+    if len(samples) == 0:
+        return 0.0
+    # einsum acumula en float64 sin materializar el cuadrado (int16**2 se desborda)
+    energy = np.einsum("i,i->", samples, samples, dtype=np.float64)
+    rms = np.sqrt(energy / len(samples))
+    if samples.dtype == np.int16:
+        rms /= 32768.0
+    return float(rms)
+
+
+def frame_rms(audio, frame_len):
+    """RMS de cada trama de `frame_len` muestras de todo el buffer en una sola pasada"""
+    n_frames = -(-len(audio) // frame_len)  # ceil
+    padded = np.zeros(n_frames * frame_len, dtype=np.float32)
+    padded[:len(audio)] = audio
+    frames = padded.reshape(n_frames, frame_len)
+    return np.sqrt(np.einsum("ij,ij->i", frames, frames) / frame_len)
+
+
+def _runs(mask):
+    """Devolver (inicio, fin) de cada tramo consecutivo a True de una máscara"""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def detect_speech_regions(audio, sample_rate, threshold=0.01, frame_ms=30,
+                          hangover_ms=300, min_speech_ms=90):
+    """
+    Detectar regiones de voz por energía (VAD)
+    
+    Devuelve una lista de (inicio, fin) en muestras. Cada región se amplía
+    `hangover_ms` por ambos lados para no recortar el principio ni el final
+    de las palabras, y se descartan ráfagas de energía más cortas que
+    `min_speech_ms` (clics, golpes).
+    """
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    if len(audio) == 0:
+        return []
+    
+    voiced = frame_rms(audio, frame_len) >= threshold
+    
+    # Descartar tramos de voz demasiado cortos
+    min_frames = max(1, int(round(min_speech_ms / frame_ms)))
+    starts, ends = _runs(voiced)
+    for start, end in zip(starts, ends):
+        if end - start < min_frames:
+            voiced[start:end] = False
+    
+    # Ventana de "hangover": dilatar la máscara por ambos lados
+    hang = int(round(hangover_ms / frame_ms))
+    if hang > 0 and voiced.any():
+        voiced = np.convolve(voiced.astype(np.int8), np.ones(2 * hang + 1, dtype=np.int8), mode="same") > 0
+    
+    starts, ends = _runs(voiced)
+    return [
+        (int(start * frame_len), int(min(end * frame_len, len(audio))))
+        for start, end in zip(starts, ends)
+    ]
+
+
+def extract_speech(audio, regions, sample_rate, gap_ms=100):
+    """
+    Concatenar solo las regiones de voz, separadas por un breve silencio
+    
+    Devuelve el audio recortado y un mapa de tiempos: lista de tuplas
+    (inicio_en_recorte, inicio_en_original, duración), todo en segundos.
+    """
+    gap = np.zeros(int(sample_rate * gap_ms / 1000), dtype=audio.dtype)
+    pieces = []
+    time_map = []
+    position = 0
+    for start, end in regions:
+        if pieces:
+            pieces.append(gap)
+            position += len(gap)
+        pieces.append(audio[start:end])
+        time_map.append((position / sample_rate, start / sample_rate, (end - start) / sample_rate))
+        position += end - start
+    
+    if not pieces:
+        return np.zeros(0, dtype=audio.dtype), []
+    return np.concatenate(pieces), time_map
+
+
+def map_time(t, time_map):
+    """Convertir un instante del audio recortado al instante del audio original"""
+    if not time_map:
+        return t
+    for trimmed_start, original_start, duration in reversed(time_map):
+        if t >= trimmed_start:
+            return original_start + min(t - trimmed_start, duration)
+    return time_map[0][1]
+
+
+def remap_result(result, time_map):
+    """Llevar los tiempos de segmentos y palabras de Whisper al audio original"""
+    for segment in result.get("segments", []):
+        segment["start"] = map_time(segment["start"], time_map)
+        segment["end"] = map_time(segment["end"], time_map)
+        for word in segment.get("words", []) or []:
+            word["start"] = map_time(word["start"], time_map)
+            word["end"] = map_time(word["end"], time_map)
+    return result
@@ -0,0 +1,162 @@
+import collections
+import os
+import struct
+import subprocess
+import threading
+
+import numpy as np
+
+WHISPER_RATE = 16000
+RAW_EXTENSIONS = (".raw", ".pcm")  # PCM crudo s16le mono a 16 kHz
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class MappedAudio:
+    """
+    Audio PCM de 16 bits a 16 kHz leído directamente del archivo con np.memmap
+    
+    No se carga nada por adelantado: read(inicio, fin) convierte a float32 solo
+    el tramo pedido (mezclando los canales si hay varios) y el sistema trae del
+    disco únicamente esas páginas. Tiene la misma forma que el `read` que
+    espera long_audio.transcribe_long.
+    """
+    
+    def __init__(self, path, offset=0, n_frames=0, channels=1, sample_rate=WHISPER_RATE):
+        self.path = path
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self._data = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(n_frames, channels))
+    
+    def __len__(self):
+        return self._data.shape[0]
+    
+    def duration(self):
+        return len(self) / self.sample_rate
+    
+    def read(self, start=0, end=None):
+        """Muestras float32 normalizadas a [-1, 1) de las tramas [start, end)"""
+        block = self._data[start:end]
+        if self.channels == 1:
+            audio = block[:, 0].astype(np.float32)
+        else:
+            audio = block.mean(axis=1, dtype=np.float32)
+        audio *= 1.0 / 32768.0
+        return audio
+
+
+def _wav_layout(path):
+    """
+    (canales, tasa, bits, posición y tamaño de los datos) de un WAV PCM, o None
+    
+    Recorre los bloques RIFF en lugar de suponer que los datos van al final,
+    así admite bloques LIST tras los datos y WAV_FORMAT_EXTENSIBLE.
+    """
+    fmt = None
+    with open(path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+            if chunk_id == b"fmt ":
+                body = f.read(size + (size & 1))
+                if len(body) < 16:
+                    return None
+                audio_format, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if audio_format == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    audio_format = struct.unpack("<H", body[24:26])[0]  # Primeros bytes del subformato
+                if audio_format != _WAVE_FORMAT_PCM:
+                    return None
+                fmt = (channels, rate, bits)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    return None
+                offset = f.tell()
+                # Algunas grabadoras dejan el tamaño sin rellenar: manda el del archivo
+                size = min(size, os.path.getsize(path) - offset)
+                return fmt + (offset, size)
+            else:
+                f.seek(size + (size & 1), os.SEEK_CUR)  # Los bloques van alineados a 2 bytes
+
+
+def open_mapped_audio(path):
+    """
+    MappedAudio para WAV PCM de 16 bits a 16 kHz o PCM crudo (.raw/.pcm), o None
+    
+    El resto de formatos (y los WAV a otra tasa) necesitan ffmpeg: ver ffmpeg_blocks.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in RAW_EXTENSIONS:
+        n_frames = os.path.getsize(path) // 2
+        return MappedAudio(path, 0, n_frames) if n_frames else None
+    if extension != ".wav":
+        return None
+    
+    layout = _wav_layout(path)
+    if layout is None:
+        return None
+    channels, rate, bits, offset, size = layout
+    if rate != WHISPER_RATE or bits != 16 or channels < 1:
+        return None
+    n_frames = size // (2 * channels)
+    return MappedAudio(path, offset, n_frames, channels) if n_frames else None
+
+
+def ffmpeg_blocks(path, block_seconds=30, sample_rate=WHISPER_RATE):
+    """
+    Bloques float32 mono a `sample_rate` decodificados por un ffmpeg en streaming
+    
+    Cada bloque sale en cuanto ffmpeg lo ha decodificado: nunca hay más de un
+    bloque en memoria. Si se deja de iterar antes del final, ffmpeg se termina.
+    Un hilo vacía stderr mientras tanto (guardando solo las últimas líneas):
+    con un archivo dañado ffmpeg puede escribir más errores de los que caben
+    en la tubería y, sin leerlos, se quedaría bloqueado igual que nosotros.
+    """
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", path,
+           "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg no encontrado: hace falta para leer este formato por bloques") from None
+    
+    errors = collections.deque(maxlen=20)
+    drain = threading.Thread(target=lambda: errors.extend(proc.stderr), daemon=True)
+    drain.start()
+    
+    block_bytes = max(2, int(block_seconds * sample_rate) * 2)
+    complete = False
+    try:
+        while True:
+            data = proc.stdout.read(block_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % 2
+            audio = np.frombuffer(data[:usable], dtype=np.int16).astype(np.float32)
+            audio *= 1.0 / 32768.0
+            yield audio
+        complete = True
+    finally:
+        proc.stdout.close()
+        if not complete:
+            proc.kill()
+        returncode = proc.wait()
+        drain.join()
+        proc.stderr.close()
+    if returncode != 0:
+        error = b"".join(errors).decode(errors="replace").strip()
+        raise RuntimeError(f"ffmpeg no pudo decodificar {path}: {error}")
+
+
+def probe_duration(path):
+    """Duración en segundos según ffprobe (sin decodificar), o None si no se puede saber"""
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        return float(proc.stdout.strip())
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
@@ -0,0 +1,186 @@
+import queue
+import threading
+import time
+
+WHISPER_RATE = 16000
+MAX_BATCH_SECONDS = 30  # Una ventana del codificador de Whisper: lo que cabe en un lote
+
+
+class QueueFull(Exception):
+    """La cola de peticiones está llena"""
+
+
+class Job:
+    """Petición en la cola del planificador, con su resultado y su latencia"""
+    
+    def __init__(self, payload, label=""):
+        self.payload = payload
+        self.label = label
+        self.submitted = time.perf_counter()
+        self.result = None
+        self.error = None
+        self.latency = {}
+        self._done = threading.Event()
+    
+    def finish(self, result=None, error=None):
+        self.result = result
+        self.error = error
+        self._done.set()
+    
+    def wait(self, timeout=None):
+        """Esperar el resultado (lanza la excepción si el procesado falló)"""
+        if not self._done.wait(timeout):
+            raise TimeoutError("La transcripción no terminó a tiempo")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class BatchScheduler:
+    """
+    Planificador que agrupa peticiones de varias fuentes en lotes
+    
+    Un único hilo toma la primera petición pendiente y espera como mucho
+    `max_wait_ms` a que lleguen más, hasta `max_batch`; después llama a
+    `process_batch(payloads)` una sola vez con todo el lote. Con max_batch=1 se
+    procesa cada petición en cuanto llega, como una cola normal.
+    
+    process_batch devuelve un resultado por petición (una excepción en su
+    posición marca solo esa petición como fallida). Si lanza, falla el lote.
+    La cola es acotada: con ella llena, submit() rechaza (QueueFull) o espera.
+    """
+    
+    def __init__(self, process_batch, max_batch=1, max_wait_ms=0.0, max_queue=8, on_batch=None):
+        self.process_batch = process_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.on_batch = on_batch  # on_batch(jobs, segundos) tras cada lote, aún con su payload
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._busy = 0
+        self._closing = False
+        self._thread = threading.Thread(target=self._loop, name="planificador", daemon=True)
+        self._thread.start()
+    
+    @property
+    def max_queue(self):
+        return self._queue.maxsize
+    
+    def queue_depth(self):
+        return self._queue.qsize()
+    
+    def pending(self):
+        """Peticiones en cola más las del lote en curso"""
+        return self._queue.qsize() + self._busy
+    
+    def submit(self, payload, label="", block=False, timeout=None):
+        job = Job(payload, label)
+        try:
+            self._queue.put(job, block=block, timeout=timeout)
+        except queue.Full:
+            raise QueueFull(f"Cola llena ({self._queue.maxsize} peticiones)") from None
+        return job
+    
+    def _collect(self, first):
+        """Completar el lote con lo que llegue antes del plazo"""
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._closing = True  # Cerrar después de este lote
+                break
+            batch.append(job)
+        return batch
+    
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            self._busy = len(batch)
+            started = time.perf_counter()
+            try:
+                results = self.process_batch([job.payload for job in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            finished = time.perf_counter()
+            self._busy = 0
+            
+            for job, result in zip(batch, results):
+                job.latency = {
+                    "cola": round(started - job.submitted, 4),
+                    "decodificar": round(finished - started, 4),
+                    "total": round(finished - job.submitted, 4),
+                    "lote": len(batch)
+                }
+                if isinstance(result, Exception):
+                    job.finish(error=result)
+                else:
+                    job.finish(result)
+            if self.on_batch is not None:
+                self.on_batch(batch, finished - started)
+            for job in batch:
+                job.payload = None  # Liberar el audio en cuanto ya no hace falta
+            if self._closing:
+                return
+    
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _result_from_decoding(decoding, duration):
+    """Resultado con la forma del de model.transcribe a partir de un DecodingResult"""
+    # Mismo criterio que transcribe() para descartar ventanas sin voz
+    if decoding.no_speech_prob > 0.6 and decoding.avg_logprob < -1.0:
+        text = ""
+    else:
+        text = decoding.text
+    segments = []
+    if text.strip():
+        segments.append({
+            "id": 0,
+            "start": 0.0,
+            "end": round(duration, 3),
+            "text": text,
+            "tokens": list(decoding.tokens),
+            "temperature": decoding.temperature,
+            "avg_logprob": decoding.avg_logprob,
+            "compression_ratio": decoding.compression_ratio,
+            "no_speech_prob": decoding.no_speech_prob
+        })
+    return {"text": text, "segments": segments, "language": decoding.language}
+
+
+def decode_batch(model, audios, language=None):
+    """
+    Decodificar varios clips cortos (≤ 30 s, float32 a 16 kHz) en una sola pasada
+    
+    Los espectrogramas se apilan en un tensor (lote, n_mels, 3000) y el
+    codificador y el decodificador de Whisper corren una vez para todo el lote.
+    Cada clip devuelve un único segmento, sin marcas de tiempo por palabra ni
+    reintentos con temperatura: está pensado para enunciados cortos.
+    """
+    import torch
+    import whisper
+    
+    mels = [
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels)
+        for audio in audios
+    ]
+    mel = torch.stack(mels).to(model.device)
+    options = whisper.DecodingOptions(language=language, without_timestamps=True, fp16=False)
+    decodings = whisper.decode(model, mel, options)
+    return [
+        _result_from_decoding(decoding, len(audio) / WHISPER_RATE)
+        for decoding, audio in zip(decodings, audios)
+    ]
+
+
+def is_batchable(audio):
+    return len(audio) <= MAX_BATCH_SECONDS * WHISPER_RATE and len(audio) > 0
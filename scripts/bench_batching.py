@@ -0,0 +1,91 @@
+import argparse
+import sys
+import threading
+import time
+
+import numpy as np
+
+from load_test import load_pcm16, percentile
+from model_registry import ModelRegistry
+from server import WHISPER_RATE, TranscriptionService
+
+
+def cut_utterances(pcm, seconds, count):
+    """`count` enunciados de `seconds` segundos tomados del audio (en bucle si es corto)"""
+    length = int(seconds * WHISPER_RATE)
+    audio = pcm.astype(np.float32) / 32768.0
+    if len(audio) < length:
+        audio = np.tile(audio, length // max(len(audio), 1) + 1)
+    starts = np.linspace(0, len(audio) - length, num=count).astype(int)
+    return [audio[s:s + length] for s in starts]
+
+
+def run_level(registry, args, utterances, max_batch):
+    """Decodificar todos los enunciados desde `fuentes` clientes con lotes de hasta `max_batch`"""
+    service = TranscriptionService(args.modelo, args.idioma, max_queue=max(args.fuentes, max_batch) * 2,
+                                   max_batch=max_batch, max_wait_ms=args.espera_ms)
+    service.model_registry = registry  # El modelo ya está cargado: solo se mide la decodificación
+    service.start()
+    
+    latencies = []
+    batch_sizes = []
+    lock = threading.Lock()
+    shares = [utterances[i::args.fuentes] for i in range(args.fuentes)]
+    
+    def _source(share):
+        # Cada fuente espera su resultado antes de enviar el siguiente enunciado
+        for audio in share:
+            job = service.submit(audio, block=True)
+            job.wait()
+            with lock:
+                latencies.append(job.latency["total"])
+                batch_sizes.append(job.latency["lote"])
+    
+    started = time.perf_counter()
+    threads = [threading.Thread(target=_source, args=(share,)) for share in shares]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    service.close()
+    
+    audio_seconds = sum(len(a) for a in utterances) / WHISPER_RATE
+    return {
+        "lote": max_batch,
+        "lote_medio": float(np.mean(batch_sizes)),
+        "enunciados_s": len(utterances) / wall,
+        "audio_s": audio_seconds / wall,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95)
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Rendimiento y latencia según el tamaño de lote")
+    parser.add_argument("archivo", help="Audio del que se recortan los enunciados")
+    parser.add_argument("-m", "--modelo", default="base")
+    parser.add_argument("-l", "--idioma", default="es")
+    parser.add_argument("-f", "--fuentes", type=int, default=8, help="Fuentes concurrentes")
+    parser.add_argument("-n", "--enunciados", type=int, default=64, help="Enunciados en total")
+    parser.add_argument("-s", "--segundos", type=float, default=3.0, help="Duración de cada enunciado")
+    parser.add_argument("--lotes", default="1,2,4,8,16", help="Tamaños de lote a probar")
+    parser.add_argument("--espera-ms", type=float, default=10.0, help="Espera máxima para completar un lote")
+    args = parser.parse_args(argv)
+    
+    utterances = cut_utterances(load_pcm16(args.archivo), args.segundos, args.enunciados)
+    registry = ModelRegistry()
+    print(f"🚀 Cargando modelo {args.modelo}...")
+    registry.load(args.modelo)
+    
+    print(f"{args.enunciados} enunciados de {args.segundos:.1f}s desde {args.fuentes} fuentes, "
+          f"espera máxima {args.espera_ms:.0f} ms")
+    print(f"{'lote':>5} {'medio':>6} {'enunc/s':>8} {'audio s/s':>10} {'p50 (s)':>8} {'p95 (s)':>8}")
+    for max_batch in (int(b) for b in args.lotes.split(",")):
+        r = run_level(registry, args, utterances, max_batch)
+        print(f"{r['lote']:>5} {r['lote_medio']:>6.1f} {r['enunciados_s']:>8.2f} {r['audio_s']:>10.1f} "
+              f"{r['p50']:>8.3f} {r['p95']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
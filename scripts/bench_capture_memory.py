@@ -0,0 +1,58 @@
+import os
+import sys
+import tracemalloc
+import wave
+
+import numpy as np
+
+from audio_buffer import AudioBuffer
+
+RATE = 16000
+CHUNK = 1024
+
+def synthetic_chunks(minutes):
+    """Generar chunks PCM int16 como los que devuelve stream.read()"""
+    rng = np.random.default_rng(0)
+    chunk = (rng.standard_normal(CHUNK) * 3000).astype(np.int16).tobytes()
+    for _ in range(int(minutes * 60 * RATE / CHUNK)):
+        yield chunk[:]
+
+def write_wav(data):
+    with wave.open(os.devnull, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(data)
+
+def session_list_of_bytes(minutes):
+    """Ruta anterior: lista de bytes, b''.join para el WAV y para Whisper"""
+    frames = []
+    for data in synthetic_chunks(minutes):
+        frames.append(bytes(bytearray(data)))  # Un objeto bytes nuevo por chunk, como stream.read()
+    write_wav(b''.join(frames))
+    audio = np.frombuffer(b''.join(frames), dtype=np.int16).astype(np.float32) / 32768.0
+    return audio
+
+def session_audio_buffer(minutes):
+    """Ruta actual: buffer int16 preasignado, vistas sin copia"""
+    buffer = AudioBuffer(RATE)
+    for data in synthetic_chunks(minutes):
+        buffer.append(np.frombuffer(data, dtype=np.int16))
+    write_wav(buffer.view())
+    return buffer.to_float32()
+
+def measure(func, minutes):
+    tracemalloc.start()
+    result = func(minutes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak
+
+if __name__ == "__main__":
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    
+    print(f"=== Memoria pico de captura ({minutes:g} min a {RATE} Hz, chunks de {CHUNK}) ===")
+    for name, func in [("lista de bytes", session_list_of_bytes), ("AudioBuffer", session_audio_buffer)]:
+        peak = measure(func, minutes)
+        print(f"{name:15} pico {peak / 2**20:8.1f} MB  ({peak / 2**20 / minutes:.2f} MB por minuto grabado)")
@@ -0,0 +1,63 @@
+import argparse
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+
+import long_audio
+from long_audio import create_worker_pool
+from shared_weights import process_memory
+
+
+def _warm_up(barrier, seconds):
+    """Decodificar un poco de audio (para contar también las activaciones) y devolver el pid"""
+    long_audio._worker_model.transcribe(np.zeros(int(seconds * 16000), dtype=np.float32),
+                                        language="es", condition_on_previous_text=False, fp16=False)
+    barrier.wait()  # Así cada trabajador atiende exactamente una tarea
+    return os.getpid()
+
+
+def measure(model_size, workers, shared, seconds):
+    """Memoria de cada trabajador tras cargar el modelo y decodificar una vez"""
+    with multiprocessing.Manager() as manager:
+        barrier = manager.Barrier(workers)
+        with create_worker_pool(model_size, workers, shared_weights=shared) as pool:
+            pids = list(pool.map(_warm_up, [barrier] * workers, [seconds] * workers))
+            return {pid: process_memory(pid) for pid in pids}
+
+
+def report(label, memory):
+    print(f"\n{label}")
+    print(f"{'pid':>8} {'RSS (MB)':>10} {'PSS (MB)':>10} {'privada (MB)':>13} {'compartida (MB)':>16}")
+    for pid, m in memory.items():
+        print(f"{pid:>8} {m['rss']:>10.0f} {m['pss']:>10.0f} {m['uss']:>13.0f} {m['shared']:>16.0f}")
+    total_rss = sum(m["rss"] for m in memory.values())
+    total_pss = sum(m["pss"] for m in memory.values())
+    print(f"{'total':>8} {total_rss:>10.0f} {total_pss:>10.0f}")
+    return total_pss
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Memoria por trabajador con y sin pesos compartidos")
+    parser.add_argument("-m", "--modelo", default="base")
+    parser.add_argument("-w", "--workers", type=int, default=4)
+    parser.add_argument("-s", "--segundos", type=float, default=5.0, help="Audio de calentamiento por trabajador")
+    args = parser.parse_args(argv)
+    
+    if process_memory() is None:
+        print("❌ Hace falta /proc/<pid>/smaps_rollup (Linux) para medir la memoria")
+        return 1
+    
+    print(f"🧪 {args.workers} trabajadores con el modelo {args.modelo}")
+    own = report("Cada proceso con su copia (whisper.load_model):",
+                 measure(args.modelo, args.workers, False, args.segundos))
+    shared = report("Pesos compartidos (archivo mapeado en memoria):",
+                    measure(args.modelo, args.workers, True, args.segundos))
+    print(f"\n💾 Memoria real del grupo (suma de PSS): {own:.0f} MB → {shared:.0f} MB "
+          f"({own - shared:.0f} MB menos, {shared / own:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
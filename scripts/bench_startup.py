@@ -0,0 +1,54 @@
+import os
+import re
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SNIPPET = """
+import sys, time
+sys.path.insert(0, {here!r})
+start = time.perf_counter()
+{code}
+sys.stdout.write(f"\\ntiempo={{time.perf_counter() - start}}\\n")  # Una sola escritura: sin mezclarse con otros hilos
+sys.stdout.flush()
+"""
+
+CASES = [
+    ("import whisper (antes: al inicio de V2)", "import whisper"),
+    ("import transcribe_realtime_V2 (solo el módulo)", "import transcribe_realtime_V2"),
+    # Lo que mide "Menú listo": el constructor no debe importar torch en este hilo
+    ("RealtimeTranscriber() (hasta run_continuous)",
+     "import transcribe_realtime_V2; transcribe_realtime_V2.RealtimeTranscriber()"),
+    ("import librosa (antes: en main)", "import librosa"),
+    ("comprobaciones del sistema sin caché", "import system_checks; system_checks.get_system_checks(force=True)"),
+    ("comprobaciones del sistema en caché", "import system_checks; system_checks.get_system_checks()"),
+    ("show_models (tabla, GPU en caché)", "import show_models; show_models.get_model_info(); show_models.check_system_compatibility()"),
+]
+
+def run(code, repeats):
+    """Mediana de `repeats` ejecuciones en intérpretes nuevos (sin módulos ya importados)"""
+    times = []
+    for _ in range(repeats):
+        proc = subprocess.run([sys.executable, "-c", SNIPPET.format(here=HERE, code=code)],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "error"
+        # Los hilos en segundo plano (carga del modelo) escriben a la vez: buscar la marca
+        match = re.search(r"tiempo=([0-9.eE+-]+)", proc.stdout)
+        if match is None:
+            return None, "sin tiempo en la salida"
+        times.append(float(match.group(1)))
+    times.sort()
+    return times[len(times) // 2], None
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    
+    print(f"=== Coste de arranque (mediana de {repeats} intérpretes nuevos) ===")
+    for name, code in CASES:
+        seconds, error = run(code, repeats)
+        if seconds is None:
+            print(f"{name:60} no disponible ({error})")
+        else:
+            print(f"{name:60} {seconds * 1000:8.1f} ms")
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import numpy as np
+
+from audio_buffer import AudioRing
+
+# Indicadores de estado de PortAudio en el callback (mismos valores que pyaudio.paInput*)
+_INPUT_UNDERFLOW = 0x1
+_INPUT_OVERFLOW = 0x2
+_CONTINUE = 0  # pyaudio.paContinue
+
+
+class CallbackCapture:
+    """
+    Captura de PyAudio en modo callback hacia un anillo int16 preasignado
+    
+    PortAudio llama a _callback desde su propio hilo con cada bloque; el
+    callback solo copia las muestras al anillo, anota los indicadores de
+    estado y avisa al lector. No reserva memoria ni toca el resto del estado
+    del transcriptor, así que un hilo ocupado no retrasa al dispositivo.
+    
+    El lector recoge el audio con read() a su ritmo: mientras no vaya más de
+    `buffer_seconds` por detrás no se pierde nada. Por sesión se cuentan
+    desbordamientos y subdesbordamientos del dispositivo, callbacks tardíos
+    (más de `late_factor` periodos desde el anterior) y muestras perdidas.
+    
+    El stream puede quedarse abierto entre sesiones: begin_session() empieza
+    una sesión nueva desde un poco antes (pre-roll) con los contadores a cero.
+    """
+    
+    def __init__(self, audio, rate, frames_per_buffer, buffer_seconds=10, late_factor=2.0):
+        self.audio = audio
+        self.rate = int(rate)
+        self.frames_per_buffer = int(frames_per_buffer)
+        self.late_factor = late_factor
+        self.ring = AudioRing(max(self.frames_per_buffer, int(self.rate * buffer_seconds)))
+        self.stream = None
+        self.input_latency = None  # Segundos, según PortAudio al abrir
+        self._ready = threading.Event()
+        self._position = 0
+        self._preroll = 0
+        self._last_callback = None
+        self._reset_counters()
+    
+    def _reset_counters(self):
+        self.callbacks = 0
+        self.overflows = 0
+        self.underflows = 0
+        self.late_callbacks = 0
+        self.lost_samples = 0
+        self.max_gap = 0.0
+    
+    def _callback(self, in_data, frame_count, time_info, status_flags):
+        now = time.perf_counter()
+        if status_flags & _INPUT_OVERFLOW:
+            self.overflows += 1
+        if status_flags & _INPUT_UNDERFLOW:
+            self.underflows += 1
+        if self._last_callback is not None:
+            gap = now - self._last_callback
+            self.max_gap = max(self.max_gap, gap)
+            if gap > self.late_factor * frame_count / self.rate:
+                self.late_callbacks += 1
+        self._last_callback = now
+        self.callbacks += 1
+        
+        self.ring.write(np.frombuffer(in_data, dtype=np.int16))
+        self._ready.set()
+        return None, _CONTINUE
+    
+    def open(self, format, channels=1):
+        """Abrir el stream de entrada en modo callback (empieza a capturar ya)"""
+        self.stream = self.audio.open(
+            format=format,
+            channels=channels,
+            rate=self.rate,
+            input=True,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self._callback
+        )
+        try:
+            self.input_latency = self.stream.get_input_latency()
+        except (OSError, AttributeError):
+            self.input_latency = None
+        return self.stream
+    
+    def begin_session(self, preroll=0):
+        """
+        Leer a partir de `preroll` muestras antes de ahora y poner a cero los contadores
+        
+        El pre-roll nunca retrocede más allá de lo que ya leyó la sesión anterior
+        ni de lo que aún guarda el anillo.
+        """
+        end = self.ring.write_position()
+        self._position = max(self._position, end - min(int(preroll), self.ring.capacity))
+        self._preroll = end - self._position
+        self._reset_counters()
+        return self._preroll
+    
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+    
+    def read(self, timeout=0.1):
+        """Muestras int16 (a la tasa del dispositivo) llegadas desde la última lectura"""
+        if self.ring.fill() == 0:
+            self._ready.wait(timeout)
+        self._ready.clear()
+        samples, self._position, lost = self.ring.read_from(self._position)
+        self.lost_samples += lost
+        return samples
+    
+    def session_stats(self):
+        """Contadores de la captura de esta sesión"""
+        return {
+            "mode": "callback",
+            "callbacks": self.callbacks,
+            "device_overflows": self.overflows,
+            "device_underflows": self.underflows,
+            "late_callbacks": self.late_callbacks,
+            "max_callback_gap_ms": round(self.max_gap * 1000, 1),
+            "lost_samples": self.lost_samples,
+            "lost_seconds": round(self.lost_samples / self.rate, 3),
+            "frames_per_buffer": self.frames_per_buffer,
+            "preroll_seconds": round(self._preroll / self.rate, 3),
+            "ring_seconds": round(self.ring.capacity / self.rate, 3),
+            "input_latency_ms": round(self.input_latency * 1000, 1) if self.input_latency is not None else None,
+            "error": None
+        }
@@ -0,0 +1,266 @@
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from audio_buffer import AudioRing
+
+# Indicador de PortAudio en el callback (mismo valor que pyaudio.paInputOverflow)
+_INPUT_OVERFLOW = 0x2
+_CONTINUE = 0  # pyaudio.paContinue
+
+
+class SharedAudioRing(AudioRing):
+    """
+    AudioRing en memoria compartida entre dos procesos
+    
+    El proceso que lo crea (sin `name`) es su dueño y lo libera al cerrarlo;
+    el otro se conecta con el nombre del bloque.
+    """
+    
+    def __init__(self, capacity, name=None):
+        header_bytes = self.HEADER_SLOTS * 8
+        size = header_bytes + int(capacity) * 2
+        self._owner = name is None
+        self._shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size if self._owner else 0)
+        super().__init__(
+            capacity,
+            header=np.ndarray((self.HEADER_SLOTS,), dtype=np.int64, buffer=self._shm.buf),
+            data=np.ndarray((int(capacity),), dtype=np.int16, buffer=self._shm.buf, offset=header_bytes)
+        )
+        if self._owner:
+            self._header[:] = 0
+    
+    @property
+    def name(self):
+        return self._shm.name
+    
+    def close(self):
+        self._header = None
+        self._data = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _capture_main(conn, ring_name, capacity, rate, command_poll=0.05):
+    """
+    Bucle del proceso de captura: PyAudio, remuestreo a `rate` y el anillo
+    
+    No importa whisper ni torch, así que no compite con la inferencia por el
+    GIL. El stream va en modo callback: PortAudio entrega cada bloque con sus
+    indicadores de estado y el callback lo remuestrea y lo escribe en el anillo,
+    mientras este bucle atiende las órdenes del proceso principal (start,
+    stop, quit) que llegan por `conn`.
+    
+    Una lectura bloqueante no sirve aquí: con exception_on_overflow=True se
+    tira el bloque ya leído y con False PyAudio oculta el desbordamiento.
+    """
+    import pyaudio
+    from audio_dsp import PolyphaseResampler
+    
+    ring = SharedAudioRing(capacity, name=ring_name)
+    audio = pyaudio.PyAudio()
+    stream = None
+    resampler = None
+    device_rate = rate
+    overflows = 0
+    lost_frames = 0  # Tramas del dispositivo descartadas por desbordamiento
+    next_adc_time = None  # Instante en que debería empezar el siguiente bloque
+    error = None
+    
+    def _callback(in_data, frame_count, time_info, status_flags):
+        nonlocal overflows, lost_frames, next_adc_time
+        adc_time = (time_info or {}).get("input_buffer_adc_time") or 0.0
+        if status_flags & _INPUT_OVERFLOW:
+            overflows += 1
+            # El hueco entre bloques dice cuánto se descartó; si el host no da
+            # tiempos, al menos un bloque
+            gap = 0
+            if adc_time and next_adc_time is not None:
+                gap = int(round((adc_time - next_adc_time) * device_rate))
+            lost_frames += gap if gap > 0 else frame_count
+        next_adc_time = adc_time + frame_count / device_rate if adc_time else None
+        
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        if resampler is not None:
+            samples = resampler.process_int16(samples)
+        ring.write(samples)
+        return None, _CONTINUE
+    
+    def _close_stream():
+        nonlocal stream
+        if stream is not None:
+            stream.stop_stream()
+            stream.close()
+            stream = None
+    
+    try:
+        while True:
+            try:
+                ready = conn.poll(command_poll)
+            except EOFError:
+                return
+            if not ready:
+                if stream is not None and not stream.is_active():
+                    error = "El stream de entrada se detuvo"  # p. ej. se desconectó el micrófono
+                    _close_stream()
+                    ring.set_failed()
+                continue
+            try:
+                command = conn.recv()
+            except EOFError:
+                return  # El proceso principal ya no está
+            
+            if command[0] == "start":
+                _, device_rate, chunk = command
+                resampler = PolyphaseResampler(device_rate, rate) if device_rate != rate else None
+                overflows = 0
+                lost_frames = 0
+                next_adc_time = None
+                error = None
+                ring.set_failed(False)
+                try:
+                    stream = audio.open(format=pyaudio.paInt16, channels=1, rate=device_rate,
+                                        input=True, frames_per_buffer=chunk, stream_callback=_callback)
+                except Exception as e:
+                    conn.send(("error", str(e)))
+                    continue
+                conn.send(("ok",))
+            elif command[0] == "stop":
+                _close_stream()
+                lost = int(round(lost_frames * rate / device_rate))  # En muestras a `rate`
+                conn.send(("stopped", overflows, lost, error))
+            elif command[0] == "quit":
+                return
+    finally:
+        _close_stream()
+        audio.terminate()
+        ring.close()
+
+
+class CaptureProcess:
+    """
+    Captura de audio en un proceso propio que escribe en un anillo compartido
+    
+    El proceso de captura solo lee el micrófono y remuestrea a 16 kHz, así que
+    sigue en tiempo real aunque el proceso principal esté ocupado decodificando.
+    El proceso principal recoge el audio con read() a su ritmo; mientras el
+    retraso no supere el anillo (`ring_seconds`) no se pierde nada.
+    
+    Por sesión se cuentan los desbordamientos del dispositivo (y las muestras
+    que descartó) y las muestras perdidas por retraso del lector (ver
+    session_stats()).
+    """
+    
+    def __init__(self, rate=16000, ring_seconds=30, poll_interval=0.01):
+        self.rate = rate
+        self.poll_interval = poll_interval
+        self.ring = SharedAudioRing(int(rate * ring_seconds))
+        
+        # spawn: el hijo no hereda el estado de PortAudio ni los hilos de este proceso
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_capture_main,
+            args=(child_conn, self.ring.name, self.ring.capacity, rate),
+            name="captura",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        
+        self._lock = threading.Lock()  # start/stop pueden llegar desde hilos distintos
+        self._active = False
+        self._position = 0
+        self._reset_stats()
+    
+    def _reset_stats(self):
+        self._overflows = 0
+        self._device_lost = 0
+        self._lost = 0
+        self._max_lag = 0
+        self._error = None
+    
+    def _request(self, *command, timeout=10.0):
+        """Enviar una orden al proceso de captura y esperar su respuesta"""
+        self._conn.send(command)
+        if not self._conn.poll(timeout):
+            raise OSError("El proceso de captura no responde")
+        return self._conn.recv()
+    
+    def start(self, device_rate, chunk):
+        """Abrir el dispositivo a `device_rate` en el proceso de captura"""
+        with self._lock:
+            if self._active:
+                return
+            if not self._process.is_alive():
+                raise OSError("El proceso de captura terminó")
+            self._reset_stats()
+            # El hijo no escribe mientras está parado: lo nuevo empieza aquí
+            self._position = self.ring.write_position()
+            reply = self._request("start", int(device_rate), int(chunk))
+            if reply[0] == "error":
+                raise OSError(f"No se pudo abrir el micrófono: {reply[1]}")
+            self._active = True
+    
+    def stop(self):
+        """Cerrar el dispositivo; lo ya capturado sigue en el anillo hasta leerlo"""
+        with self._lock:
+            if not self._active:
+                return
+            self._active = False
+            try:
+                _, self._overflows, self._device_lost, self._error = self._request("stop")
+            except (OSError, EOFError) as e:
+                self._error = str(e)
+    
+    def read(self, timeout=0.1):
+        """
+        Muestras int16 a 16 kHz capturadas desde la última lectura
+        
+        Espera como mucho `timeout` segundos a que haya algo; puede devolver un
+        array vacío. Lanza OSError si la captura se interrumpió.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            self._max_lag = max(self._max_lag, self.ring.write_position() - self._position)
+            samples, self._position, lost = self.ring.read_from(self._position)
+            self._lost += lost
+            if len(samples):
+                return samples
+            if self.ring.failed():
+                raise OSError("La captura se interrumpió en el proceso de captura")
+            if time.perf_counter() >= deadline or not self._process.is_alive():
+                return samples
+            time.sleep(self.poll_interval)
+    
+    def session_stats(self):
+        """Contadores de la última sesión (desde start())"""
+        return {
+            "mode": "process",
+            "device_overflows": self._overflows,
+            "device_lost_samples": self._device_lost,
+            "device_lost_seconds": round(self._device_lost / self.rate, 3),
+            "lost_samples": self._lost,
+            "lost_seconds": round(self._lost / self.rate, 3),
+            "max_lag_seconds": round(self._max_lag / self.rate, 3),
+            "ring_seconds": round(self.ring.capacity / self.rate, 3),
+            "error": self._error
+        }
+    
+    def close(self):
+        """Terminar el proceso de captura y liberar la memoria compartida"""
+        self.stop()
+        if self._process.is_alive():
+            try:
+                self._conn.send(("quit",))
+            except OSError:
+                pass
+            self._process.join(timeout=5)
+            if self._process.is_alive():
+                self._process.terminate()
+        self._conn.close()
+        self.ring.close()
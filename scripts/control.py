@@ -0,0 +1,182 @@
+import json
+import queue
+import signal
+import socket
+import sys
+import threading
+
+# Órdenes que entiende RealtimeTranscriber.run_headless
+COMMANDS = ("start", "stop", "toggle", "cancel", "model", "status", "quit")
+
+
+class Command:
+    """Orden recibida por cualquier canal, con su forma de responder"""
+    
+    def __init__(self, name, args=(), reply=None, source=""):
+        self.name = name
+        self.args = list(args)
+        self.source = source
+        self._reply = reply
+    
+    def respond(self, ok=True, **info):
+        """Contestar al origen de la orden (la consola no necesita respuesta)"""
+        if self._reply is None:
+            return
+        try:
+            self._reply({"ok": ok, "command": self.name, **info})
+        except OSError:
+            pass  # El cliente ya se desconectó
+    
+    def __repr__(self):
+        return f"Command({self.name!r}, {self.args!r}, source={self.source!r})"
+
+
+def parse_command(line):
+    """'model small' → ('model', ['small']); texto JSON {"command": ..., "args": [...]} también vale"""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            return None
+        name = str(data.get("command", "")).lower()
+        args = data.get("args", [])
+        if isinstance(args, str):
+            args = [args]
+        return name, [str(a) for a in args]
+    parts = line.split()
+    return parts[0].lower(), parts[1:]
+
+
+class ControlChannel:
+    """
+    Cola de órdenes para controlar el transcriptor sin teclado
+    
+    Las fuentes (stdin, un socket local, señales) solo publican órdenes; quien
+    consume se bloquea en get() y despierta en cuanto llega una, sin sondeo.
+    También sirve para avisos internos (p. ej. el hilo de grabación avisa al
+    terminar), que llevan nombres con guion bajo para no confundirlos.
+    """
+    
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._closers = []
+    
+    def post(self, name, args=(), reply=None, source="interno"):
+        self._queue.put(Command(name, args, reply, source))
+    
+    def post_line(self, line, reply=None, source=""):
+        """Publicar una línea de texto; devuelve False si no es una orden conocida"""
+        parsed = parse_command(line)
+        if parsed is None:
+            return False
+        name, args = parsed
+        if name not in COMMANDS:
+            if reply is not None:
+                reply({"ok": False, "command": name, "error": f"orden desconocida ({', '.join(COMMANDS)})"})
+            return False
+        self.post(name, args, reply, source)
+        return True
+    
+    def get(self, timeout=None):
+        """Siguiente orden (bloquea); None si vence `timeout`"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def listen_stdin(self, stream=None):
+        """Leer órdenes línea a línea de la entrada estándar en un hilo en segundo plano"""
+        stream = stream or sys.stdin
+        
+        def _reply(message):
+            print(json.dumps(message, ensure_ascii=False), flush=True)
+        
+        def _loop():
+            for line in stream:
+                self.post_line(line, _reply, "stdin")
+            self.post("quit", source="stdin")  # EOF: cerrar ordenadamente
+        
+        threading.Thread(target=_loop, name="control-stdin", daemon=True).start()
+    
+    def listen_socket(self, port, host="127.0.0.1"):
+        """
+        Aceptar órdenes por TCP (una por línea) y contestar con una línea JSON
+        
+        Solo escucha en local por defecto: cualquiera que llegue al puerto puede
+        grabar o parar, así que no conviene exponerlo.
+        """
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((host, port))
+        server.listen()
+        
+        def _client(conn):
+            lock = threading.Lock()
+            
+            def _reply(message):
+                with lock:
+                    conn.sendall((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+            
+            with conn, conn.makefile("r", encoding="utf-8") as lines:
+                try:
+                    for line in lines:
+                        self.post_line(line, _reply, "socket")
+                except OSError:
+                    pass
+        
+        def _accept():
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except OSError:
+                    return  # Socket cerrado
+                threading.Thread(target=_client, args=(conn,), daemon=True).start()
+        
+        threading.Thread(target=_accept, name="control-socket", daemon=True).start()
+        self._closers.append(server.close)
+        return server.getsockname()[1]
+    
+    def install_signal_handlers(self):
+        """
+        SIGUSR1 alterna grabar/parar, SIGUSR2 cancela y SIGTERM/SIGINT cierran
+        
+        Solo las señales que existen en la plataforma (en Windows no hay SIGUSR*).
+        Hay que llamarlo desde el hilo principal.
+        """
+        mapping = {"SIGUSR1": "toggle", "SIGUSR2": "cancel", "SIGTERM": "quit", "SIGINT": "quit"}
+        for signal_name, command in mapping.items():
+            signum = getattr(signal, signal_name, None)
+            if signum is None:
+                continue
+            
+            def _handler(signum, frame, command=command):
+                # Publicar desde otro hilo: el manejador puede interrumpir al
+                # hilo principal mientras tiene tomado el cerrojo de la cola
+                threading.Thread(target=self.post, args=(command,), kwargs={"source": "señal"}).start()
+            
+            signal.signal(signum, _handler)
+    
+    def close(self):
+        for close in self._closers:
+            close()
+        self._closers = []
+
+
+def send_command(line, port, host="127.0.0.1", timeout=5.0):
+    """Enviar una orden a un transcriptor con --puerto-control y devolver su respuesta"""
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        conn.sendall((line.strip() + "\n").encode("utf-8"))
+        with conn.makefile("r", encoding="utf-8") as replies:
+            reply = replies.readline()
+    return json.loads(reply) if reply else None
+
+
+if __name__ == "__main__":
+    # Uso: python control.py PUERTO orden [args...]   p. ej.  python control.py 8765 model small
+    if len(sys.argv) < 3:
+        print("Uso: python control.py PUERTO orden [args...]")
+        sys.exit(1)
+    print(json.dumps(send_command(" ".join(sys.argv[2:]), int(sys.argv[1])), ensure_ascii=False))
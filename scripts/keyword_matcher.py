@@ -0,0 +1,136 @@
+import bisect
+import re
+import unicodedata
+from collections import deque
+
+
+def fold_text(text):
+    """
+    Pasar a minúsculas y quitar acentos, conservando un mapa de posiciones
+    
+    Devuelve (texto_normalizado, mapa) donde mapa[i] es la posición en el texto
+    original del carácter i del texto normalizado. La ñ se conserva.
+    """
+    folded = []
+    index_map = []
+    for i, ch in enumerate(text):
+        if ch.isascii():
+            folded.append(ch.lower())
+            index_map.append(i)
+            continue
+        
+        lowered = ch.casefold()
+        if lowered == "ñ":
+            folded.append(lowered)
+            index_map.append(i)
+            continue
+        
+        for c in unicodedata.normalize("NFD", lowered):
+            if not unicodedata.combining(c):
+                folded.append(c)
+                index_map.append(i)
+    return "".join(folded), index_map
+
+
+class KeywordMatcher:
+    """
+    Buscador de muchas palabras clave a la vez (autómata de Aho-Corasick)
+    
+    La lista se compila una sola vez; después cada texto se recorre en una
+    única pasada, encontrando todas las apariciones de todas las palabras
+    clave con sus posiciones en el texto original. La comparación ignora
+    mayúsculas y acentos ("reunion" encuentra "reunión").
+    """
+    
+    def __init__(self, keywords, whole_words=False):
+        self.keywords = list(keywords)
+        self.whole_words = whole_words
+        
+        # Trie: transiciones, enlaces de fallo y salidas (índices de palabra clave)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._lengths = []
+        
+        seen = set()
+        for index, keyword in enumerate(self.keywords):
+            folded, _ = fold_text(keyword)
+            self._lengths.append(len(folded))
+            # Palabras que solo difieren en mayúsculas o acentos cuentan una vez
+            if not folded or folded in seen:
+                continue
+            seen.add(folded)
+            state = 0
+            for ch in folded:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(index)
+        
+        self._build_failure_links()
+    
+    def _build_failure_links(self):
+        """Calcular los enlaces de fallo por niveles (BFS)"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+    
+    def find_all(self, text):
+        """Devolver (palabra_clave, inicio, fin) de cada aparición, en orden de posición"""
+        folded, index_map = fold_text(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        matches = []
+        state = 0
+        
+        for pos, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for index in out[state]:
+                start = pos - self._lengths[index] + 1
+                if self.whole_words and not self._is_whole_word(folded, start, pos + 1):
+                    continue
+                matches.append((self.keywords[index], index_map[start], index_map[pos] + 1))
+        
+        matches.sort(key=lambda m: (m[1], -m[2]))
+        return matches
+    
+    @staticmethod
+    def _is_whole_word(folded, start, end):
+        before = folded[start - 1] if start > 0 else " "
+        after = folded[end] if end < len(folded) else " "
+        return not before.isalnum() and not after.isalnum()
+    
+    def extract(self, text):
+        """
+        Palabras clave encontradas con su frase de contexto
+        
+        Devuelve una entrada por aparición: {"keyword", "context", "position", "end"}.
+        """
+        # Delimitar las frases una sola vez
+        sentence_spans = [m.span() for m in re.finditer(r"[^.!?]+", text)]
+        sentence_starts = [start for start, _ in sentence_spans]
+        
+        found = []
+        for keyword, start, end in self.find_all(text):
+            i = bisect.bisect_right(sentence_starts, start) - 1
+            s_start, s_end = sentence_spans[i] if i >= 0 else (0, len(text))
+            found.append({
+                "keyword": keyword,
+                "context": text[s_start:s_end].strip(),
+                "position": start,
+                "end": end
+            })
+        return found
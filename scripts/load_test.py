@@ -0,0 +1,185 @@
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+
+import numpy as np
+
+import ws_protocol
+from server import WHISPER_RATE, decode_audio_bytes, read_wav_pcm16
+
+
+def percentile(values, q):
+    """Percentil por interpolación lineal (None si no hay valores)"""
+    if not values:
+        return None
+    return float(np.percentile(values, q * 100))
+
+
+def load_pcm16(path):
+    """Audio del archivo como int16 mono a 16 kHz (WAV directo; el resto con ffmpeg)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    samples = read_wav_pcm16(data)
+    if samples is not None:
+        return samples
+    return (np.clip(decode_audio_bytes(data), -1.0, 1.0) * 32767).astype(np.int16)
+
+
+def post_file(host, port, data, timeout):
+    """Una petición POST /transcribe; devuelve (estado, respuesta, segundos)"""
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request("POST", "/transcribe", body=data, headers={"Content-Type": "application/octet-stream"})
+        response = conn.getresponse()
+        body = json.loads(response.read() or b"{}")
+        return response.status, body, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def stream_audio(host, port, pcm, chunk_ms, realtime, timeout):
+    """
+    Enviar el audio por WebSocket en trozos de `chunk_ms`
+    
+    Devuelve (mensajes de enunciado, segundos desde el final del envío hasta
+    recibir el último resultado). Con `realtime` los trozos se envían al ritmo
+    del audio, como haría un micrófono.
+    """
+    ws = ws_protocol.connect(host, port, "/stream?format=pcm16", timeout=timeout)
+    messages = []
+    done = threading.Event()
+    
+    def _receive():
+        while True:
+            opcode, payload = ws.receive()
+            if opcode == ws_protocol.OP_CLOSE:
+                break
+            message = json.loads(payload)
+            if message["type"] in ("utterance", "error"):
+                messages.append(message)
+            elif message["type"] == "done":
+                break
+        done.set()
+    
+    receiver = threading.Thread(target=_receive, daemon=True)
+    receiver.start()
+    
+    chunk = int(WHISPER_RATE * chunk_ms / 1000)
+    started = time.perf_counter()
+    for i, offset in enumerate(range(0, len(pcm), chunk)):
+        if realtime:
+            # Ritmo del audio: no adelantarse a lo que ya "se ha grabado"
+            delay = started + i * chunk_ms / 1000 - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        ws.send_binary(pcm[offset:offset + chunk].tobytes())
+    sent = time.perf_counter()
+    ws.send_json({"type": "end"})
+    
+    done.wait(timeout)
+    flush = time.perf_counter() - sent
+    ws.close()
+    return messages, flush
+
+
+def run(args):
+    pcm = load_pcm16(args.archivo)
+    audio_seconds = len(pcm) / WHISPER_RATE
+    if args.modo == "post":
+        with open(args.archivo, "rb") as f:
+            payload = f.read()
+    
+    lock = threading.Lock()
+    latencies = []  # Segundos por petición vistos por el cliente
+    server_latencies = {"cola": [], "decodificar": [], "lote": []}
+    stats = {"ok": 0, "rechazadas": 0, "errores": 0, "audio": 0.0}
+    
+    def _client(client_id):
+        for _ in range(args.peticiones):
+            try:
+                if args.modo == "post":
+                    status, body, elapsed = post_file(args.host, args.puerto, payload, args.timeout)
+                    with lock:
+                        if status == 200:
+                            stats["ok"] += 1
+                            stats["audio"] += audio_seconds
+                            latencies.append(elapsed)
+                            for name in server_latencies:
+                                server_latencies[name].append(body["latency"][name])
+                        elif status == 503:
+                            stats["rechazadas"] += 1
+                        else:
+                            stats["errores"] += 1
+                else:
+                    messages, flush = stream_audio(args.host, args.puerto, pcm, args.trozo_ms,
+                                                   not args.rapido, args.timeout)
+                    with lock:
+                        stats["ok"] += 1
+                        stats["audio"] += audio_seconds
+                        latencies.append(flush)
+                        for message in messages:
+                            if message["type"] == "error":
+                                stats["errores"] += 1
+                                continue
+                            for name in server_latencies:
+                                server_latencies[name].append(message["latency"][name])
+            except (OSError, ValueError) as e:
+                with lock:
+                    stats["errores"] += 1
+                print(f"❌ Cliente {client_id}: {e}")
+    
+    print(f"🚀 {args.clientes} cliente(s) × {args.peticiones} petición(es), modo {args.modo}, "
+          f"{audio_seconds:.1f}s de audio por petición")
+    started = time.perf_counter()
+    threads = [threading.Thread(target=_client, args=(i,)) for i in range(args.clientes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    
+    print("\n" + "=" * 60)
+    print("📊 RESULTADOS")
+    print("=" * 60)
+    print(f"Correctas: {stats['ok']} | Rechazadas (cola llena): {stats['rechazadas']} | Errores: {stats['errores']}")
+    print(f"Tiempo total: {wall:.2f}s | {stats['ok'] / wall:.2f} peticiones/s | "
+          f"{stats['audio'] / wall:.1f}s de audio por segundo")
+    label = "Latencia por petición" if args.modo == "post" else "Latencia fin del envío → último resultado"
+    _print_distribution(label, latencies)
+    _print_distribution("Espera en cola (servidor)", server_latencies["cola"])
+    _print_distribution("Decodificación (servidor)", server_latencies["decodificar"])
+    if server_latencies["lote"]:
+        print(f"Tamaño medio de lote: {np.mean(server_latencies['lote']):.1f}")
+    return 0 if stats["errores"] == 0 else 1
+
+
+def _print_distribution(label, values):
+    if not values:
+        print(f"{label}: sin datos")
+        return
+    print(f"{label}: p50 {percentile(values, 0.5):.3f}s | p95 {percentile(values, 0.95):.3f}s | "
+          f"p99 {percentile(values, 0.99):.3f}s | máx {max(values):.3f}s")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor local de transcripción")
+    parser.add_argument("archivo", help="Audio que envía cada petición")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--puerto", type=int, default=8765)
+    parser.add_argument("-c", "--clientes", type=int, default=4, help="Clientes concurrentes")
+    parser.add_argument("-n", "--peticiones", type=int, default=5, help="Peticiones por cliente")
+    parser.add_argument("--modo", choices=("post", "stream"), default="post",
+                        help="post: archivo completo; stream: WebSocket por trozos")
+    parser.add_argument("--trozo-ms", type=int, default=100, help="Milisegundos por trozo en streaming")
+    parser.add_argument("--rapido", action="store_true",
+                        help="En streaming, enviar sin esperar al ritmo del audio")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Segundos máximos por petición")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args(sys.argv[1:])))
@@ -0,0 +1,318 @@
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from audio_dsp import detect_speech_regions, extract_speech, frame_rms, remap_result
+from keyword_matcher import fold_text
+
+# Modelo cargado una sola vez en cada proceso trabajador
+_worker_model = None
+
+
+def _quietest_point(window, lo, frame_len):
+    """Centro (en muestras absolutas) de la trama de menor energía de `window`, que empieza en `lo`"""
+    window = np.asarray(window, dtype=np.float32)
+    # La última trama incompleta se rellena con ceros y parecería silencio: se ignora,
+    # si no el corte caería fuera de la ventana (y del audio ya leído en streaming)
+    whole = len(window) - len(window) % frame_len
+    rms = frame_rms(window[:whole] if whole else window, frame_len)
+    return lo + int(np.argmin(rms)) * frame_len + frame_len // 2
+
+
+def find_split_points(total_samples, sample_rate, read, chunk_seconds=300,
+                      search_seconds=5, frame_ms=30):
+    """
+    Elegir puntos de corte en silencios cerca de cada frontera de ventana
+    
+    Para cada frontera nominal (múltiplos de `chunk_seconds`) se busca la trama
+    de menor energía en ±`search_seconds`. Solo se leen esos alrededores con
+    `read(inicio, fin)`, así que funciona igual con arrays en memoria que con
+    segmentos en disco mapeados con memmap.
+    """
+    chunk = int(chunk_seconds * sample_rate)
+    search = int(search_seconds * sample_rate)
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    
+    cuts = [0]
+    boundary = chunk
+    while boundary < total_samples - search:
+        lo = max(cuts[-1] + frame_len, boundary - search)
+        hi = min(total_samples, boundary + search)
+        cut = _quietest_point(read(lo, hi), lo, frame_len)
+        cuts.append(min(cut, total_samples))
+        boundary = cuts[-1] + chunk
+    cuts.append(total_samples)
+    return cuts
+
+
+def plan_chunks(total_samples, sample_rate, read, chunk_seconds=300, search_seconds=5,
+                overlap_seconds=0.5):
+    """
+    Dividir el audio en trozos cortados en silencio, con un pequeño solape
+    
+    Devuelve una lista de (inicio_decodificado, fin_decodificado, inicio_propio,
+    fin_propio) en muestras. Cada trozo se decodifica con solape por ambos lados,
+    pero solo se conservan los segmentos cuyo centro cae en su tramo propio.
+    """
+    cuts = find_split_points(total_samples, sample_rate, read, chunk_seconds, search_seconds)
+    overlap = int(overlap_seconds * sample_rate)
+    return [
+        (max(0, start - overlap), min(total_samples, end + overlap), start, end)
+        for start, end in zip(cuts[:-1], cuts[1:])
+    ]
+
+
+def iter_stream_chunks(blocks, sample_rate=16000, chunk_seconds=300, search_seconds=5,
+                       overlap_seconds=0.5, frame_ms=30):
+    """
+    Trocear en silencios audio que llega por bloques, sin conocer su duración
+    
+    Mismo criterio que plan_chunks, pero cada trozo sale en cuanto se conoce su
+    corte: solo se retiene un trozo más el margen de búsqueda, así la memoria no
+    depende de la duración. Genera (audio, (inicio_decodificado, fin_decodificado,
+    inicio_propio, fin_propio)) con las posiciones en muestras absolutas.
+    """
+    chunk = int(chunk_seconds * sample_rate)
+    search = int(search_seconds * sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    
+    buffer = np.zeros(0, dtype=np.float32)
+    buffer_start = 0  # Posición absoluta de buffer[0]
+    own_start = 0
+    for block in blocks:
+        buffer = np.concatenate([buffer, np.asarray(block, dtype=np.float32)])
+        # Cortar solo cuando ya ha llegado toda la zona de búsqueda y el solape posterior
+        while buffer_start + len(buffer) >= own_start + chunk + search + overlap:
+            boundary = own_start + chunk
+            lo = max(own_start + frame_len, boundary - search)
+            hi = boundary + search
+            cut = _quietest_point(buffer[lo - buffer_start:hi - buffer_start], lo, frame_len)
+            decode_start = max(0, own_start - overlap)
+            decode_end = cut + overlap
+            yield (buffer[decode_start - buffer_start:decode_end - buffer_start].copy(),
+                   (decode_start, decode_end, own_start, cut))
+            
+            own_start = cut
+            keep_from = max(0, own_start - overlap)
+            buffer = buffer[keep_from - buffer_start:]
+            buffer_start = keep_from
+    
+    total = buffer_start + len(buffer)
+    if total > own_start:
+        decode_start = max(0, own_start - overlap)
+        yield buffer[decode_start - buffer_start:], (decode_start, total, own_start, total)
+
+
+def _normalize_words(text):
+    folded, _ = fold_text(text)
+    return re.findall(r"\w+", folded)
+
+
+def _dedupe_seam(previous_text, next_text, max_words=10):
+    """Quitar del inicio de `next_text` las palabras que repiten el final de `previous_text`"""
+    prev_words = _normalize_words(previous_text)[-max_words:]
+    next_words = _normalize_words(next_text)[:max_words]
+    
+    overlap = 0
+    for n in range(min(len(prev_words), len(next_words)), 0, -1):
+        if prev_words[-n:] == next_words[:n]:
+            overlap = n
+            break
+    if overlap == 0:
+        return next_text
+    
+    # Saltar las `overlap` primeras palabras conservando el texto original
+    matches = list(re.finditer(r"\w+", next_text))
+    if len(matches) < overlap:
+        return next_text
+    rest = next_text[matches[overlap - 1].end():].lstrip(" ,;:")
+    # Los segmentos de Whisper empiezan con espacio: conservarlo para que el texto unido no se pegue
+    return " " + rest if rest else rest
+
+
+def merge_chunk_results(results, chunks, sample_rate):
+    """
+    Unir los resultados de cada trozo en un único resultado de Whisper
+    
+    Corrige los tiempos a absolutos, descarta los segmentos de las zonas de
+    solape que pertenecen al trozo vecino y elimina texto repetido en las uniones.
+    """
+    merged_segments = []
+    merged_text = ""
+    
+    for result, (decode_start, _, own_start, own_end) in zip(results, chunks):
+        offset = decode_start / sample_rate
+        own_start_s = own_start / sample_rate
+        own_end_s = own_end / sample_rate
+        # Solo puede haber texto repetido cerca del inicio (la zona de solape)
+        seam_end = own_start_s + 2 * (own_start - decode_start) / sample_rate + 1.0
+        
+        first_in_chunk = True
+        for segment in result.get("segments", []):
+            start = segment["start"] + offset
+            end = segment["end"] + offset
+            if not own_start_s <= (start + end) / 2 < own_end_s:
+                continue
+            
+            segment = dict(segment)
+            segment["start"], segment["end"] = start, end
+            if segment.get("words"):
+                segment["words"] = [
+                    dict(word, start=word["start"] + offset, end=word["end"] + offset)
+                    for word in segment["words"]
+                ]
+            
+            if first_in_chunk and merged_segments and start < seam_end:
+                segment["text"] = _dedupe_seam(merged_text, segment["text"])
+                if not segment["text"].strip():
+                    continue
+            first_in_chunk = False
+            
+            merged_segments.append(segment)
+            merged_text += segment["text"]
+    
+    for i, segment in enumerate(merged_segments):
+        segment["id"] = i
+    
+    language = results[0].get("language") if results else None
+    return {"text": merged_text, "segments": merged_segments, "language": language}
+
+
+def _init_worker(model_size, threads, shared_weights=False):
+    """Inicializar un proceso trabajador: fijar hilos y cargar el modelo una vez"""
+    global _worker_model
+    import torch
+    torch.set_num_threads(threads)
+    if shared_weights:
+        from shared_weights import load_shared_model
+        _worker_model = load_shared_model(model_size)
+    else:
+        import whisper
+        _worker_model = whisper.load_model(model_size)
+
+
+def _transcribe_chunk(audio, options, vad=None, sample_rate=16000):
+    """
+    Decodificar un trozo en el trabajador
+    
+    Con `vad` (argumentos de detect_speech_regions) solo se decodifican las
+    regiones con voz y los tiempos se devuelven referidos al trozo completo.
+    """
+    if vad is None:
+        return _worker_model.transcribe(audio, **options)
+    regions = detect_speech_regions(audio, sample_rate, **vad)
+    if not regions:
+        return {"text": "", "segments": [], "language": options.get("language")}
+    speech, time_map = extract_speech(audio, regions, sample_rate)
+    return remap_result(_worker_model.transcribe(speech, **options), time_map)
+
+
+def create_worker_pool(model_size, workers, threads=None, shared_weights=None):
+    """
+    Crear un pool de procesos que cargan el modelo una vez cada uno
+    
+    Con `shared_weights` (por defecto, si hay varios procesos en CPU) todos
+    mapean el mismo archivo de pesos y el modelo ocupa la RAM de una sola copia.
+    """
+    if threads is None:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+    if shared_weights is None:
+        from model_registry import resolve_device
+        shared_weights = workers > 1 and resolve_device() == "cpu"
+    if shared_weights:
+        from shared_weights import ensure_weights
+        ensure_weights(model_size)  # Exportar aquí una vez, no en cada trabajador a la vez
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_size, threads, shared_weights)
+    )
+
+
+def _decode_chunks(items, sample_rate, decode=None, pool=None, max_in_flight=4, total=None, vad=None,
+                   **options):
+    """
+    Decodificar los trozos de `items` ((audio, trozo) según se leen) en orden
+    
+    Con `pool` en paralelo, sin sacar el siguiente trozo de `items` hasta que
+    haya hueco: como mucho `max_in_flight` trozos de audio viven a la vez.
+    `vad` recorta los silencios de cada trozo en el trabajador (en serie eso
+    le corresponde a `decode`). Devuelve (resultados, trozos) en el orden del audio.
+    """
+    results = []
+    chunks = []
+    count = (lambda i: f"{i}/{total}") if total else str
+    
+    if pool is not None:
+        items = iter(items)
+        pending = {}
+        exhausted = False
+        done = 0
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                item = next(items, None)
+                if item is None:
+                    exhausted = True
+                    break
+                audio, chunk = item
+                results.append(None)
+                chunks.append(chunk)
+                pending[pool.submit(_transcribe_chunk, audio, options, vad, sample_rate)] = len(chunks) - 1
+                del audio, item  # El trozo ya viaja al trabajador
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[pending.pop(future)] = future.result()
+                done += 1
+                print(f"✅ Trozo {count(done)}")
+    else:
+        for i, (audio, chunk) in enumerate(items, 1):
+            start, end = chunk[:2]
+            print(f"🔄 Trozo {count(i)} ({start / sample_rate:.0f}s - {end / sample_rate:.0f}s)")
+            chunks.append(chunk)
+            results.append(decode(audio))
+    return results, chunks
+
+
+def transcribe_long(total_samples, read, sample_rate=16000, decode=None, pool=None,
+                    chunk_seconds=300, search_seconds=5, overlap_seconds=0.5, max_in_flight=4,
+                    vad=None, **options):
+    """
+    Transcribir audio largo por trozos cortados en silencio
+    
+    Con `pool` los trozos se decodifican en paralelo en procesos trabajadores
+    (con `options` para model.transcribe: language, fp16, word_timestamps...,
+    y con `vad` solo sus regiones de voz); si no, se decodifican uno tras otro
+    en este proceso con `decode(audio)`.
+    `read(inicio, fin)` devuelve las muestras float32 de un tramo; como mucho
+    `max_in_flight` trozos se leen a la vez, así la memoria no crece con la duración.
+    """
+    chunks = plan_chunks(total_samples, sample_rate, read, chunk_seconds, search_seconds, overlap_seconds)
+    print(f"✂️  {len(chunks)} trozos cortados en silencio "
+          f"({total_samples / sample_rate / 60:.1f} min de audio)")
+    
+    items = ((np.asarray(read(chunk[0], chunk[1]), dtype=np.float32), chunk) for chunk in chunks)
+    results, chunks = _decode_chunks(items, sample_rate, decode, pool, max_in_flight, len(chunks), vad,
+                                     **options)
+    return merge_chunk_results(results, chunks, sample_rate)
+
+
+def transcribe_stream(blocks, sample_rate=16000, decode=None, pool=None, chunk_seconds=300,
+                      search_seconds=5, overlap_seconds=0.5, max_in_flight=4, vad=None, **options):
+    """
+    Transcribir audio que llega por bloques (p. ej. de ffmpeg) sin tenerlo entero
+    
+    Igual que transcribe_long, pero los cortes se deciden sobre la marcha (ver
+    iter_stream_chunks): el primer trozo se decodifica en cuanto se ha leído y
+    la memoria queda acotada a unos pocos trozos, dure lo que dure el audio.
+    """
+    items = iter_stream_chunks(blocks, sample_rate, chunk_seconds, search_seconds, overlap_seconds)
+    results, chunks = _decode_chunks(items, sample_rate, decode, pool, max_in_flight, vad=vad, **options)
+    total_samples = chunks[-1][1] if chunks else 0
+    print(f"✂️  {len(chunks)} trozos cortados en silencio "
+          f"({total_samples / sample_rate / 60:.1f} min de audio, leídos por bloques)")
+    return merge_chunk_results(results, chunks, sample_rate)
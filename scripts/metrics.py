@@ -0,0 +1,253 @@
+import math
+import os
+import tempfile
+import threading
+
+# Latencias típicas: de decenas de milisegundos a varios minutos
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5)
+
+
+class Counter:
+    """Contador monótono"""
+    
+    kind = "counter"
+    
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+    
+    @property
+    def value(self):
+        return self._value
+    
+    def samples(self):
+        return [(self.name, self._value)]
+
+
+class Gauge:
+    """Valor que sube y baja; con `function` se lee en el momento de exportar"""
+    
+    kind = "gauge"
+    
+    def __init__(self, name, help_text, function=None):
+        self.name = name
+        self.help = help_text
+        self._value = 0.0
+        self._function = function
+    
+    def set(self, value):
+        self._value = value
+    
+    def set_function(self, function):
+        self._function = function
+    
+    @property
+    def value(self):
+        if self._function is not None:
+            try:
+                return float(self._function())
+            except Exception:
+                return math.nan
+        return self._value
+    
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Histogram:
+    """Histograma acumulativo por cubetas, como los de Prometheus"""
+    
+    kind = "histogram"
+    
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # La última es +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            else:
+                self._counts[-1] += 1
+            self._sum += value
+            self._count += 1
+    
+    @property
+    def count(self):
+        return self._count
+    
+    def quantile(self, q):
+        """Estimar un percentil interpolando dentro de la cubeta (como histogram_quantile)"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._count
+        if total == 0:
+            return None
+        
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for i, bound in enumerate(self.buckets):
+            if cumulative + counts[i] >= rank:
+                if counts[i] == 0:
+                    return bound
+                return lower + (bound - lower) * (rank - cumulative) / counts[i]
+            cumulative += counts[i]
+            lower = bound
+        return self.buckets[-1]  # El percentil cae en +Inf
+    
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total = self._count
+        
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket{{le="{bound:g}"}}', cumulative))
+        samples.append((f'{self.name}_bucket{{le="+Inf"}}', total))
+        samples.append((f"{self.name}_sum", total_sum))
+        samples.append((f"{self.name}_count", total))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso (contadores, gauges e histogramas)
+    
+    Se exporta en el formato de texto de Prometheus, por un endpoint HTTP local
+    (start_http_server) o escribiendo un archivo cada cierto tiempo
+    (start_file_exporter), compatible con el textfile collector de node_exporter.
+    """
+    
+    def __init__(self, prefix="transcriber_"):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._exporters = []
+    
+    def _get_or_create(self, cls, name, help_text, **kwargs):
+        name = self.prefix + name
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"La métrica {name} ya existe con otro tipo")
+            return metric
+    
+    def counter(self, name, help_text=""):
+        return self._get_or_create(Counter, name, help_text)
+    
+    def gauge(self, name, help_text="", function=None):
+        gauge = self._get_or_create(Gauge, name, help_text)
+        if function is not None:
+            gauge.set_function(function)
+        return gauge
+    
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+    
+    def render(self):
+        """Texto en formato de exposición de Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        
+        lines = []
+        for metric in metrics:
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, value in metric.samples():
+                lines.append(f"{sample_name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+    
+    def write_file(self, path):
+        """Escribir las métricas de forma atómica (nunca se lee un archivo a medias)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+        return path
+    
+    def start_http_server(self, port=9464, host="127.0.0.1"):
+        """Servir /metrics en un hilo en segundo plano (solo en local por defecto)"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+        
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass  # No ensuciar la consola con cada petición
+        
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self._exporters.append(server.shutdown)
+        return server
+    
+    def start_file_exporter(self, path, interval=15.0):
+        """Reescribir `path` cada `interval` segundos en un hilo en segundo plano"""
+        stop = threading.Event()
+        
+        def _loop():
+            while True:
+                try:
+                    self.write_file(path)
+                except OSError:
+                    pass  # Reintentar en la siguiente vuelta
+                if stop.wait(interval):
+                    break
+        
+        threading.Thread(target=_loop, daemon=True).start()
+        
+        def _stop():
+            stop.set()
+            self.write_file(path)  # Dejar los valores finales
+        
+        self._exporters.append(_stop)
+        return stop
+    
+    def stop_exporters(self):
+        for stop in self._exporters:
+            stop()
+        self._exporters = []
+
+
+def _format_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
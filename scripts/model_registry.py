@@ -0,0 +1,118 @@
+import gc
+import threading
+from collections import OrderedDict
+
+
+def resolve_device(device=None):
+    """Dispositivo efectivo en el que Whisper cargaría el modelo"""
+    if device:
+        return device
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def model_memory_bytes(model):
+    """Memoria ocupada por los pesos (parámetros y buffers) de un modelo torch"""
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def load_whisper_model(name, device, precision):
+    """Cargador por defecto: whisper.load_model con la precisión pedida"""
+    import whisper
+    model = whisper.load_model(name, device=device)
+    if precision == "fp16":
+        model = model.half()
+    return model
+
+
+class ModelRegistry:
+    """
+    Caché de modelos Whisper residentes en memoria
+
+    Los modelos se identifican por (nombre, dispositivo, precisión). Se mantienen
+    cargados varios a la vez mientras su tamaño total no supere el presupuesto
+    de memoria; al superarlo se descarta el usado hace más tiempo (LRU).
+    """
+
+    def __init__(self, max_memory_mb=4096, loader=load_whisper_model):
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._loader = loader
+        self._models = OrderedDict()  # clave -> (modelo, bytes)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(name, device=None, precision="fp32"):
+        return (name, resolve_device(device), precision)
+
+    def get(self, name, device=None, precision="fp32"):
+        """Devolver el modelo si ya está en memoria (y marcarlo como usado), o None"""
+        with self._lock:
+            if not any(key[0] == name for key in self._models):
+                # Sin resolver el dispositivo: con device=None eso importaría torch
+                return None
+        key = self.make_key(name, device, precision)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is None:
+                return None
+            self._models.move_to_end(key)
+            return entry[0]
+
+    def load(self, name, device=None, precision="fp32"):
+        """
+        Devolver el modelo, cargándolo si no está en memoria
+
+        Devuelve (modelo, recien_cargado). La carga se hace fuera del cerrojo
+        para no bloquear las consultas de otros hilos.
+        """
+        model = self.get(name, device, precision)
+        if model is not None:
+            return model, False
+
+        key = self.make_key(name, device, precision)
+        model = self._loader(name, key[1], precision)
+        size = model_memory_bytes(model)
+
+        with self._lock:
+            # Otro hilo pudo cargar el mismo modelo mientras tanto
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0], False
+            self._models[key] = (model, size)
+            evicted = self._evict_over_budget(keep=key)
+
+        if evicted:
+            self._release_memory()
+        return model, True
+
+    def _evict_over_budget(self, keep):
+        """Descartar modelos LRU hasta caber en el presupuesto (nunca `keep`)"""
+        evicted = []
+        while self.total_bytes() > self.max_memory_bytes:
+            oldest = next((k for k in self._models if k != keep), None)
+            if oldest is None:
+                break  # Solo queda el modelo recién cargado, aunque no quepa
+            del self._models[oldest]
+            evicted.append(oldest)
+        return evicted
+
+    def _release_memory(self):
+        """Devolver al sistema la memoria de los modelos descartados"""
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def total_bytes(self):
+        return sum(size for _, size in self._models.values())
+
+    def loaded(self):
+        """Lista de (clave, MB) de los modelos residentes, del menos al más reciente"""
+        with self._lock:
+            return [(key, size / (1024 * 1024)) for key, (_, size) in self._models.items()]
@@ -0,0 +1,118 @@
+import queue
+import threading
+
+_STOP = object()
+
+
+class SessionPipeline:
+    """
+    Pipeline productor/consumidor por etapas para las sesiones de grabación
+    
+    Cada etapa corre en su propio hilo y se comunica con la siguiente mediante
+    una cola acotada. Como cada etapa procesa su cola en orden FIFO, los
+    resultados salen en el mismo orden en que se grabaron las sesiones.
+    
+    Política de contrapresión cuando la transcripción va por detrás de la
+    captura (cola de entrada llena):
+      - "block": submit() espera a que haya hueco (la siguiente grabación se retrasa)
+      - "drop_oldest": se descarta la sesión pendiente más antigua aún sin procesar
+    """
+    
+    POLICIES = ("block", "drop_oldest")
+    
+    def __init__(self, stages, max_pending=2, backpressure="block", on_error=None, on_drop=None):
+        if backpressure not in self.POLICIES:
+            raise ValueError(f"Política de contrapresión desconocida: {backpressure}")
+        
+        self.backpressure = backpressure
+        self.dropped = 0
+        self._on_error = on_error
+        self._on_drop = on_drop
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        
+        self._queues = [queue.Queue(maxsize=max_pending) for _ in stages]
+        self._threads = []
+        for i, (name, func) in enumerate(stages):
+            out_queue = self._queues[i + 1] if i + 1 < len(stages) else None
+            thread = threading.Thread(
+                target=self._run_stage,
+                args=(name, func, self._queues[i], out_queue),
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+    
+    def is_full(self):
+        """True si una nueva sesión tendría que esperar o desplazaría a otra"""
+        return self._queues[0].full()
+    
+    def pending(self):
+        """Sesiones enviadas que aún no han terminado todas las etapas"""
+        with self._lock:
+            return self._pending
+    
+    def submit(self, item):
+        """Encolar una sesión aplicando la política de contrapresión"""
+        with self._lock:
+            self._pending += 1
+        
+        first = self._queues[0]
+        if self.backpressure == "block":
+            first.put(item)
+            return
+        
+        while True:
+            try:
+                first.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    dropped = first.get_nowait()
+                except queue.Empty:
+                    continue
+                self.dropped += 1
+                self._finish_item()
+                if self._on_drop:
+                    self._on_drop(dropped)
+    
+    def _finish_item(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.notify_all()
+    
+    def _run_stage(self, name, func, in_queue, out_queue):
+        """Bucle de una etapa: procesar en orden y pasar el resultado a la siguiente"""
+        while True:
+            item = in_queue.get()
+            if item is _STOP:
+                if out_queue is not None:
+                    out_queue.put(_STOP)
+                return
+            
+            try:
+                result = func(item)
+            except Exception as e:
+                # Una sesión con error no continúa por las etapas siguientes
+                if self._on_error:
+                    self._on_error(name, item, e)
+                self._finish_item()
+                continue
+            
+            if out_queue is not None:
+                out_queue.put(result)
+            else:
+                self._finish_item()
+    
+    def wait_idle(self, timeout=None):
+        """Esperar a que terminen todas las sesiones pendientes"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+    
+    def close(self):
+        """Procesar lo pendiente y detener los hilos de las etapas"""
+        self._queues[0].put(_STOP)
+        for thread in self._threads:
+            thread.join()
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import tempfile
+
+CACHE_VERSION = 1
+EVICT_TO = 0.9  # Al pasarse, desalojar hasta este fragmento del máximo: no recorrer en cada put
+
+
+def hash_file(path, block_size=1 << 20):
+    """SHA-256 del contenido de un archivo, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _json_default(value):
+    # Escalares y arrays de NumPy que Whisper deja en algunos campos
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"No serializable: {type(value).__name__}")
+
+
+class ResultCache:
+    """
+    Caché en disco de resultados de transcripción, direccionada por contenido
+    
+    La clave es el hash del audio más el modelo, el idioma y las opciones de
+    decodificación, así que renombrar o mover un archivo no invalida su entrada
+    y cambiar cualquier opción produce otra distinta.
+    
+    Es segura entre procesos sin cerrojos: cada entrada se escribe en un archivo
+    temporal y se publica con os.replace (atómico), y tanto lecturas como
+    desalojos toleran que otro proceso haya borrado la entrada. La fecha de
+    modificación marca el último uso y se desalojan primero las más antiguas.
+    
+    El tamaño total se lleva en memoria (se recorre el directorio una vez, la
+    primera vez que hace falta) y solo se vuelve a recorrer al desalojar. Si
+    otro proceso escribe entradas, se le informa con track(); así en modo lote
+    los trabajadores escriben con track=False y el proceso principal lleva la cuenta.
+    """
+    
+    def __init__(self, directory, max_size_mb=1024):
+        self.directory = directory
+        self.max_bytes = int(max_size_mb * 2**20)
+        self._size = None  # Bytes en disco según esta instancia; None hasta recorrer el directorio
+        os.makedirs(directory, exist_ok=True)
+    
+    @staticmethod
+    def make_key(audio_hash, model_size, language, options=None):
+        params = {
+            "version": CACHE_VERSION,
+            "audio": audio_hash,
+            "model": model_size,
+            "language": language,
+            "options": options or {}
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+    
+    def key_for_file(self, audio_path, model_size, language, options=None):
+        return self.make_key(hash_file(audio_path), model_size, language, options)
+    
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+    
+    def get(self, key):
+        """Resultado guardado para la clave, o None si no está"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)  # Marcar como usada recientemente
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return result
+    
+    def put(self, key, result, track=True):
+        """Guardar un resultado y desalojar entradas antiguas si se supera el tamaño máximo"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous = self._file_size(path) if track else 0
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, default=_json_default)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        if track:
+            self._add(self._file_size(path) - previous)
+    
+    def track(self, key):
+        """Sumar al tamaño llevado una entrada nueva que escribió otro proceso"""
+        self._add(self._file_size(self._path(key)))
+    
+    @staticmethod
+    def _file_size(path):
+        try:
+            return os.stat(path).st_size
+        except FileNotFoundError:
+            return 0
+    
+    def _add(self, size):
+        if self._size is None:
+            self._size = self.size_bytes()  # Ya incluye la entrada recién escrita
+        else:
+            self._size += size
+        if self._size > self.max_bytes:
+            self.evict(int(self.max_bytes * EVICT_TO))
+    
+    def _entries(self):
+        """(mtime, tamaño, ruta) de cada entrada publicada"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+    
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+    
+    def evict(self, target=None):
+        """Borrar las entradas menos usadas hasta quedar por debajo de `target` (por defecto el máximo)"""
+        target = self.max_bytes if target is None else target
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass  # Otro proceso ya la desalojó
+            total -= size
+        self._size = total
+        return removed
+    
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._size = 0
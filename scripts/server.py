@@ -0,0 +1,600 @@
+import argparse
+import io
+import json
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from audio_buffer import AudioBuffer
+from batching import BatchScheduler, QueueFull, decode_batch, is_batchable
+from audio_dsp import PolyphaseResampler, chunk_rms, detect_speech_regions, extract_speech, remap_result
+from metrics import MetricsRegistry, RTF_BUCKETS
+from model_registry import ModelRegistry
+import ws_protocol
+
+WHISPER_RATE = 16000
+MAX_BODY_BYTES = 512 * 2**20  # Cuerpo de POST /transcribe: horas de audio comprimido, no más
+
+
+def parse_rate(params):
+    """Tasa de muestreo de ?rate=N (por defecto la de Whisper); ValueError si no es un entero positivo"""
+    value = params.get("rate", [str(WHISPER_RATE)])[0]
+    try:
+        rate = int(value)
+    except ValueError:
+        rate = 0
+    if rate <= 0:
+        raise ValueError(f"rate no válido: {value!r} (se espera un entero positivo, p. ej. 16000)")
+    return rate
+
+
+def read_wav_pcm16(data):
+    """Muestras int16 de un WAV mono de 16 bits a 16 kHz, o None si el WAV no es así"""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (WHISPER_RATE, 1, 2):
+                return None
+            return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    except (wave.Error, EOFError):
+        return None
+
+
+def decode_audio_bytes(data, sample_rate=WHISPER_RATE):
+    """Decodificar audio (cualquier formato que entienda ffmpeg) a float32 mono"""
+    if sample_rate == WHISPER_RATE:
+        samples = read_wav_pcm16(data)
+        if samples is not None:
+            return samples.astype(np.float32) / 32768.0  # Ya en el formato de Whisper: sin ffmpeg
+    
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+           "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+    try:
+        proc = subprocess.run(cmd, input=data, capture_output=True)
+    except FileNotFoundError:
+        raise ValueError("ffmpeg no encontrado: envía WAV mono a 16 kHz o PCM (?format=pcm16)") from None
+    if proc.returncode != 0:
+        raise ValueError(f"ffmpeg no pudo decodificar el audio: {proc.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(proc.stdout, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+class FfmpegStreamDecoder:
+    """
+    Decodificación incremental de audio comprimido (webm/opus, ogg, mp3...)
+    
+    Los bytes que llegan se escriben en la entrada de un ffmpeg y un hilo lee
+    el PCM int16 a 16 kHz de su salida y lo entrega a `on_samples` según sale.
+    """
+    
+    def __init__(self, on_samples, sample_rate=WHISPER_RATE, read_bytes=6400):
+        self._on_samples = on_samples
+        self._read_bytes = read_bytes
+        self._proc = subprocess.Popen(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+    
+    def _read_loop(self):
+        leftover = b""
+        while True:
+            data = self._proc.stdout.read1(self._read_bytes)  # Lo que haya, sin esperar a llenar
+            if not data:
+                break
+            data = leftover + data
+            usable = len(data) - len(data) % 2
+            leftover = data[usable:]
+            if usable:
+                self._on_samples(np.frombuffer(data[:usable], dtype=np.int16))
+    
+    def feed(self, data):
+        """Entregar bytes a ffmpeg; ValueError si ya no los acepta (p. ej. formato no válido)"""
+        try:
+            self._proc.stdin.write(data)
+            self._proc.stdin.flush()
+        except OSError as e:  # BrokenPipeError: ffmpeg ha terminado
+            raise ValueError(f"ffmpeg dejó de aceptar audio ({e.strerror or e}); ¿formato no válido?") from None
+    
+    def close(self):
+        """Cerrar la entrada y esperar a que salga todo el audio pendiente"""
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        self._reader.join()
+        self._proc.wait()
+
+
+class TranscriptionService:
+    """
+    Un modelo Whisper caliente compartido por todas las conexiones
+    
+    Las peticiones entran en una cola acotada y un único hilo las decodifica
+    (el modelo no se usa desde varios hilos a la vez). Con la cola llena,
+    submit() rechaza la petición (QueueFull) o espera hueco si se pide `block`.
+    Cada petición devuelve su latencia desglosada en espera en cola y
+    decodificación. Usa el mismo recorte de silencios (VAD) que la v2.
+    
+    Con max_batch > 1 los enunciados cortos de varias fuentes que llegan en
+    menos de `max_wait_ms` se decodifican juntos en un solo lote (ver
+    batching.py); los de más de 30 s siguen por model.transcribe uno a uno.
+    """
+    
+    def __init__(self, model_size="base", language="es", max_queue=8, device=None,
+                 silence_detection=True, silence_threshold=0.01, vad_hangover_ms=300, metrics=None,
+                 max_batch=1, max_wait_ms=10.0):
+        self.model_size = model_size
+        self.language = language
+        self.device = device
+        self.silence_detection = silence_detection
+        self.silence_threshold = silence_threshold
+        self.vad_hangover_ms = vad_hangover_ms
+        self.model_registry = ModelRegistry()
+        self.model = None
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.max_wait_ms = max_wait_ms
+        self._scheduler = None
+        
+        self.metrics = metrics or MetricsRegistry(prefix="transcriber_server_")
+        m = self.metrics
+        m.counter("requests_total", "Peticiones transcritas")
+        m.counter("request_errors_total", "Peticiones con error de decodificación")
+        m.counter("requests_rejected_total", "Peticiones rechazadas con la cola llena")
+        m.counter("audio_seconds_total", "Segundos de audio transcritos")
+        m.counter("batches_total", "Lotes decodificados")
+        m.histogram("batch_size", "Peticiones por lote", (1, 2, 4, 8, 16, 32))
+        m.histogram("queue_seconds", "Espera en cola por petición")
+        m.histogram("decode_seconds", "Decodificación por petición (la del lote completo)")
+        m.histogram("request_seconds", "Latencia total por petición (cola + decodificación)")
+        m.histogram("rtf", "Factor de tiempo real por lote", RTF_BUCKETS)
+        m.gauge("queue_depth", "Peticiones esperando en la cola",
+                function=lambda: self._scheduler.queue_depth() if self._scheduler else 0)
+        m.gauge("pending", "Peticiones en cola o decodificándose", function=self.pending)
+    
+    def start(self):
+        """Cargar el modelo (bloquea), calentarlo y arrancar el planificador"""
+        start = time.perf_counter()
+        self.model, fresh = self.model_registry.load(self.model_size, self.device)
+        if fresh:
+            # Calentamiento: la primera inferencia reserva memoria y prepara los kernels
+            self.model.transcribe(np.zeros(WHISPER_RATE, dtype=np.float32), language=self.language,
+                                  verbose=None, condition_on_previous_text=False, fp16=False)
+        print(f"✅ Modelo {self.model_size} listo en {time.perf_counter() - start:.1f}s")
+        
+        self._scheduler = BatchScheduler(
+            self._process_batch,
+            max_batch=self.max_batch,
+            max_wait_ms=self.max_wait_ms if self.max_batch > 1 else 0.0,
+            max_queue=self.max_queue,
+            on_batch=self._record_batch
+        )
+    
+    def pending(self):
+        return self._scheduler.pending() if self._scheduler else 0
+    
+    def submit(self, audio, label="", block=False, timeout=None):
+        """Encolar un array float32 a 16 kHz; QueueFull si no hay hueco"""
+        try:
+            return self._scheduler.submit(audio, label, block=block, timeout=timeout)
+        except QueueFull:
+            self.metrics.counter("requests_rejected_total").inc()
+            raise
+    
+    def _process_batch(self, audios):
+        """Un resultado (o la excepción) por audio del lote"""
+        if self.max_batch == 1:
+            return [self._safe(self.transcribe_speech, audio) for audio in audios]
+        
+        # VAD de cada enunciado; los que caben en una ventana van juntos al modelo
+        results = [None] * len(audios)
+        batch = []  # (posición, voz, mapa de tiempos)
+        for i, audio in enumerate(audios):
+            speech_np, time_map = self._speech(audio)
+            if speech_np is None:
+                results[i] = {"text": "", "segments": [], "language": self.language}
+            elif is_batchable(speech_np):
+                batch.append((i, speech_np, time_map))
+            else:
+                results[i] = self._safe(self.transcribe_speech, audio)
+        
+        if batch:
+            try:
+                decoded = decode_batch(self.model, [speech for _, speech, _ in batch], self.language)
+            except Exception as e:
+                decoded = [e] * len(batch)
+            for (i, _, time_map), result in zip(batch, decoded):
+                if time_map is not None and not isinstance(result, Exception):
+                    remap_result(result, time_map)
+                results[i] = result
+        return results
+    
+    @staticmethod
+    def _safe(func, *args):
+        try:
+            return func(*args)
+        except Exception as e:
+            return e
+    
+    def _record_batch(self, jobs, seconds):
+        m = self.metrics
+        m.counter("batches_total").inc()
+        m.histogram("batch_size").observe(len(jobs))
+        m.histogram("decode_seconds").observe(seconds)
+        audio_seconds = 0.0
+        for job in jobs:
+            if job.error is not None:
+                m.counter("request_errors_total").inc()
+                print(f"❌ Error en la petición {job.label}: {job.error}")
+                continue
+            m.counter("requests_total").inc()
+            m.histogram("queue_seconds").observe(job.latency["cola"])
+            m.histogram("request_seconds").observe(job.latency["total"])
+            audio_seconds += len(job.payload) / WHISPER_RATE
+        m.counter("audio_seconds_total").inc(audio_seconds)
+        if audio_seconds > 0:
+            m.histogram("rtf").observe(seconds / audio_seconds)
+    
+    def _speech(self, audio_np):
+        """(voz, mapa de tiempos) tras el VAD; (None, None) si no hay voz"""
+        if not self.silence_detection:
+            return audio_np, None
+        regions = detect_speech_regions(audio_np, WHISPER_RATE, threshold=self.silence_threshold,
+                                        hangover_ms=self.vad_hangover_ms)
+        if not regions:
+            return None, None
+        return extract_speech(audio_np, regions, WHISPER_RATE)
+    
+    def transcribe_speech(self, audio_np):
+        """Transcribir solo las regiones con voz y devolver tiempos del audio original"""
+        speech_np, time_map = self._speech(audio_np)
+        if speech_np is None:
+            return {"text": "", "segments": [], "language": self.language}
+        result = self._transcribe(speech_np)
+        if time_map is not None:
+            remap_result(result, time_map)
+        return result
+    
+    def _transcribe(self, audio_np):
+        return self.model.transcribe(
+            audio_np,
+            language=self.language,
+            word_timestamps=True,
+            verbose=None,
+            condition_on_previous_text=False,
+            fp16=False
+        )
+    
+    def close(self):
+        if self._scheduler is not None:
+            self._scheduler.close()
+
+
+def _segments(result, offset=0.0):
+    """Segmentos para enviar al cliente (tiempos desplazados al inicio del stream)"""
+    return [
+        {"start": round(seg["start"] + offset, 3), "end": round(seg["end"] + offset, 3),
+         "text": seg["text"].strip()}
+        for seg in result.get("segments", [])
+    ]
+
+
+class StreamSession:
+    """
+    Transcripción de un stream de audio recibido por WebSocket
+    
+    El audio se acumula en un AudioBuffer y se corta en enunciados con la misma
+    detección de fin de frase que la grabación de la v2 (silencio tras la voz).
+    Cada enunciado va a la cola del servicio y un hilo envía los resultados al
+    cliente en orden, con sus tiempos referidos al inicio del stream. Si la cola
+    está llena se espera hueco: la lectura del socket se frena y el cliente
+    nota la contrapresión por TCP.
+    """
+    
+    def __init__(self, service, ws, endpoint_silence_sec=0.6, max_utterance_sec=30.0, label=""):
+        self.service = service
+        self.ws = ws
+        self.label = label
+        self.endpoint_samples = int(endpoint_silence_sec * WHISPER_RATE)
+        self.max_samples = int(max_utterance_sec * WHISPER_RATE)
+        self.buffer = AudioBuffer(WHISPER_RATE, initial_seconds=max_utterance_sec)
+        self.offset_samples = 0  # Posición en el stream del inicio del buffer
+        self.speech_heard = False
+        self.trailing_silence = 0
+        self.utterances = 0
+        self._results = queue.Queue()
+        self._sender = threading.Thread(target=self._send_loop, daemon=True)
+        self._sender.start()
+    
+    def feed(self, samples):
+        """Añadir muestras int16 a 16 kHz y cortar un enunciado si ha terminado"""
+        self.buffer.append(samples)
+        if len(samples):
+            if chunk_rms(samples) >= self.service.silence_threshold:
+                self.speech_heard = True
+                self.trailing_silence = 0
+            elif self.speech_heard:
+                self.trailing_silence += len(samples)
+        
+        if self.speech_heard and self.trailing_silence >= self.endpoint_samples:
+            self._cut()
+        elif len(self.buffer) >= self.max_samples:
+            if self.speech_heard:
+                self._cut()
+            else:
+                self._reset(len(self.buffer))  # Solo silencio: descartarlo
+    
+    def _reset(self, consumed):
+        self.offset_samples += consumed
+        self.buffer = AudioBuffer(WHISPER_RATE, initial_seconds=self.max_samples / WHISPER_RATE)
+        self.speech_heard = False
+        self.trailing_silence = 0
+    
+    def _cut(self):
+        audio = self.buffer.to_float32()
+        offset = self.offset_samples / WHISPER_RATE
+        self._reset(len(audio))
+        self.utterances += 1
+        job = self.service.submit(audio, f"{self.label}#{self.utterances}", block=True)
+        self._results.put((self.utterances, offset, job))
+    
+    def finish(self):
+        """Transcribir lo que quede y esperar a que se envíen todos los resultados"""
+        if self.speech_heard:
+            self._cut()
+        self._results.put(None)
+        self._sender.join()
+    
+    def _send_loop(self):
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            number, offset, job = item
+            try:
+                result = job.wait()
+                message = {
+                    "type": "utterance",
+                    "utterance": number,
+                    "text": result["text"].strip(),
+                    "segments": _segments(result, offset),
+                    "latency": job.latency
+                }
+            except Exception as e:
+                message = {"type": "error", "utterance": number, "error": str(e)}
+            try:
+                self.ws.send_json(message)
+            except OSError:
+                pass  # El cliente se fue; se siguen consumiendo los trabajos
+
+
+def make_handler(service, args):
+    """Clase de manejador HTTP ligada al servicio"""
+    counter = {"n": 0}
+    counter_lock = threading.Lock()
+    
+    def _next_id():
+        with counter_lock:
+            counter["n"] += 1
+            return counter["n"]
+    
+    class _Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        
+        def _send_json(self, status, obj, headers=None):
+            body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/stream" and self.headers.get("Upgrade", "").lower() == "websocket":
+                self._handle_stream(parse_qs(url.query))
+            elif url.path == "/health":
+                self._send_json(200, {"status": "ok", "model": service.model_size, "pending": service.pending()})
+            elif url.path == "/metrics":
+                body = service.metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {"error": "ruta desconocida"})
+        
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path != "/transcribe":
+                self._send_json(404, {"error": "ruta desconocida"})
+                return
+            params = parse_qs(url.query)
+            request_id = _next_id()
+            received = time.perf_counter()
+            
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                length = -1
+            if length < 0 or length > MAX_BODY_BYTES:
+                # El cuerpo no se lee: cerrar para que no se interprete como otra petición
+                self.close_connection = True
+                if length < 0:
+                    self._send_json(400, {"error": "Content-Length no válido"})
+                else:
+                    self._send_json(413, {"error": f"cuerpo demasiado grande (máximo {MAX_BODY_BYTES // 2**20} MB)"})
+                return
+            data = self.rfile.read(length)
+            try:
+                audio = self._decode_body(data, params)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            
+            try:
+                job = service.submit(audio, f"http#{request_id}")
+            except QueueFull as e:
+                self._send_json(503, {"error": str(e)}, {"Retry-After": "1"})
+                return
+            try:
+                result = job.wait()
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            
+            latency = dict(job.latency, peticion=round(time.perf_counter() - received, 4))
+            audio_seconds = round(len(audio) / WHISPER_RATE, 3)
+            print(f"📨 http#{request_id}: {audio_seconds:.1f}s de audio | cola {latency['cola']:.2f}s | "
+                  f"decodificar {latency['decodificar']:.2f}s (lote de {latency['lote']}) | "
+                  f"total {latency['peticion']:.2f}s")
+            self._send_json(200, {
+                "text": result["text"].strip(),
+                "segments": _segments(result),
+                "language": result.get("language", service.language),
+                "audio_seconds": audio_seconds,
+                "latency": latency
+            })
+        
+        def _decode_body(self, data, params):
+            """PCM int16 crudo (?format=pcm16&rate=N) o cualquier formato vía ffmpeg"""
+            if params.get("format", [""])[0] == "pcm16" or self.headers.get("Content-Type", "").startswith("audio/L16"):
+                rate = parse_rate(params)
+                samples = np.frombuffer(data[:len(data) - len(data) % 2], dtype=np.int16)
+                if rate != WHISPER_RATE:
+                    samples = PolyphaseResampler(rate, WHISPER_RATE).process_int16(samples)
+                return samples.astype(np.float32) / 32768.0
+            return decode_audio_bytes(data)
+        
+        def _handle_stream(self, params):
+            key = self.headers.get("Sec-WebSocket-Key")
+            if not key:
+                self._send_json(400, {"error": "falta Sec-WebSocket-Key"})
+                return
+            # Validar los parámetros antes de aceptar la conexión: un error aún es un 400 normal
+            audio_format = params.get("format", ["pcm16"])[0]
+            try:
+                rate = parse_rate(params)
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            if audio_format != "pcm16" and shutil.which("ffmpeg") is None:
+                self._send_json(400, {"error": "ffmpeg no encontrado: envía PCM int16 (format=pcm16)"})
+                return
+            self.send_response(101, "Switching Protocols")
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", ws_protocol.accept_key(key))
+            self.end_headers()
+            self.wfile.flush()
+            self.close_connection = True
+            
+            ws = ws_protocol.WebSocket(self.rfile, self.wfile)
+            label = f"ws#{_next_id()}"
+            session = StreamSession(service, ws, args.fin_frase, args.max_enunciado, label)
+            started = time.perf_counter()
+            
+            if audio_format == "pcm16":
+                resampler = PolyphaseResampler(rate, WHISPER_RATE) if rate != WHISPER_RATE else None
+                decoder = None
+            else:
+                resampler = None
+                decoder = FfmpegStreamDecoder(session.feed)
+            
+            ws.send_json({"type": "ready", "model": service.model_size, "sample_rate": WHISPER_RATE})
+            leftover = b""
+            try:
+                while True:
+                    opcode, payload = ws.receive()
+                    if opcode == ws_protocol.OP_CLOSE:
+                        break
+                    if opcode == ws_protocol.OP_TEXT:
+                        message = json.loads(payload or b"{}")
+                        if message.get("type") in ("end", "fin"):
+                            break
+                        continue
+                    if decoder is not None:
+                        decoder.feed(payload)
+                        continue
+                    data = leftover + payload
+                    usable = len(data) - len(data) % 2
+                    leftover = data[usable:]
+                    samples = np.frombuffer(data[:usable], dtype=np.int16)
+                    if resampler is not None:
+                        samples = resampler.process_int16(samples)
+                    session.feed(samples)
+            except (ValueError, ws_protocol.ProtocolError) as e:
+                ws.send_json({"type": "error", "error": str(e)})
+            finally:
+                if decoder is not None:
+                    decoder.close()
+                session.finish()
+            
+            elapsed = time.perf_counter() - started
+            print(f"🔌 {label}: {session.utterances} enunciado(s) en {elapsed:.1f}s")
+            if not ws.closed:
+                ws.send_json({"type": "done", "utterances": session.utterances})
+                ws.close()
+        
+        def log_message(self, format, *args):
+            pass  # Cada petición ya imprime su resumen
+    
+    return _Handler
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Servidor local de transcripción con un modelo Whisper caliente")
+    parser.add_argument("-m", "--modelo", default="base", help="Modelo Whisper (por defecto: base)")
+    parser.add_argument("-l", "--idioma", default="es", help="Idioma (por defecto: es)")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección de escucha (por defecto solo local)")
+    parser.add_argument("-p", "--puerto", type=int, default=8765, help="Puerto HTTP/WebSocket")
+    parser.add_argument("--cola", type=int, default=8, help="Peticiones en cola como máximo")
+    parser.add_argument("--fin-frase", type=float, default=0.6,
+                        help="Segundos de silencio que cierran un enunciado en streaming")
+    parser.add_argument("--max-enunciado", type=float, default=30.0,
+                        help="Segundos máximos de un enunciado en streaming")
+    parser.add_argument("--sin-vad", action="store_true", help="No recortar silencios antes de Whisper")
+    parser.add_argument("--lote", type=int, default=1,
+                        help="Enunciados cortos por lote de decodificación (1 = uno a uno)")
+    parser.add_argument("--espera-ms", type=float, default=10.0,
+                        help="Milisegundos que se espera a completar un lote")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    service = TranscriptionService(args.modelo, args.idioma, max_queue=args.cola,
+                                   silence_detection=not args.sin_vad,
+                                   max_batch=args.lote, max_wait_ms=args.espera_ms)
+    print(f"🚀 Cargando modelo {args.modelo}...")
+    service.start()
+    
+    server = ThreadingHTTPServer((args.host, args.puerto), make_handler(service, args))
+    server.daemon_threads = True
+    print(f"🎧 Escuchando en http://{args.host}:{args.puerto}")
+    print(f"   • POST /transcribe           archivo completo (cualquier formato, o ?format=pcm16&rate=N)")
+    print(f"   • ws://{args.host}:{args.puerto}/stream  audio PCM int16 por trozos (?format=webm para comprimido)")
+    print(f"   • GET /health, GET /metrics")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Cerrando servidor...")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
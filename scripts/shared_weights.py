@@ -0,0 +1,164 @@
+import gc
+import json
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "transcriptor", "pesos")
+FORMAT_VERSION = 1
+_ALIGNMENT = 64  # Cada tensor empieza alineado para que la vista sobre el mapa sea directa
+
+
+def _whisper_version():
+    try:
+        from importlib.metadata import version
+        return version("openai-whisper")
+    except Exception:
+        return None
+
+
+def weights_path(name, directory=DEFAULT_DIR):
+    return os.path.join(directory, f"{name}-fp32")
+
+
+def export_weights(model, name, directory=DEFAULT_DIR):
+    """
+    Volcar los pesos de un modelo a un archivo plano mapeable en memoria
+    
+    Se escribe pesos.bin (los tensores uno tras otro, alineados) e indice.json
+    (dimensiones del modelo y posición, forma y tipo de cada tensor). Se publica
+    con os.replace, así que otro proceso nunca ve una exportación a medias.
+    """
+    import dataclasses
+    target = weights_path(name, directory)
+    os.makedirs(directory, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=directory, prefix=".exportando-")
+    
+    index = {
+        "version": FORMAT_VERSION,
+        "whisper": _whisper_version(),
+        "name": name,
+        "dims": dataclasses.asdict(model.dims),
+        "tensors": {}
+    }
+    try:
+        offset = 0
+        with open(os.path.join(tmp_dir, "pesos.bin"), "wb") as f:
+            for key, tensor in model.state_dict().items():
+                array = tensor.detach().cpu().float().contiguous().numpy()
+                padding = (-offset) % _ALIGNMENT
+                f.write(b"\0" * padding)
+                offset += padding
+                index["tensors"][key] = {"offset": offset, "shape": list(array.shape), "dtype": str(array.dtype)}
+                f.write(array.tobytes())
+                offset += array.nbytes
+        with open(os.path.join(tmp_dir, "indice.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp_dir, target)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.exists(os.path.join(target, "indice.json")):
+            raise  # Si otro proceso ya la publicó, vale la suya
+    return target
+
+
+def _read_index(path):
+    try:
+        with open(os.path.join(path, "indice.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ensure_weights(name, directory=DEFAULT_DIR):
+    """
+    Ruta de los pesos exportados de `name`, exportándolos la primera vez
+    
+    La exportación carga el modelo una vez en este proceso y lo libera al
+    terminar; se repite si cambia la versión de whisper instalada.
+    """
+    path = weights_path(name, directory)
+    index = _read_index(path)
+    if index is not None and index.get("version") == FORMAT_VERSION and index.get("whisper") == _whisper_version():
+        return path
+    
+    import whisper
+    print(f"📦 Exportando los pesos de {name} para compartirlos entre procesos...")
+    model = whisper.load_model(name, device="cpu")
+    export_weights(model, name, directory)
+    del model
+    gc.collect()
+    return path
+
+
+def load_shared_model(name, directory=DEFAULT_DIR):
+    """
+    Modelo Whisper en CPU cuyos pesos son vistas sobre el archivo mapeado
+    
+    El mapa es copia-en-escritura: como la inferencia nunca escribe en los
+    pesos, todos los procesos que cargan el mismo archivo comparten las mismas
+    páginas físicas (la caché de páginas del sistema) y cada trabajador solo
+    añade sus activaciones. El modelo se construye en el dispositivo "meta"
+    para no reservar antes unos pesos aleatorios del mismo tamaño.
+    """
+    import torch
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+    
+    path = ensure_weights(name, directory)
+    index = _read_index(path)
+    data = np.memmap(os.path.join(path, "pesos.bin"), dtype=np.uint8, mode="c")
+    
+    state = {}
+    for key, info in index["tensors"].items():
+        shape = info["shape"]
+        array = np.frombuffer(data, dtype=np.dtype(info["dtype"]), count=math.prod(shape), offset=info["offset"])
+        state[key] = torch.from_numpy(array.reshape(shape))
+    
+    dims = ModelDimensions(**index["dims"])
+    with torch.device("meta"):
+        model = Whisper(dims)
+    model.load_state_dict(state, assign=True)
+    
+    # Buffers no persistentes (no van en el state_dict): recrearlos como hace Whisper
+    n_ctx = dims.n_text_ctx
+    model.decoder.register_buffer("mask", torch.empty(n_ctx, n_ctx).fill_(-np.inf).triu_(1), persistent=False)
+    all_heads = torch.zeros(dims.n_text_layer, dims.n_text_head, dtype=torch.bool)
+    all_heads[dims.n_text_layer // 2:] = True
+    model.register_buffer("alignment_heads", all_heads.to_sparse(), persistent=False)
+    alignment_heads = getattr(whisper, "_ALIGNMENT_HEADS", {}).get(name)
+    if alignment_heads is not None:
+        model.set_alignment_heads(alignment_heads)
+    
+    leftovers = [n for n, t in list(model.named_parameters()) + list(model.named_buffers()) if t.is_meta]
+    if leftovers:
+        raise RuntimeError(f"Tensores sin cargar en el modelo compartido: {', '.join(leftovers)}")
+    return model
+
+
+def process_memory(pid="self"):
+    """
+    Memoria de un proceso en MB según /proc/<pid>/smaps_rollup (Linux)
+    
+    rss cuenta entera cada página compartida; pss la reparte entre los procesos
+    que la comparten (la suma de pss es la memoria real del grupo) y uss es
+    la memoria privada del proceso. Devuelve None donde no hay /proc.
+    """
+    fields = {"Rss": "rss", "Pss": "pss", "Private_Clean": "uss", "Private_Dirty": "uss",
+              "Shared_Clean": "shared", "Shared_Dirty": "shared"}
+    memory = {"rss": 0.0, "pss": 0.0, "uss": 0.0, "shared": 0.0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in fields:
+                    memory[fields[key]] += int(rest.split()[0]) / 1024  # kB → MB
+    except OSError:
+        return None
+    return memory
@@ -1,13 +1,19 @@
-import whisper
-import torch
 import json
 from typing import Dict, Any
 
-def get_available_models() -> Dict[str, Any]:
+from system_checks import get_gpu_info
+
+def get_available_models(from_whisper=False) -> Dict[str, Any]:
     """
-    Obtener lista de modelos disponibles directamente desde Whisper
+    Obtener lista de modelos disponibles
+    
+    Por defecto sale de la tabla de especificaciones, sin importar whisper ni
+    torch (varios segundos de arranque). Con from_whisper=True se pregunta a Whisper.
     """
-    return whisper.available_models()
+    if from_whisper:
+        import whisper
+        return whisper.available_models()
+    return list(get_model_info())
 
 def get_model_info():
     """
@@ -120,22 +126,11 @@ def get_model_info():
 def check_system_compatibility():
     """
     Verificar compatibilidad del sistema
+    
+    El resultado se guarda entre ejecuciones: torch solo se importa la primera
+    vez o cuando cambia la instalación (driver, torch, intérprete).
     """
-    cuda_available = torch.cuda.is_available()
-    if cuda_available:
-        gpu_name = torch.cuda.get_device_name(0)
-        gpu_memory = torch.cuda.get_device_properties(0).total_memory / (1024**3)
-        return {
-            "cuda": True,
-            "gpu_name": gpu_name,
-            "gpu_memory_gb": round(gpu_memory, 1)
-        }
-    else:
-        return {
-            "cuda": False,
-            "gpu_name": "CPU Only",
-            "gpu_memory_gb": 0
-        }
+    return get_gpu_info()
 
 def get_recommended_models(gpu_memory_gb: float):
     """
@@ -0,0 +1,143 @@
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "transcriptor", "comprobaciones.json")
+
+
+def _file_stamp(path):
+    """(ruta, mtime, tamaño) de un archivo, o None si no existe"""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [path, stat.st_mtime, stat.st_size]
+
+
+def _module_stamp(name):
+    """Sello del archivo de un paquete instalado, sin importarlo"""
+    try:
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    return _file_stamp(spec.origin) if spec is not None else None
+
+
+def fingerprint():
+    """
+    Huella de lo que afecta a las comprobaciones
+    
+    Si cambia el intérprete, el ejecutable de ffmpeg, el driver de NVIDIA o la
+    instalación de librosa, torch o whisper, las comprobaciones se repiten.
+    """
+    return {
+        "python": [sys.executable, sys.version],
+        "ffmpeg": _file_stamp(shutil.which("ffmpeg")),
+        "nvidia_smi": _file_stamp(shutil.which("nvidia-smi")),
+        "librosa": _module_stamp("librosa"),
+        "torch": _module_stamp("torch"),
+        "whisper": _module_stamp("whisper"),
+        "tempdir": tempfile.gettempdir()
+    }
+
+
+def check_ffmpeg():
+    """"ok", "warning" (responde con error) o "missing" """
+    try:
+        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, timeout=5)
+    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
+        return "missing"
+    return "ok" if result.returncode == 0 else "warning"
+
+
+def check_write_permissions():
+    """None si se puede escribir en el directorio temporal, si no el mensaje de error"""
+    try:
+        with tempfile.NamedTemporaryFile(delete=True) as tmp:
+            tmp.write(b"test")
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def check_gpu():
+    """Información de la GPU (importa torch, solo se hace cuando se pide)"""
+    import torch
+    if not torch.cuda.is_available():
+        return {"cuda": False, "gpu_name": "CPU Only", "gpu_memory_gb": 0}
+    return {
+        "cuda": True,
+        "gpu_name": torch.cuda.get_device_name(0),
+        "gpu_memory_gb": round(torch.cuda.get_device_properties(0).total_memory / (1024**3), 1)
+    }
+
+
+def _load_cache():
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(data):
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        tmp_path = f"{CACHE_PATH}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError:
+        pass  # Sin caché se repiten las comprobaciones la próxima vez
+
+
+def get_system_checks(force=False):
+    """
+    Comprobaciones del sistema (ffmpeg, librosa, escritura), cacheadas entre ejecuciones
+    
+    Devuelve (resultados, desde_cache). Solo se repiten si cambia la huella del
+    sistema o con `force`. Un ffmpeg ausente no se guarda como resultado válido.
+    """
+    current = fingerprint()
+    data = _load_cache()
+    if not force and data.get("fingerprint") == current and "checks" in data:
+        return data["checks"], True
+    
+    checks = {
+        "ffmpeg": check_ffmpeg(),
+        "librosa": current["librosa"] is not None,
+        "write_error": check_write_permissions()
+    }
+    if checks["ffmpeg"] == "ok":
+        gpu = data.get("gpu") if data.get("fingerprint") == current else None
+        _save_cache({"fingerprint": current, "checks": checks, "gpu": gpu})
+    return checks, False
+
+
+def get_gpu_info(force=False):
+    """Información de la GPU, cacheada con la misma huella que el resto de comprobaciones"""
+    current = fingerprint()
+    data = _load_cache()
+    if not force and data.get("fingerprint") == current and data.get("gpu"):
+        return data["gpu"]
+    
+    gpu = check_gpu()
+    if data.get("fingerprint") != current:
+        data = {"fingerprint": current}
+    data["gpu"] = gpu
+    _save_cache(data)
+    return gpu
+
+
+def invalidate():
+    """Olvidar los resultados guardados (p. ej. tras instalar un paquete)"""
+    try:
+        os.remove(CACHE_PATH)
+    except OSError:
+        pass
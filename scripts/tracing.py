@@ -0,0 +1,119 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Tracer:
+    """
+    Trazas ligeras de latencia por etapa
+    
+    Cada span guarda nombre, inicio, duración, proceso, hilo y sesión. La sesión
+    se puede indicar en cada span o fijarla para el hilo actual con session(),
+    así las funciones anidadas (VAD, Whisper...) no necesitan recibirla.
+    
+    Los tiempos salen de time.perf_counter, que es un reloj monótono común a
+    todos los procesos, así que se pueden unir spans de procesos trabajadores.
+    Se conservan como mucho `max_spans` spans (los más recientes).
+    """
+    
+    def __init__(self, max_spans=100000):
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    @contextmanager
+    def session(self, session_id):
+        """Asociar a `session_id` los spans abiertos en este hilo dentro del bloque"""
+        previous = getattr(self._local, "session", None)
+        self._local.session = session_id
+        try:
+            yield
+        finally:
+            self._local.session = previous
+    
+    @contextmanager
+    def span(self, name, session=None, **args):
+        """Medir el bloque como un span"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start, session, **args)
+    
+    def add(self, name, start, duration, session=None, **args):
+        """Registrar un span ya medido (inicio en segundos de perf_counter)"""
+        if session is None:
+            session = getattr(self._local, "session", None)
+        thread = threading.current_thread()
+        record = {
+            "name": name,
+            "start": start,
+            "duration": duration,
+            "session": session,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "thread": thread.name,
+            "args": args
+        }
+        with self._lock:
+            self._spans.append(record)
+    
+    def extend(self, records):
+        """Añadir spans registrados en otro proceso"""
+        with self._lock:
+            self._spans.extend(records)
+    
+    def drain(self):
+        """Devolver los spans registrados y vaciar el trazador"""
+        with self._lock:
+            records = list(self._spans)
+            self._spans.clear()
+        return records
+    
+    @property
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+    
+    def durations(self, session):
+        """Segundos por etapa de una sesión (se suman los spans repetidos)"""
+        totals = {}
+        for record in self.spans:
+            if record["session"] == session:
+                totals[record["name"]] = totals.get(record["name"], 0.0) + record["duration"]
+        return {name: round(seconds, 4) for name, seconds in totals.items()}
+    
+    def write_chrome_trace(self, path):
+        """Escribir los spans en formato Chrome Trace (chrome://tracing, ui.perfetto.dev)"""
+        spans = self.spans
+        origin = min((record["start"] for record in spans), default=0.0)
+        events = []
+        threads = {}
+        for record in spans:
+            args = dict(record["args"])
+            if record["session"] is not None:
+                args["session"] = record["session"]
+            events.append({
+                "name": record["name"],
+                "cat": "sesion" if record["session"] is not None else "general",
+                "ph": "X",
+                "ts": (record["start"] - origin) * 1e6,
+                "dur": record["duration"] * 1e6,
+                "pid": record["pid"],
+                "tid": record["tid"],
+                "args": args
+            })
+            threads[(record["pid"], record["tid"])] = record["thread"]
+        
+        for (pid, tid), name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
@@ -1,41 +1,483 @@
-import whisper
 import sys
 import os
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from audio_source import WHISPER_RATE, ffmpeg_blocks, open_mapped_audio, probe_duration
+from long_audio import create_worker_pool, transcribe_long, transcribe_stream
+from result_cache import ResultCache
+from tracing import Tracer
+from metrics import MetricsRegistry, RTF_BUCKETS
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "transcripciones")
+
+# Igual que whisper.available_models(), sin importar whisper/torch para leer los argumentos
+MODEL_NAMES = ("tiny.en", "tiny", "base.en", "base", "small.en", "small", "medium.en", "medium",
+               "large-v1", "large-v2", "large-v3", "large", "large-v3-turbo", "turbo")
+
+# Opciones de decodificación de todas las rutas (archivo, lote y trozos). Forman
+# parte de la clave de la caché: cambiarlas no devuelve resultados antiguos
+DECODE_OPTIONS = {
+    "task": "transcribe",
+    "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+    "condition_on_previous_text": True,
+    "word_timestamps": False
+}
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".opus", ".webm", ".mp4", ".aac", ".wma")
+
+# Modelo cargado una sola vez en cada proceso trabajador
+_worker_model = None
+
+# Spans de latencia de este proceso (los trabajadores devuelven los suyos)
+tracer = Tracer()
+
+# Métricas agregadas en formato Prometheus (--metricas-archivo / --metricas-puerto)
+metrics = MetricsRegistry()
+metrics.counter("files_total", "Archivos transcritos (incluidos los resueltos por la caché)")
+metrics.counter("file_errors_total", "Archivos con error")
+metrics.counter("cache_hits_total", "Archivos resueltos por la caché de resultados")
+metrics.counter("cache_misses_total", "Archivos que no estaban en la caché")
+metrics.counter("audio_seconds_total", "Segundos de audio transcritos")
+metrics.counter("model_loads_total", "Cargas de modelo (en cualquier proceso)")
+metrics.histogram("model_load_seconds", "Duración de la carga de un modelo")
+metrics.histogram("transcription_seconds", "Tiempo de transcripción por archivo")
+metrics.histogram("rtf", "Factor de tiempo real por archivo", RTF_BUCKETS)
 
 def transcribe_audio(audio_path, model_size="base", language=None):
     """
     Transcribir archivo de audio usando Whisper
     """
     print(f"Cargando modelo {model_size}...")
-    model = whisper.load_model(model_size)
+    model = _load_model_traced(model_size)
     
     print(f"Transcribiendo: {audio_path}")
-    result = model.transcribe(audio_path, language=language)
+    with tracer.span("whisper"):
+        result = model.transcribe(audio_path, language=language, **DECODE_OPTIONS)
     
     return result
 
+def _load_model_traced(model_size):
+    """Cargar un modelo registrando el span y las métricas de carga"""
+    import whisper
+    start = time.perf_counter()
+    with tracer.span("cargar_modelo"):
+        model = whisper.load_model(model_size)
+    metrics.counter("model_loads_total").inc()
+    metrics.histogram("model_load_seconds").observe(time.perf_counter() - start)
+    return model
+
+def file_cache_key(cache, audio_path, model_size, language, chunk_seconds):
+    """
+    Clave de caché de un archivo con todo lo que cambia su transcripción
+    
+    Es la misma en modo lote y con un solo archivo: las dos rutas decodifican
+    igual (DECODE_OPTIONS y trozos de `chunk_seconds`).
+    """
+    return cache.key_for_file(audio_path, model_size, language, dict(DECODE_OPTIONS, trozo=chunk_seconds))
+
+def _record_file_metrics(duration, elapsed):
+    """Acumular las métricas de un archivo transcrito"""
+    metrics.counter("files_total").inc()
+    metrics.counter("audio_seconds_total").inc(duration)
+    metrics.histogram("transcription_seconds").observe(elapsed)
+    if duration > 0:
+        metrics.histogram("rtf").observe(elapsed / duration)
+
+def save_transcription(audio_path, text, output_dir="output", name=None):
+    """
+    Guardar la transcripción de un archivo en output/<nombre>.txt
+    
+    `name` puede incluir subcarpetas (ver output_names); por defecto es el
+    nombre del archivo de audio.
+    """
+    output_file = os.path.join(output_dir, f"{name or os.path.basename(audio_path)}.txt")
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(text)
+    return output_file
+
+def expand_inputs(inputs):
+    """
+    Expandir archivos, directorios (recursivamente) y patrones glob a una lista de audios
+    """
+    paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            for root, _, files in os.walk(entry):
+                for name in sorted(files):
+                    if name.lower().endswith(AUDIO_EXTENSIONS):
+                        paths.append(os.path.join(root, name))
+        elif os.path.isfile(entry):
+            paths.append(entry)
+        else:
+            paths.extend(sorted(p for p in glob.glob(entry, recursive=True) if os.path.isfile(p)))
+    
+    # Quitar duplicados conservando el orden
+    unique = []
+    seen = set()
+    for path in paths:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+def output_names(paths):
+    """
+    Nombre de salida de cada audio del lote: su ruta relativa a la carpeta común
+    
+    Así a/clip.wav y b/clip.wav se guardan en output/a/ y output/b/ en lugar de
+    pisarse en output/clip.wav.txt.
+    """
+    if not paths:
+        return {}
+    absolute = [os.path.abspath(path) for path in paths]
+    try:
+        root = os.path.commonpath([os.path.dirname(path) for path in absolute])
+    except ValueError:
+        # Unidades distintas en Windows: no hay carpeta común
+        return {path: os.path.splitdrive(full)[1].lstrip("\\/") for path, full in zip(paths, absolute)}
+    return {path: os.path.relpath(full, root) for path, full in zip(paths, absolute)}
+
+def plan_workers(n_files, workers=None):
+    """
+    Elegir número de procesos e hilos por proceso sin sobresuscribir los núcleos
+    """
+    cores = os.cpu_count() or 1
+    if workers is None:
+        import torch
+        if torch.cuda.is_available():
+            workers = 1  # Una sola GPU: varios procesos solo compiten por ella
+        else:
+            # PyTorch escala bien hasta unos 4 hilos por decodificación en CPU
+            workers = max(1, cores // 4)
+    workers = max(1, min(workers, n_files))
+    threads = max(1, cores // workers)
+    return workers, threads
+
+def _init_worker(model_size, threads, shared_weights=False):
+    """Inicializar un proceso trabajador: fijar hilos y cargar el modelo una vez"""
+    global _worker_model
+    import torch
+    torch.set_num_threads(threads)
+    with tracer.span("cargar_modelo", compartido=shared_weights):
+        if shared_weights:
+            # Pesos mapeados desde un archivo común: una sola copia en RAM para todos
+            from shared_weights import load_shared_model
+            _worker_model = load_shared_model(model_size)
+        else:
+            import whisper
+            _worker_model = whisper.load_model(model_size)
+
+def _result_duration(result):
+    """Duración aproximada (fin del último segmento) de un resultado guardado"""
+    segments = result.get("segments") or []
+    return segments[-1]["end"] if segments else 0.0
+
+def _open_long_audio(audio_path, chunk_seconds):
+    """
+    (audio mapeado o None, duración o None) si el archivo se debe trocear, o None
+    
+    Se trocea si dura al menos un trozo o si no se sabe cuánto dura (sin ffprobe):
+    en ese caso se lee por bloques, que también vale para audios cortos.
+    """
+    if chunk_seconds <= 0:
+        return None
+    with tracer.span("abrir_audio"):
+        mapped = open_mapped_audio(audio_path)
+        duration = mapped.duration() if mapped is not None else probe_duration(audio_path)
+    if duration is not None and duration < chunk_seconds:
+        return None
+    return mapped, duration
+
+def _decode_long(audio_path, mapped, chunk_seconds, **decoder):
+    """Trocear y decodificar sin cargar el archivo: memmap si se puede, si no ffmpeg por bloques"""
+    if mapped is not None:
+        return transcribe_long(len(mapped), mapped.read, WHISPER_RATE, chunk_seconds=chunk_seconds, **decoder)
+    blocks = ffmpeg_blocks(audio_path, block_seconds=min(chunk_seconds, 30), sample_rate=WHISPER_RATE)
+    return transcribe_stream(blocks, WHISPER_RATE, chunk_seconds=chunk_seconds, **decoder)
+
+def _transcribe_in_worker(audio_path, language, output_dir, output_name=None, chunk_seconds=0, cache_key=None,
+                          cache_dir=None, cache_mb=None):
+    """
+    Transcribir un archivo en el proceso trabajador y guardar el resultado
+    
+    Los archivos de más de `chunk_seconds` se trocean en este mismo proceso sin
+    cargarlos enteros, igual que transcribe_long_file.
+    """
+    start = time.perf_counter()
+    with tracer.session(audio_path):
+        long_audio = _open_long_audio(audio_path, chunk_seconds)
+        if long_audio is not None:
+            mapped, duration = long_audio
+            with tracer.span("whisper", troceado=True):
+                decode = lambda a: _worker_model.transcribe(a, language=language, **DECODE_OPTIONS)
+                result = _decode_long(audio_path, mapped, chunk_seconds, decode=decode)
+            if duration is None:
+                duration = _result_duration(result)
+        else:
+            import whisper
+            with tracer.span("decodificar_audio"):
+                audio = whisper.load_audio(audio_path)
+            duration = len(audio) / whisper.audio.SAMPLE_RATE
+            with tracer.span("whisper", audio_seconds=round(duration, 3)):
+                result = _worker_model.transcribe(audio, language=language, **DECODE_OPTIONS)
+        with tracer.span("guardar"):
+            if cache_key:
+                # El proceso principal lleva el tamaño de la caché (ver transcribe_batch)
+                ResultCache(cache_dir, cache_mb).put(cache_key, result, track=False)
+            output_file = save_transcription(audio_path, result["text"], output_dir, output_name)
+    return output_file, duration, time.perf_counter() - start, tracer.drain()
+
+def transcribe_batch(paths, model_size="base", language=None, workers=None, output_dir="output", cache=None,
+                     shared_weights=True, chunk_seconds=300):
+    """
+    Transcribir muchos archivos en paralelo con un pool de procesos
+    
+    Cada proceso carga el modelo una sola vez. Las transcripciones se guardan
+    según termina cada archivo; los de más de `chunk_seconds` (0 = nunca) se
+    trocean sin cargarlos en memoria. Los archivos ya presentes en `cache` se
+    resuelven sin decodificar; si lo están todos, no se carga ningún modelo.
+    Con varios procesos en CPU y `shared_weights`, los pesos se comparten.
+    Devuelve (segundos de audio, segundos reales, errores).
+    """
+    total_audio = 0.0
+    errors = 0
+    start = time.perf_counter()
+    
+    names = output_names(paths)
+    
+    # Resolver primero los aciertos de caché, sin crear procesos
+    pending = []
+    keys = {}
+    for path in paths:
+        if cache is None:
+            pending.append(path)
+            continue
+        try:
+            with tracer.span("cache", path):
+                keys[path] = file_cache_key(cache, path, model_size, language, chunk_seconds)
+                result = cache.get(keys[path])
+        except OSError:
+            pending.append(path)  # El error se informará al transcribirlo
+            continue
+        if result is None:
+            metrics.counter("cache_misses_total").inc()
+            pending.append(path)
+            continue
+        metrics.counter("cache_hits_total").inc()
+        metrics.counter("files_total").inc()
+        output_file = save_transcription(path, result["text"], output_dir, names[path])
+        total_audio += _result_duration(result)
+        print(f"⚡ {path} → {output_file} (en caché)")
+    
+    if cache is not None:
+        print(f"🗃️  Caché: {len(paths) - len(pending)} aciertos, {len(pending)} por transcribir")
+    
+    if pending:
+        workers, threads = plan_workers(len(pending), workers)
+        print(f"📂 {len(pending)} archivos | {workers} procesos x {threads} hilos | modelo {model_size}")
+        
+        if shared_weights and workers > 1:
+            from model_registry import resolve_device
+            shared_weights = resolve_device() == "cpu"
+            if shared_weights:
+                from shared_weights import ensure_weights
+                ensure_weights(model_size)  # Exportar una vez aquí, no en cada trabajador a la vez
+                print("🔗 Pesos compartidos entre procesos (una sola copia del modelo en RAM)")
+        else:
+            shared_weights = False
+        
+        cache_args = (cache.directory, cache.max_bytes / 2**20) if cache is not None else (None, None)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model_size, threads, shared_weights)) as pool:
+            futures = {
+                pool.submit(_transcribe_in_worker, path, language, output_dir, names[path], chunk_seconds,
+                            keys.get(path), *cache_args): path
+                for path in pending
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    output_file, duration, elapsed, spans = future.result()
+                except Exception as e:
+                    errors += 1
+                    metrics.counter("file_errors_total").inc()
+                    print(f"❌ [{done}/{len(pending)}] {path}: {e}")
+                    continue
+                if path in keys:
+                    cache.track(keys[path])
+                total_audio += duration
+                tracer.extend(spans)
+                _record_file_metrics(duration, elapsed)
+                for record in spans:
+                    if record["name"] == "cargar_modelo":
+                        metrics.counter("model_loads_total").inc()
+                        metrics.histogram("model_load_seconds").observe(record["duration"])
+                print(f"✅ [{done}/{len(pending)}] {path} → {output_file} "
+                      f"({duration:.1f}s de audio en {elapsed:.1f}s)")
+    
+    wall = time.perf_counter() - start
+    
+    print("\n=== RESUMEN ===")
+    print(f"Archivos: {len(paths) - errors} correctos, {errors} con error")
+    print(f"Audio procesado: {total_audio / 3600:.2f} h en {wall / 3600:.2f} h reales")
+    if wall > 0:
+        print(f"Rendimiento: {total_audio / wall:.1f} horas de audio por hora real")
+    
+    return total_audio, wall, errors
+
+def transcribe_long_file(audio_path, model_size="base", language=None, workers=None, chunk_seconds=300,
+                         shared_weights=True):
+    """
+    Transcribir un archivo largo troceándolo en silencios y decodificando en paralelo
+    
+    El archivo nunca se carga entero: los WAV de 16 bits a 16 kHz y el PCM
+    crudo se leen con memmap y el resto llega por bloques desde un ffmpeg en
+    streaming. La memoria queda acotada a unos pocos trozos sea cual sea la
+    duración y el primer trozo se decodifica sin esperar a leer el archivo.
+    
+    Devuelve el resultado unido (texto y segmentos con tiempos absolutos), o None
+    si el audio es demasiado corto para que merezca la pena trocearlo.
+    """
+    long_audio = _open_long_audio(audio_path, chunk_seconds)
+    if long_audio is None:
+        return None
+    mapped, duration = long_audio
+    
+    # Sin duración conocida (no hay ffprobe) se planifica como si hubiera trozos de sobra
+    n_chunks = int(duration // chunk_seconds) + 1 if duration is not None else os.cpu_count() or 1
+    workers, threads = plan_workers(n_chunks, workers)
+    source = "memmap" if mapped is not None else "ffmpeg por bloques"
+    print(f"Transcribiendo: {audio_path} ({workers} procesos x {threads} hilos, modelo {model_size}, {source})")
+    start = time.perf_counter()
+    
+    if workers > 1:
+        with create_worker_pool(model_size, workers, threads, None if shared_weights else False) as pool:
+            result = _decode_long(audio_path, mapped, chunk_seconds, pool=pool, max_in_flight=2 * workers,
+                                  language=language, **DECODE_OPTIONS)
+    else:
+        print(f"Cargando modelo {model_size}...")
+        model = _load_model_traced(model_size)
+        result = _decode_long(audio_path, mapped, chunk_seconds,
+                              decode=lambda a: model.transcribe(a, language=language, **DECODE_OPTIONS))
+    
+    elapsed = time.perf_counter() - start
+    audio_seconds = duration if duration is not None else _result_duration(result)
+    print(f"⏱️  {audio_seconds:.1f}s de audio en {elapsed:.1f}s")
+    return result
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Transcribir archivos de audio con Whisper",
+        usage="python transcribe.py <archivo|directorio|patrón>... [modelo] [idioma] [opciones]"
+    )
+    parser.add_argument("entradas", nargs="+", help="Archivos, directorios o patrones glob")
+    parser.add_argument("-m", "--modelo", default=None, help="Modelo Whisper (por defecto: base)")
+    parser.add_argument("-l", "--idioma", default=None, help="Idioma (por defecto: autodetectar)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Procesos en paralelo")
+    parser.add_argument("-o", "--salida", default="output", help="Carpeta de salida")
+    parser.add_argument("-t", "--trozo", type=float, default=300,
+                        help="Segundos por trozo para archivos largos (0 = no trocear)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_DIR, help="Carpeta de la caché de resultados")
+    parser.add_argument("--cache-mb", type=float, default=1024, help="Tamaño máximo de la caché en MB")
+    parser.add_argument("--sin-cache", action="store_true", help="No leer ni escribir la caché")
+    parser.add_argument("--sin-pesos-compartidos", action="store_true",
+                        help="Cada proceso carga su propia copia del modelo")
+    parser.add_argument("--traza", default=None,
+                        help="Guardar una traza Chrome/Perfetto de las etapas en este archivo JSON")
+    parser.add_argument("--metricas-archivo", default=None,
+                        help="Escribir las métricas (formato Prometheus) en este archivo cada 15 s y al terminar")
+    parser.add_argument("--metricas-puerto", type=int, default=None,
+                        help="Servir las métricas en http://127.0.0.1:<puerto>/metrics mientras dura la ejecución")
+    args = parser.parse_args(argv)
+    
+    # Compatibilidad con la forma antigua: transcribe.py <archivo> [modelo] [idioma]
+    entradas = args.entradas
+    if (len(entradas) in (2, 3) and args.modelo is None
+            and entradas[1] in MODEL_NAMES and not os.path.exists(entradas[1])):
+        args.modelo = entradas[1]
+        if len(entradas) == 3 and args.idioma is None:
+            args.idioma = entradas[2]
+        args.entradas = entradas[:1]
+    
+    args.modelo = args.modelo or "base"
+    return args
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Uso: python transcribe.py <archivo_audio> [modelo] [idioma]")
+        print("     python transcribe.py <directorio|patrón>... [-m modelo] [-l idioma] [-w procesos]")
         sys.exit(1)
     
-    audio_file = sys.argv[1]
-    model_size = sys.argv[2] if len(sys.argv) > 2 else "base"
-    language = sys.argv[3] if len(sys.argv) > 3 else None
+    args = parse_args(sys.argv[1:])
+    paths = expand_inputs(args.entradas)
     
-    if not os.path.exists(audio_file):
-        print(f"Error: No se encuentra el archivo {audio_file}")
+    if not paths:
+        print(f"Error: No se encuentra ningún archivo de audio en {', '.join(args.entradas)}")
         sys.exit(1)
     
-    result = transcribe_audio(audio_file, model_size, language)
+    cache = None if args.sin_cache else ResultCache(args.cache, args.cache_mb)
     
-    print("\n=== TRANSCRIPCIÓN ===")
-    print(result["text"])
+    if args.metricas_puerto is not None:
+        metrics.start_http_server(args.metricas_puerto)
+    if args.metricas_archivo:
+        metrics.start_file_exporter(args.metricas_archivo)
     
-    # Guardar transcripción
-    output_file = f"output/{os.path.basename(audio_file)}.txt"
-    os.makedirs("output", exist_ok=True)
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(result["text"])
+    if len(paths) > 1:
+        # Modo lote: directorios, patrones o varios archivos
+        _, _, errors = transcribe_batch(paths, args.modelo, args.idioma, args.workers, args.salida, cache,
+                                        shared_weights=not args.sin_pesos_compartidos, chunk_seconds=args.trozo)
+        if args.traza:
+            print(f"📈 Traza guardada: {tracer.write_chrome_trace(args.traza)}")
+        metrics.stop_exporters()
+        sys.exit(1 if errors else 0)
+    
+    audio_file = paths[0]
+    result = None
+    key = None
+    with tracer.session(audio_file):
+        if cache is not None:
+            # Un acierto evita cargar el modelo
+            with tracer.span("cache"):
+                key = file_cache_key(cache, audio_file, args.modelo, args.idioma, args.trozo)
+                result = cache.get(key)
+            if result is not None:
+                metrics.counter("cache_hits_total").inc()
+                metrics.counter("files_total").inc()
+                print(f"⚡ Resultado en caché para {audio_file} (modelo {args.modelo})")
+            else:
+                metrics.counter("cache_misses_total").inc()
+        
+        if result is None:
+            with tracer.span("transcribir"):
+                if args.trozo > 0:
+                    # Archivos largos: trozos cortados en silencio, decodificados en paralelo
+                    result = transcribe_long_file(audio_file, args.modelo, args.idioma, args.workers, args.trozo,
+                                                  shared_weights=not args.sin_pesos_compartidos)
+                if result is None:
+                    result = transcribe_audio(audio_file, args.modelo, args.idioma)
+            if cache is not None:
+                cache.put(key, result)
+        
+        print("\n=== TRANSCRIPCIÓN ===")
+        print(result["text"])
+        
+        # Guardar transcripción
+        with tracer.span("guardar"):
+            output_file = save_transcription(audio_file, result["text"], args.salida)
+    
+    print(f"\nTranscripción guardada en: {output_file}")
     
-    print(f"\nTranscripción guardada en: {output_file}")
\ No newline at end of file
+    stages = tracer.durations(audio_file)
+    audio_seconds = _result_duration(result)
+    print("⏱️  " + " | ".join(f"{name}: {seconds:.2f}s" for name, seconds in stages.items()))
+    if audio_seconds > 0 and "transcribir" in stages:
+        print(f"   RTF: {stages['transcribir'] / audio_seconds:.2f}")
+        _record_file_metrics(audio_seconds, stages["transcribir"])
+    if args.traza:
+        print(f"📈 Traza guardada: {tracer.write_chrome_trace(args.traza)}")
+    metrics.stop_exporters()
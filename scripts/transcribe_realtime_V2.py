@@ -1,28 +1,73 @@
-import whisper
+import time
+PROCESS_START = time.perf_counter()  # Para medir el tiempo hasta el menú y hasta la primera grabación
+
+# whisper (y con él torch) se importa solo donde se usa: la carga del modelo
+# ocurre en segundo plano y el menú aparece sin esperar a esos módulos
 import pyaudio
 import wave
 import threading
-import time
 import os
 from datetime import datetime
 import keyboard
 import numpy as np
 import json
-import re
+from audio_dsp import (PolyphaseResampler, chunk_rms, detect_speech_regions,
+                       extract_speech, remap_result)
+from model_registry import ModelRegistry
+from pipeline import SessionPipeline
+from keyword_matcher import KeywordMatcher
+from audio_buffer import AudioBuffer, SegmentedAudioBuffer
+from long_audio import create_worker_pool, transcribe_long
+from tracing import Tracer
+from metrics import MetricsRegistry, RTF_BUCKETS
+from system_checks import get_system_checks, invalidate as invalidate_system_checks
+from control import ControlChannel
+from capture_process import CaptureProcess
+from callback_capture import CallbackCapture
+
+class CaptionState:
+    """Subtítulos en vivo de una sesión: su audio, su hilo y lo ya confirmado
+    
+    Cada sesión tiene el suyo, así el pipeline puede terminar la cola de una
+    sesión mientras la siguiente ya graba con su propio hilo de subtítulos.
+    """
+    
+    def __init__(self, audio_buffer):
+        self.audio_buffer = audio_buffer
+        self.stop = threading.Event()
+        self.thread = None
+        self.committed_sample = 0  # Muestras ya confirmadas (inicio de la ventana)
+        self.committed_text = ""
+        self.committed_segments = []
+        self.prev_segments = []  # Segmentos sin confirmar de la pasada anterior
+        self.partial = ""
 
 class RealtimeTranscriber:
-    def __init__(self, model_size="base", language="es"):
+    MODELS = ("tiny", "base", "small", "medium", "large-v1", "large-v2", "large-v3", "turbo")
+    
+    def __init__(self, model_size="base", language="es", model_cache_mb=4096):
         self.model_size = model_size
         self.language = language
         self.model = None
+        # El pipeline decodifica la sesión N mientras los subtítulos de la N+1 usan el
+        # mismo modelo: las cachés kv de Whisper no admiten dos decodificaciones a la vez
+        self._model_lock = threading.Lock()
+        self.device = None  # None: cuda si está disponible, si no cpu
+        self.precision = "fp32"  # Las transcripciones usan fp16=False
         self.is_recording = False
-        self.audio_frames = []
+        self.audio_buffer = AudioBuffer()  # Audio int16 a 16 kHz de la sesión actual
         
         # Obtener la ruta raíz del proyecto (un nivel arriba de scripts)
         self.project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         
         # Configuración de audio (mejorada)
-        self.audio_quality = "ultra"  # low, medium, high, ultra
+        # Whisper trabaja siempre a 16 kHz: se graba a esa tasa si el dispositivo lo
+        # permite y, si no, se remuestrea cada chunk a 16 kHz según llega
+        self.WHISPER_RATE = 16000
+        self.audio_quality = "medium"  # low, medium, high, ultra (tasa nativa del dispositivo)
+        self.prefer_native_16k = True  # Intentar abrir el dispositivo directamente a 16 kHz
+        self.capture_rate = None  # Tasa con la que se abrió realmente el dispositivo
+        self._resampler = None
         self.setup_audio_config()
         
         # Palabras clave importantes (personalizables)
@@ -33,12 +78,135 @@ class RealtimeTranscriber:
             "presupuesto", "coste", "precio", "dinero", "euro",
             "nombre", "teléfono", "email", "dirección"
         ]
+        self._keyword_matcher = None  # Autómata compilado a partir de self.keywords
         
         self.audio = pyaudio.PyAudio()
         self.stream = None
+        self._stream_lock = threading.Lock()  # Abrir y cerrar el stream desde hilos distintos
+        
+        # Captura en este proceso: "blocking" (stream.read en un bucle) o "callback"
+        # (PortAudio entrega cada bloque, que se copia a un anillo preasignado)
+        self.capture_mode = "blocking"
+        self.input_latency_ms = None  # Bloque del dispositivo en ms (None: el del perfil de calidad)
+        self.capture_buffer_seconds = 10  # Anillo del modo callback: retraso máximo sin perder audio
+        
+        # Micrófono siempre abierto (opcional): un único stream por callback para toda la
+        # vida del transcriptor; cada sesión empieza sin abrir nada e incluye `preroll_ms`
+        # de audio de justo antes de pulsar la tecla
+        self.always_open_stream = False
+        self.preroll_ms = 300
+        self._persistent_capture = None
+        self._persistent_key = None  # (tasa, bloque) con que se abrió el stream persistente
+        
+        # Captura en un proceso aparte (opcional): escribe en un anillo de memoria
+        # compartida y la inferencia de este proceso no puede retrasarla
+        self.capture_in_process = False
+        self.capture_ring_seconds = 30  # Retraso máximo del lector sin perder audio
+        self._capture_process = None
+        self.capture_stats = None  # Contadores de captura de la última sesión
+        
+        # Subtítulos en vivo: decodificar una ventana deslizante mientras se graba
+        self.live_captions = False
+        self.caption_interval = 1.0  # Segundos entre decodificaciones parciales
+        self.caption_max_window = 20.0  # Segundos sin confirmar antes de forzar la confirmación
+        self._captions = None  # CaptionState de la sesión que se está grabando
+        
+        # Detección de voz por energía (VAD): solo se envían a Whisper las regiones con voz
+        self.silence_detection = True
+        self.silence_threshold = 0.01  # RMS normalizado (0-1), aprox. -40 dBFS
+        self.vad_hangover_ms = 300  # Margen alrededor de la voz para no cortar palabras
+        
+        # Fin de frase automático: parar la grabación tras un silencio prolongado
+        self.auto_stop = False
+        self.endpoint_silence_sec = 1.5  # Segundos de silencio tras la voz para parar
+        self.endpoint_triggered = False
+        
+        # Grabación larga: el audio se vuelca a segmentos WAV en disco de tamaño fijo,
+        # así la RAM no crece con la duración de la sesión
+        self.long_recording = False
+        self.segment_seconds = 300  # Duración de cada segmento en disco
+        
+        # Audio largo: se trocea en silencios cerca de cada ventana y los trozos se
+        # decodifican en paralelo en procesos con su propia copia del modelo
+        self.long_audio_chunk_sec = 300  # Duración nominal de cada trozo
+        self.long_audio_workers = 0  # 0 o 1: trozos en serie con el modelo ya cargado (--procesos-audio-largo)
+        self._long_audio_pool = None
+        self._long_audio_pool_key = None
+        
+        # Archivado opcional del WAV en segundo plano (la transcripción usa el audio en memoria)
+        self.archive_audio = True
+        self._archive_threads = []
+        
+        # Pipeline grabar / transcribir / guardar: se puede grabar la sesión N+1
+        # mientras la sesión N se transcribe y se guarda en segundo plano
+        self.max_pending_sessions = 2  # Sesiones en cola por etapa
+        self.backpressure = "block"  # "block" (esperar hueco) o "drop_oldest"
+        self.last_transcription = ""
+        self.last_transcription_file = ""
+        
+        # Trazas de latencia por etapa: duraciones y RTF en el JSON de cada sesión y,
+        # opcionalmente, un archivo Chrome Trace en output/trazas al salir del modo
+        self.tracer = Tracer()
+        self.chrome_trace = False
+        self.diagnostics = False  # Diagnóstico detallado de archivos (--diagnostico)
+        
+        # Métricas agregadas del proceso (formato Prometheus, ver start_metrics_exporter)
+        self.metrics = MetricsRegistry()
+        self._pipeline = None
+        
+        # Modelos residentes en memoria (cambio instantáneo entre modelos ya cargados)
+        self.model_registry = ModelRegistry(max_memory_mb=model_cache_mb)
+        
+        # Precarga del modelo en segundo plano mientras se muestra el menú
+        self._model_ready = threading.Event()
+        self._model_error = None
+        self._model_generation = 0  # Invalida cargas obsoletas tras cambiar de modelo
+        # Protege generación, modelo, error y _model_ready: comparar y publicar en un solo paso
+        self._model_state_lock = threading.Lock()
+        self._first_recording_reported = False
+        self._register_metrics()
+        self.preload_model()
+    
+    def _register_metrics(self):
+        """Declarar las métricas que se exportan"""
+        m = self.metrics
+        m.counter("sessions_total", "Sesiones transcritas y guardadas")
+        m.counter("session_errors_total", "Sesiones con error en alguna etapa")
+        m.counter("sessions_dropped_total", "Sesiones descartadas por contrapresión")
+        m.counter("audio_seconds_total", "Segundos de audio grabados en sesiones transcritas")
+        m.histogram("transcription_seconds", "Duración de la etapa de transcripción")
+        m.histogram("stop_to_text_seconds", "Latencia desde parar la grabación hasta tener el texto")
+        m.histogram("rtf", "Factor de tiempo real (segundos de transcripción por segundo de audio)", RTF_BUCKETS)
+        m.counter("model_loads_total", "Cargas de modelo desde disco")
+        m.counter("model_load_errors_total", "Cargas de modelo fallidas")
+        m.counter("model_cache_hits_total", "Cambios de modelo resueltos con un modelo ya en memoria")
+        m.histogram("model_load_seconds", "Duración de la carga y calentamiento de un modelo")
+        m.counter("capture_overflows_total", "Desbordamientos del dispositivo de entrada durante la captura")
+        m.counter("capture_lost_seconds_total", "Segundos de audio perdidos por retraso al leer la captura")
+        m.counter("capture_underflows_total", "Subdesbordamientos del dispositivo de entrada (modo callback)")
+        m.counter("capture_late_callbacks_total", "Callbacks de captura que llegaron tarde (modo callback)")
+        m.gauge("pending_sessions", "Sesiones en cola o en proceso en el pipeline",
+                function=lambda: self._pipeline.pending() if self._pipeline is not None else 0)
+        m.gauge("resident_models", "Modelos cargados en memoria",
+                function=lambda: len(self.model_registry.loaded()))
+        m.gauge("startup_menu_seconds", "Segundos desde el arranque hasta mostrar el menú")
+        m.gauge("startup_first_recording_seconds", "Segundos desde el arranque hasta la primera grabación")
+    
+    def start_metrics_exporter(self, port=None, path=None, interval=15.0):
+        """Exponer las métricas por HTTP local en `port` y/o reescribiendo el archivo `path`"""
+        if port is not None:
+            self.metrics.start_http_server(port)
+            print(f"📊 Métricas en http://127.0.0.1:{port}/metrics")
+        if path is not None:
+            self.metrics.start_file_exporter(path, interval)
+            print(f"📊 Métricas en {path} (cada {interval:g}s)")
         
     def setup_audio_config(self):
-        """Configurar calidad de audio"""
+        """Configurar calidad de audio
+        
+        Los perfiles describen la tasa nativa del dispositivo. El audio que se
+        almacena y se envía a Whisper está siempre a 16 kHz (self.RATE).
+        """
         quality_configs = {
             "low": {"rate": 8000, "chunk": 512},
             "medium": {"rate": 16000, "chunk": 1024},
@@ -48,7 +216,8 @@ class RealtimeTranscriber:
         
         config = quality_configs.get(self.audio_quality, quality_configs["medium"])
         self.CHUNK = config["chunk"]
-        self.RATE = config["rate"]
+        self.DEVICE_RATE = config["rate"]
+        self.RATE = self.WHISPER_RATE
         self.FORMAT = pyaudio.paInt16
         self.CHANNELS = 1
         
@@ -57,39 +226,53 @@ class RealtimeTranscriber:
         if not self.silence_detection:
             return False
             
-        # Convertir bytes a numpy array
+        # Convertir bytes a numpy array (vista, sin copia)
         audio_np = np.frombuffer(audio_data, dtype=np.int16)
         
-        # Calcular RMS (Root Mean Square) para detectar volumen
-        rms = np.sqrt(np.mean(audio_np**2))
-        
-        # Normalizar RMS a escala 0-1
-        # Para int16, el rango máximo es -32768 a 32767
-        normalized_rms = rms / 32768.0
+        # Calcular RMS (Root Mean Square) normalizado a escala 0-1
+        normalized_rms = chunk_rms(audio_np)
         
         # DEBUG: Mostrar nivel de audio actual (opcional)
         # print(f"\rNivel audio: {normalized_rms:.4f} | Umbral: {self.silence_threshold}", end="")
         
         return normalized_rms < self.silence_threshold
         
+    def transcribe_speech(self, audio_np):
+        """Transcribir solo las regiones con voz y devolver tiempos del audio original"""
+        if not self.silence_detection:
+            return self.transcribe_audio(audio_np)
+        
+        with self.tracer.span("vad"):
+            regions = detect_speech_regions(
+                audio_np,
+                self.RATE,
+                threshold=self.silence_threshold,
+                hangover_ms=self.vad_hangover_ms
+            )
+            speech_np, time_map = extract_speech(audio_np, regions, self.RATE)
+        
+        total = len(audio_np) / self.RATE
+        speech = len(speech_np) / self.RATE
+        print(f"🔇 VAD: {len(regions)} regiones de voz, {speech:.2f}s de {total:.2f}s")
+        
+        if not regions:
+            print("⚠️  No se detectó voz en la grabación")
+            return {"text": "", "segments": [], "language": self.language}
+        
+        result = self.transcribe_audio(speech_np)
+        remap_result(result, time_map)
+        result["speech_regions"] = [
+            {"start": start / self.RATE, "end": end / self.RATE} for start, end in regions
+        ]
+        return result
+        
     def extract_keywords(self, text):
-        """Extraer palabras clave del texto"""
-        found_keywords = []
-        text_lower = text.lower()
-        
-        for keyword in self.keywords:
-            if keyword.lower() in text_lower:
-                # Encontrar contexto (frase completa)
-                sentences = re.split(r'[.!?]+', text)
-                for sentence in sentences:
-                    if keyword.lower() in sentence.lower():
-                        found_keywords.append({
-                            "keyword": keyword,
-                            "context": sentence.strip(),
-                            "position": text_lower.find(keyword.lower())
-                        })
-        
-        return found_keywords
+        """Extraer palabras clave del texto (todas las apariciones, en una sola pasada)"""
+        # Recompilar el autómata solo si la lista de palabras clave ha cambiado
+        if self._keyword_matcher is None or self._keyword_matcher.keywords != self.keywords:
+            self._keyword_matcher = KeywordMatcher(self.keywords)
+        
+        return self._keyword_matcher.extract(text)
         
     def analyze_confidence(self, result):
         """Analizar confianza de cada segmento"""
@@ -120,45 +303,445 @@ class RealtimeTranscriber:
         return segments_info
         
     def load_model(self):
-        """Cargar modelo de Whisper"""
-        print(f"Cargando modelo {self.model_size}...")
-        self.model = whisper.load_model(self.model_size)
-        print("Modelo cargado correctamente!")
+        """Cargar modelo de Whisper (bloquea hasta que esté listo)"""
+        if self.model is None and self._model_ready.is_set():
+            self.preload_model()
+        self.wait_for_model()
+        
+    def preload_model(self):
+        """Cargar el modelo actual en un hilo en segundo plano"""
+        with self._model_state_lock:
+            self._model_generation += 1
+            generation = self._model_generation
+            self._model_error = None
+            
+            # Si el modelo ya está en memoria el cambio es instantáneo
+            cached = self.model_registry.get(self.model_size, self.device, self.precision)
+            if cached is not None:
+                self.model = cached
+                self._model_ready.set()
+            else:
+                self._model_ready.clear()
+                self.model = None
+        
+        if cached is not None:
+            self.metrics.counter("model_cache_hits_total").inc()
+            return
+        
+        thread = threading.Thread(
+            target=self._load_model_worker,
+            args=(self.model_size, generation),
+            daemon=True
+        )
+        thread.start()
+        
+    def _load_model_worker(self, model_size, generation):
+        """Hilo de carga: cargar pesos y hacer una decodificación de calentamiento"""
+        start = time.perf_counter()
+        try:
+            model, fresh = self.model_registry.load(model_size, self.device, self.precision)
+            
+            # Calentamiento: la primera inferencia reserva memoria y prepara los kernels
+            if fresh:
+                with self._model_lock:
+                    model.transcribe(
+                        np.zeros(self.WHISPER_RATE, dtype=np.float32),
+                        language=self.language,
+                        verbose=None,
+                        condition_on_previous_text=False,
+                        fp16=False
+                    )
+        except Exception as e:
+            self.metrics.counter("model_load_errors_total").inc()
+            with self._model_state_lock:
+                if generation == self._model_generation:
+                    self._model_error = e
+                    self._model_ready.set()
+            return
+        
+        if fresh:
+            self.metrics.counter("model_loads_total").inc()
+            self.metrics.histogram("model_load_seconds").observe(time.perf_counter() - start)
+        
+        # Si mientras tanto se eligió otro modelo, descartar este
+        with self._model_state_lock:
+            if generation == self._model_generation:
+                self.model = model
+                self._model_ready.set()
+        
+    def switch_model(self, model_size):
+        """Cambiar de modelo; devuelve True si ya estaba en memoria (cambio instantáneo)"""
+        if model_size not in self.MODELS:
+            raise ValueError(f"Modelo desconocido: {model_size}")
+        self.model_size = model_size
+        self.preload_model()
+        return self._model_ready.is_set()
+        
+    def model_status(self):
+        """Estado de la carga del modelo para mostrar en los menús"""
+        if not self._model_ready.is_set():
+            return "⏳ cargando..."
+        if self._model_error is not None:
+            return f"❌ error ({self._model_error})"
+        return "✅ listo"
+        
+    def wait_for_model(self):
+        """Esperar a que el modelo en segundo plano esté listo"""
+        if not self._model_ready.is_set():
+            print(f"⏳ Esperando a que termine de cargar el modelo {self.model_size}...")
+            self._model_ready.wait()
+        
+        if self._model_error is not None:
+            print(f"❌ Error cargando el modelo {self.model_size}: {self._model_error}")
+            raise RuntimeError(f"Modelo no cargado: {self._model_error}")
+        
+
+    def _is_rate_supported(self, rate):
+        """Comprobar si el dispositivo de entrada por defecto admite una tasa"""
+        try:
+            device = self.audio.get_default_input_device_info()
+            return self.audio.is_format_supported(
+                rate,
+                input_device=device["index"],
+                input_channels=self.CHANNELS,
+                input_format=self.FORMAT
+            )
+        except (ValueError, IOError):
+            return False
+        
+    def choose_capture_rate(self):
+        """Elegir la tasa de captura: 16 kHz nativos si es posible, si no la del perfil"""
+        if self.prefer_native_16k and self._is_rate_supported(self.WHISPER_RATE):
+            return self.WHISPER_RATE
+        if self._is_rate_supported(self.DEVICE_RATE):
+            return self.DEVICE_RATE
+        
+        # Último recurso: la tasa por defecto del dispositivo
+        try:
+            return int(self.audio.get_default_input_device_info()["defaultSampleRate"])
+        except (ValueError, IOError):
+            return self.DEVICE_RATE
+        
+    def _frames_per_buffer(self, rate):
+        """Bloque del dispositivo: el del perfil de calidad o el que da input_latency_ms"""
+        if self.input_latency_ms is None:
+            return self.CHUNK
+        return max(32, int(rate * self.input_latency_ms / 1000))
+        
+    def _ensure_persistent_capture(self):
+        """
+        Stream persistente abierto con la tasa y el bloque actuales
+        
+        Solo se reabre si cambian (por ejemplo, al cambiar la calidad de audio
+        a un perfil con otra tasa); si no, se reutiliza el que ya está abierto.
+        """
+        rate = self.choose_capture_rate()
+        key = (rate, self._frames_per_buffer(rate))
+        with self._stream_lock:
+            if self._persistent_capture is not None and self._persistent_key == key:
+                return self._persistent_capture
+            self._close_persistent_capture()
+            # El anillo guarda también el pre-roll
+            buffer_seconds = max(self.capture_buffer_seconds, 2 * self.preroll_ms / 1000)
+            capture = CallbackCapture(self.audio, rate, key[1], buffer_seconds)
+            capture.open(self.FORMAT, self.CHANNELS)
+            self._persistent_capture = capture
+            self._persistent_key = key
+        print(f"🎙️  Micrófono abierto de forma continua ({rate}Hz, pre-roll de {self.preroll_ms:.0f} ms)")
+        return capture
+        
+    def _close_persistent_capture(self):
+        if self._persistent_capture is not None:
+            self._persistent_capture.close()
+            self._persistent_capture = None
+            self._persistent_key = None
+        
+    def enable_always_open_stream(self):
+        """Mantener el micrófono abierto entre sesiones (se abre ya)"""
+        self.always_open_stream = True
+        try:
+            self._ensure_persistent_capture()
+        except OSError as e:
+            print(f"⚠️  No se pudo abrir el micrófono ({e}): se reintentará al grabar")
+        
+    def enable_capture_process(self):
+        """Capturar en un proceso propio (se arranca ya, así está listo al grabar)"""
+        self.capture_in_process = True
+        if self._capture_process is None:
+            self._capture_process = CaptureProcess(self.RATE, self.capture_ring_seconds)
         
     def start_recording(self):
         """Iniciar grabación manual (sin detección automática de silencio)"""
-        self.is_recording = True
-        self.audio_frames = []
-        
-        self.stream = self.audio.open(
-            format=self.FORMAT,
-            channels=self.CHANNELS,
-            rate=self.RATE,
-            input=True,
-            frames_per_buffer=self.CHUNK
-        )
+        # Buffer nuevo por sesión: el de la sesión anterior puede seguir en el pipeline
+        if self.long_recording:
+            session_dir = os.path.join(
+                self.project_root, "audio", f"sesion_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            )
+            self.audio_buffer = SegmentedAudioBuffer(session_dir, self.RATE, self.segment_seconds)
+        else:
+            self.audio_buffer = AudioBuffer(self.RATE)
+        self.endpoint_triggered = False
+        speech_heard = False
+        trailing_silence = 0  # Muestras de silencio desde la última voz
+        endpoint_samples = int(self.endpoint_silence_sec * self.RATE)
+        
+        if self.capture_in_process:
+            self.enable_capture_process()  # Lo arranca si aún no lo estaba
+        capture = self._capture_process if self.capture_in_process else None
+        callback = None
+        persistent = self.always_open_stream and capture is None
+        if persistent:
+            # Sin consultar el dispositivo: ya se comprobó al abrir o al cambiar la calidad
+            callback = self._persistent_capture or self._ensure_persistent_capture()
+            self.capture_rate = callback.rate
+            preroll = callback.begin_session(self.preroll_ms / 1000 * callback.rate)
+        else:
+            self.capture_rate = self.choose_capture_rate()
+        frames_per_buffer = callback.frames_per_buffer if persistent else self._frames_per_buffer(self.capture_rate)
+        period = frames_per_buffer / self.capture_rate
+        # En el proceso de captura se remuestrea allí: aquí llega ya a 16 kHz
+        if self.capture_rate != self.RATE and capture is None:
+            self._resampler = PolyphaseResampler(self.capture_rate, self.RATE)
+        else:
+            self._resampler = None
+        self.capture_stats = None
+        if capture is None and not persistent and self.capture_mode == "callback":
+            callback = CallbackCapture(self.audio, self.capture_rate, frames_per_buffer, self.capture_buffer_seconds)
+        
+        # Con el micrófono siempre abierto ya se está capturando: no hay nada que abrir
+        if not persistent:
+            with self._stream_lock:
+                if capture is not None:
+                    capture.start(self.capture_rate, frames_per_buffer)
+                elif callback is not None:
+                    self.stream = callback.open(self.FORMAT, self.CHANNELS)
+                else:
+                    self.stream = self.audio.open(
+                        format=self.FORMAT,
+                        channels=self.CHANNELS,
+                        rate=self.capture_rate,
+                        input=True,
+                        frames_per_buffer=frames_per_buffer
+                    )
         
-        print(f"🎤 Grabando... (Calidad: {self.audio_quality}, {self.RATE}Hz)")
+        if not self._first_recording_reported:
+            self._first_recording_reported = True
+            elapsed = time.perf_counter() - PROCESS_START
+            self.metrics.gauge("startup_first_recording_seconds").set(elapsed)
+            print(f"⚡ Primera grabación a los {elapsed:.2f}s del arranque")
+        
+        if self.capture_rate != self.RATE:
+            print(f"🎤 Grabando... (Calidad: {self.audio_quality}, {self.capture_rate}Hz → {self.RATE}Hz)")
+        else:
+            print(f"🎤 Grabando... (Calidad: {self.audio_quality}, {self.RATE}Hz nativos)")
+        if capture is not None:
+            print(f"🧵 Captura en proceso aparte (anillo de {self.capture_ring_seconds}s)")
+        elif persistent:
+            print(f"🎙️  Micrófono ya abierto: la sesión incluye {preroll / self.capture_rate * 1000:.0f} ms previos")
+        elif callback is not None:
+            latency = f", latencia de entrada {callback.input_latency * 1000:.0f} ms" if callback.input_latency else ""
+            print(f"🎛️  Captura por callback: bloques de {frames_per_buffer} muestras ({period * 1000:.0f} ms){latency}")
         print("🔴 GRABACIÓN ACTIVA - Presiona ESPACIO para parar, ESC para salir")
+        if self.auto_stop:
+            print(f"⏱️  Parada automática tras {self.endpoint_silence_sec:.1f}s de silencio")
         
         while self.is_recording:
             try:
-                data = self.stream.read(self.CHUNK, exception_on_overflow=False)
-                self.audio_frames.append(data)
+                if capture is not None:
+                    samples = capture.read(timeout=period)
+                else:
+                    if callback is not None:
+                        samples = callback.read(timeout=2 * period)
+                    else:
+                        data = self.stream.read(frames_per_buffer, exception_on_overflow=False)
+                        samples = np.frombuffer(data, dtype=np.int16)  # Vista sin copia
+                    if self._resampler is not None:
+                        samples = self._resampler.process_int16(samples)
+                self.audio_buffer.append(samples)
+                n_samples = len(samples)
+                
+                # Detección de fin de frase sobre el chunk recién llegado
+                if self.auto_stop and n_samples:
+                    if chunk_rms(samples) >= self.silence_threshold:
+                        speech_heard = True
+                        trailing_silence = 0
+                    elif speech_heard:
+                        trailing_silence += n_samples
+                        if trailing_silence >= endpoint_samples:
+                            print("\n⏹️  Fin de frase detectado, transcribiendo...")
+                            self.endpoint_triggered = True
+                            break
                         
             except Exception as e:
                 print(f"\nError en grabación: {e}")
                 break
+        
+        # Cerrar siempre: tras el fin de frase, o si la parada llegó antes de abrir el stream
+        self.stop_recording()
+        
+        # Lo que quedó en el anillo hasta la parada también es de esta sesión
+        if capture is not None:
+            try:
+                self.audio_buffer.append(capture.read(timeout=0))
+            except OSError:
+                pass
+            self.capture_stats = capture.session_stats()
+        elif callback is not None:
+            tail = callback.read(timeout=0)
+            if self._resampler is not None:
+                tail = self._resampler.process_int16(tail)
+            self.audio_buffer.append(tail)
+            self.capture_stats = callback.session_stats()
+        if self.capture_stats is not None:
+            self._report_capture_stats()
+        
+        # En grabación larga, volcar a disco el último segmento parcial
+        self.audio_buffer.finalize()
                 
+    def _report_capture_stats(self):
+        """Avisar de audio perdido en la captura y acumularlo en las métricas"""
+        stats = self.capture_stats
+        self.metrics.counter("capture_overflows_total").inc(stats["device_overflows"])
+        device_lost = stats.get("device_lost_seconds", 0)
+        self.metrics.counter("capture_lost_seconds_total").inc(stats["lost_seconds"] + device_lost)
+        self.metrics.counter("capture_underflows_total").inc(stats.get("device_underflows", 0))
+        self.metrics.counter("capture_late_callbacks_total").inc(stats.get("late_callbacks", 0))
+        if stats["device_overflows"]:
+            lost = f" ({device_lost:.2f}s)" if device_lost else ""
+            print(f"⚠️  El micrófono desbordó {stats['device_overflows']} vez/veces: se perdió audio en el dispositivo{lost}")
+        if stats.get("device_underflows"):
+            print(f"⚠️  {stats['device_underflows']} subdesbordamiento(s) del dispositivo de entrada")
+        if stats.get("late_callbacks"):
+            print(f"⚠️  {stats['late_callbacks']} callback(s) de captura llegaron tarde "
+                  f"(hueco máximo {stats['max_callback_gap_ms']:.0f} ms)")
+        if stats["lost_samples"]:
+            print(f"⚠️  Se perdieron {stats['lost_seconds']:.2f}s de audio: la lectura fue más de "
+                  f"{stats['ring_seconds']:.0f}s por detrás de la captura")
+        if stats["error"]:
+            print(f"⚠️  Error en el proceso de captura: {stats['error']}")
+    
+    def frames_to_whisper_audio(self, start_sample=0, end_sample=None):
+        """Convertir el audio grabado a float32 a 16 kHz (formato que espera Whisper)"""
+        return self.audio_buffer.to_float32(start_sample, end_sample)
+        
+    def _decode_caption_window(self, state, audio_np):
+        """Decodificar una ventana de audio en memoria para los subtítulos"""
+        with self._model_lock:
+            return self.model.transcribe(
+                audio_np,
+                language=self.language,
+                verbose=None,  # Sin salida por consola: los subtítulos se muestran aparte
+                condition_on_previous_text=False,
+                initial_prompt=state.committed_text[-200:] or None,
+                fp16=False
+            )
+        
+    def _commit_caption_segments(self, state, segments):
+        """Confirmar segmentos estables y avanzar el inicio de la ventana"""
+        offset = state.committed_sample / self.RATE
+        for segment in segments:
+            committed = dict(segment)
+            committed["start"] = segment["start"] + offset
+            committed["end"] = segment["end"] + offset
+            state.committed_segments.append(committed)
+            state.committed_text += segment["text"]
+            print(f"\r✅ {segment['text'].strip()}" + " " * 20)
+        
+        if segments:
+            state.committed_sample += int(segments[-1]["end"] * self.RATE)
+        
+    def _caption_loop(self, state):
+        """Hilo de subtítulos: decodificar la ventana sin confirmar mientras se graba"""
+        min_samples = self.RATE  # Esperar al menos 1 segundo de audio nuevo
+        
+        while not state.stop.wait(self.caption_interval):
+            if self.model is None:
+                continue  # El modelo aún se está cargando
+            
+            end_sample = len(state.audio_buffer)
+            window_samples = end_sample - state.committed_sample
+            if window_samples < min_samples:
+                continue
+            
+            try:
+                audio_np = state.audio_buffer.to_float32(state.committed_sample, end_sample)
+                segments = self._decode_caption_window(state, audio_np).get("segments", [])
+            except Exception as e:
+                print(f"\n⚠️  Error en subtítulos en vivo: {e}")
+                continue
+            
+            # Acuerdo local: se confirman los segmentos iniciales que coinciden
+            # con la decodificación anterior (el texto ha dejado de cambiar)
+            stable = []
+            for current, previous in zip(segments, state.prev_segments):
+                if current["text"].strip() != previous["text"].strip():
+                    break
+                stable.append(current)
+            
+            # Si la ventana crece demasiado sin acuerdo, forzar todo menos el último segmento
+            if not stable and window_samples / self.RATE > self.caption_max_window:
+                stable = segments[:-1]
+            
+            self._commit_caption_segments(state, stable)
+            
+            pending = segments[len(stable):]
+            state.prev_segments = pending
+            partial = "".join(seg["text"] for seg in pending).strip()
+            if partial != state.partial:
+                state.partial = partial
+                print(f"\r💬 {partial[-100:]}", end="", flush=True)
+        
+    def start_live_captions(self):
+        """Lanzar el hilo de subtítulos en vivo para la sesión actual"""
+        state = CaptionState(self.audio_buffer)
+        state.thread = threading.Thread(target=self._caption_loop, args=(state,), daemon=True)
+        state.thread.start()
+        self._captions = state
+        
+    def stop_live_captions(self):
+        """Parar los subtítulos de la sesión actual sin esperar al hilo; devuelve su estado"""
+        state, self._captions = self._captions, None
+        if state is not None:
+            state.stop.set()
+        return state
+        
+    def finish_live_captions(self, state):
+        """Decodificar solo la cola sin confirmar y devolver el resultado completo
+        
+        Se ejecuta en el pipeline: esperar al hilo de subtítulos o al modelo (que
+        puede estar transcribiendo otra sesión) no frena la siguiente grabación.
+        """
+        state.thread.join()
+        print()
+        
+        print("🔄 Transcribiendo cola pendiente...")
+        tail_audio = state.audio_buffer.to_float32(state.committed_sample)
+        if len(tail_audio) > 0:
+            tail_result = self._decode_caption_window(state, tail_audio)
+            self._commit_caption_segments(state, tail_result.get("segments", []))
+        
+        return {
+            "text": state.committed_text,
+            "segments": state.committed_segments,
+            "language": self.language
+        }
+        
     def stop_recording(self):
         """Detener grabación"""
         self.is_recording = False
-        if self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
+        with self._stream_lock:
+            if self._capture_process is not None:
+                self._capture_process.stop()
+            if self.stream:
+                self.stream.stop_stream()
+                self.stream.close()
+                self.stream = None
             
-    def save_audio(self, filename):
+    def save_audio(self, filename, audio_buffer=None, validate=True):
         """Guardar audio grabado con validación mejorada"""
+        if audio_buffer is None:
+            audio_buffer = self.audio_buffer
+        
         # Crear carpeta audio en la raíz del proyecto
         audio_dir = os.path.join(self.project_root, "audio")
         os.makedirs(audio_dir, exist_ok=True)
@@ -169,9 +752,14 @@ class RealtimeTranscriber:
             wf.setnchannels(self.CHANNELS)
             wf.setsampwidth(self.audio.get_sample_size(self.FORMAT))
             wf.setframerate(self.RATE)
-            wf.writeframes(b''.join(self.audio_frames))
+            # Escritura directa desde el buffer, sin copia (por segmentos en grabación larga)
+            for block in audio_buffer.iter_blocks():
+                wf.writeframes(block)
             wf.close()
             
+            if not validate:
+                return filepath
+            
             # VALIDACIÓN MEJORADA DEL ARCHIVO
             print(f"📊 Validando archivo de audio...")
             
@@ -219,10 +807,51 @@ class RealtimeTranscriber:
         
         return filepath
         
-    def transcribe_audio(self, audio_path):
-        """Transcribir audio con diagnóstico mejorado"""
+    def save_audio_async(self, filename, session=None):
+        """Archivar el WAV en un hilo en segundo plano, sin bloquear la transcripción"""
+        audio_buffer = self.audio_buffer  # Cada sesión crea un buffer nuevo, este no se modifica más
+        
+        def _archive():
+            try:
+                with self.tracer.span("archivar_wav", session):
+                    filepath = self.save_audio(filename, audio_buffer=audio_buffer, validate=False)
+                print(f"💾 Audio archivado: {filepath}")
+            except Exception:
+                pass  # save_audio ya informa del error
+        
+        # Descartar hilos de archivado ya terminados
+        self._archive_threads = [t for t in self._archive_threads if t.is_alive()]
+        thread = threading.Thread(target=_archive)
+        thread.start()
+        self._archive_threads.append(thread)
+        
+    def transcribe_audio(self, audio):
+        """Transcribir audio con diagnóstico mejorado
+        
+        Acepta la ruta de un archivo o un array float32 mono a 16 kHz ya en memoria.
+        Con el array se evitan la escritura del WAV, la comprobación con librosa y
+        el subproceso de ffmpeg que Whisper lanza para decodificar archivos.
+        
+        El diagnóstico de archivos (con la carga de prueba en librosa) solo se
+        hace con self.diagnostics; si no, el archivo se decodifica una vez.
+        """
         print("🔄 Transcribiendo...")
         
+        if isinstance(audio, np.ndarray):
+            return self._transcribe_array(audio)
+        
+        audio_path = audio
+        
+        if not self.diagnostics:
+            import whisper
+            try:
+                with self.tracer.span("decodificar_audio"):
+                    audio_np = whisper.load_audio(os.path.abspath(audio_path))
+            except Exception as e:
+                self._print_transcription_error(e, audio_path)
+                raise
+            return self._transcribe_array(audio_np)
+        
         # DIAGNÓSTICO PREVIO A LA TRANSCRIPCIÓN
         print(f"🔍 Diagnóstico del archivo:")
         print(f"   • Ruta: {audio_path}")
@@ -249,10 +878,13 @@ class RealtimeTranscriber:
             
             # Verificar que Whisper puede acceder al archivo
             import librosa
+            is_long = False
             try:
                 # Intentar cargar con librosa (que usa Whisper internamente)
-                y, sr = librosa.load(abs_path, sr=None)
+                with self.tracer.span("comprobar_librosa"):
+                    y, sr = librosa.load(abs_path, sr=None)
                 print(f"   • Carga con librosa exitosa: {len(y)} samples, {sr} Hz")
+                is_long = len(y) / sr > 2 * self.long_audio_chunk_sec
             except Exception as librosa_error:
                 print(f"   ❌ Error con librosa: {librosa_error}")
                 # Intentar con una copia temporal
@@ -263,15 +895,21 @@ class RealtimeTranscriber:
                 abs_path = temp_path
                 print(f"   • Usando archivo temporal: {abs_path}")
             
+            if is_long:
+                # Audio largo: trocear en silencios en lugar de una sola pasada
+                import whisper
+                return self._transcribe_array(whisper.load_audio(abs_path))
+            
             # Transcribir con configuración robusta
-            result = self.model.transcribe(
-                abs_path,
-                language=self.language,
-                word_timestamps=True,
-                verbose=True,  # Activar verbose para más información
-                condition_on_previous_text=False,  # Evitar condicionamiento previo
-                fp16=False  # Desactivar FP16 para mayor compatibilidad
-            )
+            with self._model_lock, self.tracer.span("whisper"):
+                result = self.model.transcribe(
+                    abs_path,
+                    language=self.language,
+                    word_timestamps=True,
+                    verbose=True,  # Activar verbose para más información
+                    condition_on_previous_text=False,  # Evitar condicionamiento previo
+                    fp16=False  # Desactivar FP16 para mayor compatibilidad
+                )
             
             # Limpiar archivo temporal si se creó
             if 'temp_path' in locals() and os.path.exists(temp_path):
@@ -281,27 +919,111 @@ class RealtimeTranscriber:
             return result
             
         except Exception as e:
-            print(f"❌ Error detallado en transcripción:")
-            print(f"   • Tipo de error: {type(e).__name__}")
-            print(f"   • Mensaje: {str(e)}")
-            print(f"   • Archivo problemático: {audio_path}")
-            
-            # Información adicional del sistema
-            print(f"🔧 Información del sistema:")
-            print(f"   • Python: {os.sys.version}")
-            print(f"   • Directorio actual: {os.getcwd()}")
-            print(f"   • Whisper instalado: {hasattr(whisper, '__version__')}")
-            
-            # Sugerencias de solución
-            print(f"💡 Posibles soluciones:")
-            print(f"   1. Verifica que ffmpeg esté instalado y en PATH")
-            print(f"   2. Intenta con calidad de audio 'medium' o 'low'")
-            print(f"   3. Verifica permisos de la carpeta de audio")
-            print(f"   4. Reinicia el programa")
-            
+            self._print_transcription_error(e, audio_path)
             raise
         
-    def save_transcription(self, text, filename, keywords=None, confidence_info=None):
+    def _transcribe_array(self, audio_np):
+        """Transcribir directamente un array float32 a 16 kHz"""
+        duration = len(audio_np) / self.WHISPER_RATE
+        print(f"   • Audio en memoria: {len(audio_np)} muestras, {duration:.2f} segundos a {self.WHISPER_RATE} Hz")
+        
+        if self.model is None:
+            print("❌ ERROR: El modelo no está cargado")
+            raise RuntimeError("Modelo no cargado")
+        
+        if duration < 0.1:
+            print("   ⚠️  ADVERTENCIA: Duración muy corta")
+        
+        if duration > 2 * self.long_audio_chunk_sec:
+            # Cada trozo dura menos de dos ventanas, así que no vuelve a entrar aquí
+            return self._transcribe_long(len(audio_np), lambda s, e: audio_np[s:e], self._transcribe_array)
+        
+        try:
+            with self._model_lock, self.tracer.span("whisper", audio_seconds=round(duration, 3)):
+                return self.model.transcribe(
+                    audio_np,
+                    language=self.language,
+                    word_timestamps=True,
+                    verbose=True,
+                    condition_on_previous_text=False,
+                    fp16=False
+                )
+        except Exception as e:
+            self._print_transcription_error(e, "audio en memoria")
+            raise
+        
+    def transcribe_segmented(self, audio_buffer):
+        """Transcribir una grabación larga por trozos, con memoria acotada
+        
+        Los cortes se hacen en silencios cercanos a cada frontera de trozo (no en
+        mitad de una palabra). Cada trozo se lee con memmap y se convierte a
+        float32 al decodificarlo; los tiempos se refieren al inicio de la grabación.
+        """
+        vad = None
+        if self.silence_detection:
+            # En el pool cada trabajador recorta los silencios de su trozo (como transcribe_speech)
+            vad = {"threshold": self.silence_threshold, "hangover_ms": self.vad_hangover_ms}
+        return self._transcribe_long(len(audio_buffer), audio_buffer.to_float32, self.transcribe_speech, vad)
+        
+    def _transcribe_long(self, total_samples, read, decode, vad=None):
+        """Trocear en silencios y decodificar en serie con `decode` o en el pool de procesos con `vad`"""
+        try:
+            return transcribe_long(
+                total_samples, read, self.RATE,
+                decode=decode,
+                pool=self._get_long_audio_pool(),
+                vad=vad,
+                chunk_seconds=self.long_audio_chunk_sec,
+                max_in_flight=2 * max(1, self.long_audio_workers),
+                language=self.language,
+                word_timestamps=True,
+                condition_on_previous_text=False,
+                fp16=False
+            )
+        except Exception as e:
+            self._print_transcription_error(e, "audio largo por trozos")
+            raise
+        
+    def _get_long_audio_pool(self):
+        """Pool de procesos para audio largo (se reutiliza mientras no cambie el modelo)"""
+        if self.long_audio_workers <= 1:
+            return None
+        
+        key = (self.model_size, self.long_audio_workers)
+        if self._long_audio_pool is not None and self._long_audio_pool_key != key:
+            self._long_audio_pool.shutdown()
+            self._long_audio_pool = None
+        if self._long_audio_pool is None:
+            print(f"🧵 Iniciando {self.long_audio_workers} procesos para audio largo (modelo {self.model_size})")
+            self._long_audio_pool = create_worker_pool(self.model_size, self.long_audio_workers)
+            self._long_audio_pool_key = key
+        return self._long_audio_pool
+        
+    def _print_transcription_error(self, e, source):
+        """Mostrar diagnóstico detallado de un error de transcripción"""
+        print(f"❌ Error detallado en transcripción:")
+        print(f"   • Tipo de error: {type(e).__name__}")
+        print(f"   • Mensaje: {str(e)}")
+        print(f"   • Archivo problemático: {source}")
+        
+        # Información adicional del sistema
+        print(f"🔧 Información del sistema:")
+        print(f"   • Python: {os.sys.version}")
+        print(f"   • Directorio actual: {os.getcwd()}")
+        try:
+            import whisper
+            print(f"   • Whisper instalado: {hasattr(whisper, '__version__')}")
+        except ImportError:
+            print("   • Whisper instalado: False")
+        
+        # Sugerencias de solución
+        print(f"💡 Posibles soluciones:")
+        print(f"   1. Verifica que ffmpeg esté instalado y en PATH")
+        print(f"   2. Intenta con calidad de audio 'medium' o 'low'")
+        print(f"   3. Verifica permisos de la carpeta de audio")
+        print(f"   4. Reinicia el programa")
+        
+    def save_transcription(self, text, filename, keywords=None, confidence_info=None, timing=None, capture=None):
         """Guardar transcripción con información adicional"""
         # Crear carpeta output en la raíz del proyecto
         output_dir = os.path.join(self.project_root, "output", filename)
@@ -312,7 +1034,7 @@ class RealtimeTranscriber:
             f.write(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write(f"Modelo: {self.model_size}\n")
             f.write(f"Idioma: {self.language}\n")
-            f.write(f"Calidad de audio: {self.audio_quality} ({self.RATE}Hz)\n")
+            f.write(f"Calidad de audio: {self.audio_quality} ({self.DEVICE_RATE}Hz)\n")
             f.write("-" * 50 + "\n")
             f.write("TRANSCRIPCIÓN:\n")
             f.write(text)
@@ -345,21 +1067,42 @@ class RealtimeTranscriber:
             "keywords": keywords or [],
             "confidence_analysis": confidence_info or []
         }
+        if timing:
+            data["timing"] = timing
+        if capture:
+            data["capture"] = capture
         
         with open(json_filepath, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         
         return filepath
         
+    def wait_for_key(self, *keys):
+        """
+        Bloquear hasta que se pulse una de `keys` y devolver su nombre
+        
+        Espera eventos del teclado en vez de sondear cada 0.1s, y no vuelve hasta
+        que se suelta la tecla para que la pulsación no llegue al siguiente menú.
+        """
+        while True:
+            event = keyboard.read_event()
+            if event.event_type == keyboard.KEY_DOWN and event.name in keys:
+                break
+        while True:
+            release = keyboard.read_event()
+            if release.event_type == keyboard.KEY_UP and release.name == event.name:
+                return event.name
+        
     def show_main_menu(self):
         """Mostrar menú principal al iniciar"""
         print("\n" + "="*60)
         print("🎙️  TRANSCRIPTOR EN TIEMPO REAL - WHISPER")
         print("="*60)
         print(f"📊 Configuración actual:")
-        print(f"   • Modelo: {self.model_size}")
+        print(f"   • Modelo: {self.model_size} ({self.model_status()})")
         print(f"   • Idioma: {self.language}")
-        print(f"   • Calidad audio: {self.audio_quality} ({self.RATE}Hz)")
+        print(f"   • Calidad audio: {self.audio_quality} ({self.DEVICE_RATE}Hz)")
+        print(f"   • Subtítulos en vivo: {'ON' if self.live_captions else 'OFF'}")
         print("="*60)
         print("1️⃣  Iniciar transcripción")
         print("2️⃣  Configurar ajustes")
@@ -368,28 +1111,18 @@ class RealtimeTranscriber:
         print("-" * 60)
         print("Elige una opción (1/2/3/4)...")
         
-        while True:
-            if keyboard.is_pressed('1'):
-                while keyboard.is_pressed('1'): time.sleep(0.1)
-                print("✅ Iniciando modo transcripción...")
-                return "transcribe"
-                
-            elif keyboard.is_pressed('2'):
-                while keyboard.is_pressed('2'): time.sleep(0.1)
-                print("✅ Abriendo configuración...")
-                return "config"
-                
-            elif keyboard.is_pressed('3'):
-                while keyboard.is_pressed('3'): time.sleep(0.1)
-                print("✅ Mostrando información de modelos...")
-                return "models"
-                
-            elif keyboard.is_pressed('4') or keyboard.is_pressed('esc'):
-                while keyboard.is_pressed('4') or keyboard.is_pressed('esc'): time.sleep(0.1)
-                print("✅ Saliendo del programa...")
-                return "exit"
-            
-            time.sleep(0.1)
+        key = self.wait_for_key('1', '2', '3', '4', 'esc')
+        if key == '1':
+            print("✅ Iniciando modo transcripción...")
+            return "transcribe"
+        elif key == '2':
+            print("✅ Abriendo configuración...")
+            return "config"
+        elif key == '3':
+            print("✅ Mostrando información de modelos...")
+            return "models"
+        print("✅ Saliendo del programa...")
+        return "exit"
     
     def show_model_info(self):
         """Mostrar información de modelos disponibles"""
@@ -412,6 +1145,14 @@ class RealtimeTranscriber:
             current = " ← ACTUAL" if model == self.model_size else ""
             print(f"🔸 {model:8} | {info['size']:8} | {info['speed']:4} | {info['quality']} {current}")
         
+        loaded = self.model_registry.loaded()
+        if loaded:
+            budget_mb = self.model_registry.max_memory_bytes / (1024 * 1024)
+            resident = ", ".join(f"{key[0]} ({key[1]}, {size:.0f} MB)" for key, size in loaded)
+            print("-" * 60)
+            print(f"🧠 En memoria: {resident}")
+            print(f"   Presupuesto: {sum(size for _, size in loaded):.0f}/{budget_mb:.0f} MB")
+        
         print("-" * 60)
         print("💡 Recomendaciones:")
         print("   🚀 Para velocidad: tiny, base")
@@ -420,13 +1161,14 @@ class RealtimeTranscriber:
         print("   🎮 Tu RTX 3060: Cualquier modelo funciona bien")
         
         print("\nPresiona ENTER para volver al menú principal...")
-        while True:
-            if keyboard.is_pressed('enter'):
-                while keyboard.is_pressed('enter'): time.sleep(0.1)
-                break
-            time.sleep(0.1)
+        self.wait_for_key('enter')
+    
     def run_continuous(self):
         """Flujo principal del programa"""
+        elapsed = time.perf_counter() - PROCESS_START
+        self.metrics.gauge("startup_menu_seconds").set(elapsed)
+        print(f"⚡ Menú listo en {elapsed:.2f}s (el modelo sigue cargando en segundo plano)")
+        
         # Mostrar menú principal primero
         while True:
             choice = self.show_main_menu()
@@ -443,13 +1185,18 @@ class RealtimeTranscriber:
     
     def start_transcription_mode(self):
         """Modo de transcripción (el código anterior)"""
-        # Cargar modelo solo cuando se necesite
-        if self.model is None:
-            self.load_model()
+        # El modelo se carga en segundo plano: se puede grabar mientras tanto
+        if not self._model_ready.is_set():
+            print(f"⏳ El modelo {self.model_size} se sigue cargando; puedes empezar a grabar")
+        elif self._model_error is not None:
+            self.preload_model()  # Reintentar la carga
         
         session_num = 1
-        last_transcription = ""
-        last_transcription_file = ""
+        self.last_transcription = ""
+        self.last_transcription_file = ""
+        self.tracer = Tracer()  # Los números de sesión vuelven a empezar en 1
+        pipeline = self._create_session_pipeline()
+        self._pipeline = pipeline
         
         print("\n" + "="*60)
         print("🎙️  MODO TRANSCRIPCIÓN ACTIVADO")
@@ -457,6 +1204,8 @@ class RealtimeTranscriber:
         print("Controles durante grabación:")
         print("  ESPACIO: Parar grabación y transcribir")
         print("  ESC: Volver al menú principal")
+        if self.auto_stop:
+            print(f"  (La grabación también para sola tras {self.endpoint_silence_sec:.1f}s de silencio)")
         print("="*60)
         
         try:
@@ -469,7 +1218,9 @@ class RealtimeTranscriber:
                     if choice == "nueva":
                         pass  # Continúa con nueva grabación
                     elif choice == "mostrar":
-                        self.show_last_transcription(last_transcription, last_transcription_file)
+                        if pipeline.pending():
+                            print(f"⏳ {pipeline.pending()} sesión(es) aún en proceso")
+                        self.show_last_transcription(self.last_transcription, self.last_transcription_file)
                         continue  # Volver al menú
                     elif choice == "config":
                         self.show_config_menu()
@@ -481,98 +1232,364 @@ class RealtimeTranscriber:
                         exit()
                 
                 print("🎤 Presiona ENTER para empezar a grabar...")
+                if self.wait_for_key('enter', 'esc') == 'esc':
+                    return  # Volver al menú principal
                 
-                # Esperar ENTER para empezar
-                start_recording = False
-                while not start_recording:
-                    if keyboard.is_pressed('enter'):
-                        start_recording = True
-                    elif keyboard.is_pressed('esc'):
-                        return  # Volver al menú principal
-                    time.sleep(0.1)
-                
-                # Empezar grabación en hilo separado
-                recording_thread = threading.Thread(target=self.start_recording)
-                recording_thread.start()
-                
-                # Esperar ESPACIO para parar o ESC para salir
-                while self.is_recording:
-                    if keyboard.is_pressed('space'):
-                        self.stop_recording()
-                        break
-                    elif keyboard.is_pressed('esc'):
-                        self.stop_recording()
-                        recording_thread.join()
-                        return  # Volver al menú principal
-                    time.sleep(0.1)
+                # ESPACIO para y ESC cancela; las teclas y el fin de frase automático
+                # llegan como órdenes a la misma cola, que se atiende al momento
+                channel = ControlChannel()
+                hooks = [
+                    keyboard.on_press_key('space', lambda e: channel.post("stop", source="teclado")),
+                    keyboard.on_press_key('esc', lambda e: channel.post("cancel", source="teclado"))
+                ]
+                try:
+                    recording_start, recording_thread = self._begin_recording(channel)
+                    cancelled = False
+                    while True:
+                        command = channel.get()
+                        if command.name == "stop":
+                            self.stop_recording()
+                        elif command.name == "cancel":
+                            cancelled = True
+                            self.stop_recording()
+                        elif command.name == "_recorded":
+                            break
+                finally:
+                    for hook in hooks:
+                        keyboard.unhook(hook)
                 
                 recording_thread.join()
+                if cancelled:
+                    self._discard_recording()
+                    return  # Volver al menú principal
                 
-                if len(self.audio_frames) > 0:
-                    # Guardar audio
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    audio_filename = f"grabacion_{timestamp}.wav"
-                    
-                    try:
-                        audio_path = self.save_audio(audio_filename)
-                        print(f"💾 Audio guardado: {audio_path}")
-                        
-                        # Transcribir
-                        result = self.transcribe_audio(audio_path)
-                        transcription = result["text"]
-                        
-                        # Análisis de palabras clave
-                        keywords = self.extract_keywords(transcription)
-                        
-                        # Análisis de confianza
-                        confidence_info = self.analyze_confidence(result)
-                        
-                        print("\n" + "="*50)
-                        print("📝 TRANSCRIPCIÓN:")
-                        print("="*50)
-                        print(transcription)
-                        
-                        # Mostrar palabras clave si se encontraron
-                        if keywords:
-                            print("\n" + "🔍 PALABRAS CLAVE DETECTADAS:")
-                            print("-" * 30)
-                            for kw in keywords[:5]:  # Mostrar solo las primeras 5
-                                print(f"🔑 {kw['keyword'].upper()}: {kw['context']}")
-                        
-                        # Mostrar análisis de confianza
-                        if confidence_info:
-                            print(f"\n📊 ANÁLISIS DE CONFIANZA:")
-                            print("-" * 30)
-                            for segment in confidence_info[:3]:  # Mostrar solo los primeros 3
-                                print(f"{segment['confidence_level']} [{segment['start']:.1f}s]: {segment['text'][:50]}...")
-                        
-                        print("="*50)
-                        
-                        # Guardar transcripción con toda la información
-                        trans_filename = f"transcripcion_{timestamp}"
-                        trans_path = self.save_transcription(transcription, trans_filename, keywords, confidence_info)
-                        print(f"💾 Transcripción guardada: {trans_path}")
-                        
-                        # Guardar para mostrar en menú
-                        last_transcription = transcription
-                        last_transcription_file = trans_path
-                        
-                    except Exception as e:
-                        print(f"❌ Error en el proceso: {e}")
-                        last_transcription = ""
-                        last_transcription_file = ""
-                else:
-                    print("⚠️  No se grabó audio")
-                    last_transcription = ""
-                    last_transcription_file = ""
-                
+                self._submit_recording(pipeline, session_num, recording_start)
                 session_num += 1
-                time.sleep(1)  # Pausa pequeña
                 
         except KeyboardInterrupt:
             print("\n👋 ¡Hasta luego!")
         finally:
+            if pipeline.pending():
+                print(f"⏳ Esperando a que terminen {pipeline.pending()} sesión(es) pendiente(s)...")
+            pipeline.close()
+            self._pipeline = None
+            self.cleanup()
+            if self.chrome_trace and self.tracer.spans:
+                trace_name = f"traza_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                trace_path = self.tracer.write_chrome_trace(
+                    os.path.join(self.project_root, "output", "trazas", trace_name))
+                print(f"📈 Traza guardada: {trace_path} (ábrela en ui.perfetto.dev)")
+    
+    def _begin_recording(self, channel):
+        """
+        Grabar en un hilo aparte y avisar con la orden interna "_recorded" al terminar
+        
+        El aviso llega tanto si se paró con una orden como por el fin de frase
+        automático, así quien espera en `channel` no necesita sondear is_recording.
+        """
+        def _record():
+            try:
+                self.start_recording()
+            finally:
+                channel.post("_recorded")
+        
+        # Antes de arrancar el hilo: una parada inmediata no se pierde
+        self.is_recording = True
+        recording_start = time.perf_counter()
+        recording_thread = threading.Thread(target=_record, name="grabacion")
+        recording_thread.start()
+        
+        if self.live_captions:
+            self.start_live_captions()
+        return recording_start, recording_thread
+    
+    def _discard_recording(self):
+        """Descartar la grabación recién parada (cancelada)"""
+        self.stop_live_captions()  # El hilo termina solo; su resultado se descarta
+        if isinstance(self.audio_buffer, SegmentedAudioBuffer) and not self.archive_audio:
+            self.audio_buffer.remove()
+        print("🗑️  Grabación descartada")
+    
+    def _submit_recording(self, pipeline, session_num, recording_start):
+        """Preparar la sesión recién grabada y encolarla para transcribir y guardar"""
+        stopped_at = time.perf_counter()
+        self.tracer.add("grabar", recording_start, stopped_at - recording_start, session_num)
+        
+        if len(self.audio_buffer) == 0:
+            print("⚠️  No se grabó audio")
+            return False
+        
+        # Guardar audio
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        audio_filename = f"grabacion_{timestamp}.wav"
+        
+        try:
+            # Archivar el WAV en segundo plano (opcional). En grabación
+            # larga los propios segmentos en disco ya son el archivo
+            if self.archive_audio and not self.long_recording:
+                self.save_audio_async(audio_filename, session_num)
+            
+            session = {
+                "num": session_num,
+                "timestamp": timestamp,
+                "audio_filename": audio_filename,
+                "audio": None,
+                "buffer": None,
+                "result": None,
+                "audio_seconds": self.audio_buffer.duration(),
+                "stopped_at": stopped_at,
+                "capture": self.capture_stats,
+                "captions": None
+            }
+            
+            if self.long_recording and not self.live_captions:
+                # Se transcribe leyendo los segmentos de disco, sin cargarlo todo
+                session["buffer"] = self.audio_buffer
+                print(f"💾 Segmentos en: {self.audio_buffer.directory}")
+            elif self._captions is not None:
+                # La cola de subtítulos se termina en el pipeline con el estado de esta sesión
+                session["captions"] = self.stop_live_captions()
+            else:
+                with self.tracer.span("convertir_audio", session_num):
+                    session["audio"] = self.frames_to_whisper_audio()
+            
+            # Transcribir y guardar en segundo plano, en orden
+            if pipeline.is_full() and self.backpressure == "block":
+                print("⏳ La transcripción va con retraso: esperando hueco en la cola...")
+            with self.tracer.span("cola_espera", session_num):
+                pipeline.submit(session)
+            print(f"📥 Sesión {session_num} en cola ({pipeline.pending()} pendiente(s))")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error en el proceso: {e}")
+            return False
+    
+    def run_headless(self, channel):
+        """
+        Modo sin teclado: atender las órdenes de `channel` según llegan
+        
+        start, stop, toggle, cancel, model <nombre>, status y quit, desde stdin,
+        un socket local o señales (ver control.py). El bucle se bloquea en la cola
+        de órdenes, así que cada una se atiende al momento y no hay sondeo.
+        """
+        session_num = 1
+        self.tracer = Tracer()
+        pipeline = self._create_session_pipeline()
+        self._pipeline = pipeline
+        recording_thread = None
+        recording_start = None
+        cancelled = False
+        
+        print("🛰️  Modo sin teclado: órdenes start, stop, toggle, cancel, model <nombre>, status, quit")
+        try:
+            while True:
+                command = channel.get()
+                name = command.name
+                recording = recording_thread is not None
+                if name == "toggle":
+                    name = "stop" if recording else "start"
+                
+                if name == "start":
+                    if recording:
+                        command.respond(False, error="ya se está grabando")
+                        continue
+                    if self._model_ready.is_set() and self._model_error is not None:
+                        self.preload_model()  # Reintentar la carga
+                    cancelled = False
+                    print(f"\n--- SESIÓN {session_num} ---")
+                    recording_start, recording_thread = self._begin_recording(channel)
+                    command.respond(session=session_num)
+                
+                elif name in ("stop", "cancel"):
+                    if not recording:
+                        command.respond(False, error="no se está grabando")
+                        continue
+                    cancelled = name == "cancel"
+                    self.stop_recording()
+                    command.respond(session=session_num)
+                
+                elif name == "_recorded":
+                    # La grabación terminó (por orden o por fin de frase)
+                    recording_thread.join()
+                    recording_thread = None
+                    if cancelled:
+                        self._discard_recording()
+                    else:
+                        self._submit_recording(pipeline, session_num, recording_start)
+                        session_num += 1
+                
+                elif name == "model":
+                    if not command.args:
+                        command.respond(False, error="falta el nombre del modelo")
+                        continue
+                    try:
+                        instant = self.switch_model(command.args[0])
+                    except ValueError as e:
+                        command.respond(False, error=str(e))
+                        continue
+                    print(f"🔄 Modelo: {self.model_size} ({'en memoria' if instant else 'cargando'})")
+                    command.respond(model=self.model_size, ready=instant)
+                
+                elif name == "status":
+                    command.respond(
+                        recording=recording,
+                        session=session_num,
+                        model=self.model_size,
+                        model_status=self.model_status(),
+                        pending=pipeline.pending(),
+                        last_transcription_file=self.last_transcription_file
+                    )
+                
+                elif name == "quit":
+                    # Cerrar ordenadamente: lo que se estaba grabando se transcribe
+                    if recording:
+                        self.stop_recording()
+                        recording_thread.join()
+                        self._submit_recording(pipeline, session_num, recording_start)
+                    command.respond()
+                    return
+                
+        finally:
+            if pipeline.pending():
+                print(f"⏳ Esperando a que terminen {pipeline.pending()} sesión(es) pendiente(s)...")
+            pipeline.close()
+            self._pipeline = None
+            channel.close()
             self.cleanup()
+            if self.chrome_trace and self.tracer.spans:
+                trace_name = f"traza_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                trace_path = self.tracer.write_chrome_trace(
+                    os.path.join(self.project_root, "output", "trazas", trace_name))
+                print(f"📈 Traza guardada: {trace_path} (ábrela en ui.perfetto.dev)")
+    
+    def _create_session_pipeline(self):
+        """Crear el pipeline transcribir → analizar y guardar"""
+        return SessionPipeline(
+            stages=[
+                ("transcribir", self._transcribe_session),
+                ("guardar", self._persist_session)
+            ],
+            max_pending=self.max_pending_sessions,
+            backpressure=self.backpressure,
+            on_error=self._on_session_error,
+            on_drop=self._on_session_dropped
+        )
+    
+    def _transcribe_session(self, session):
+        """Etapa 1 del pipeline: transcribir el audio de una sesión"""
+        if session["result"] is None:
+            with self.tracer.session(session["num"]):
+                with self.tracer.span("esperar_modelo"):
+                    self.wait_for_model()
+                if session["captions"] is not None:
+                    with self.tracer.span("subtitulos_finalizar"):
+                        session["result"] = self.finish_live_captions(session["captions"])
+                    session["captions"] = None
+                else:
+                    self._transcribe_session_audio(session)
+            session["audio"] = None  # Liberar el audio en cuanto ya no hace falta
+        return session
+    
+    def _transcribe_session_audio(self, session):
+        """Transcribir el audio de la sesión (segmentos en disco o array en memoria)"""
+        with self.tracer.span("transcribir"):
+            if session["buffer"] is not None:
+                session["result"] = self.transcribe_segmented(session["buffer"])
+                if not self.archive_audio:
+                    session["buffer"].remove()
+                session["buffer"] = None
+            else:
+                session["result"] = self.transcribe_speech(session["audio"])
+    
+    def _persist_session(self, session):
+        """Etapa 2 del pipeline: analizar, mostrar y guardar la transcripción"""
+        result = session["result"]
+        transcription = result["text"]
+        
+        # Análisis de palabras clave
+        with self.tracer.span("palabras_clave", session["num"]):
+            keywords = self.extract_keywords(transcription)
+        
+        # Análisis de confianza
+        with self.tracer.span("confianza", session["num"]):
+            confidence_info = self.analyze_confidence(result)
+        
+        print("\n" + "="*50)
+        print(f"📝 TRANSCRIPCIÓN (sesión {session['num']}):")
+        print("="*50)
+        print(transcription)
+        
+        # Mostrar palabras clave si se encontraron
+        if keywords:
+            print("\n" + "🔍 PALABRAS CLAVE DETECTADAS:")
+            print("-" * 30)
+            for kw in keywords[:5]:  # Mostrar solo las primeras 5
+                print(f"🔑 {kw['keyword'].upper()}: {kw['context']}")
+        
+        # Mostrar análisis de confianza
+        if confidence_info:
+            print(f"\n📊 ANÁLISIS DE CONFIANZA:")
+            print("-" * 30)
+            for segment in confidence_info[:3]:  # Mostrar solo los primeros 3
+                print(f"{segment['confidence_level']} [{segment['start']:.1f}s]: {segment['text'][:50]}...")
+        
+        print("="*50)
+        
+        # Tiempos por etapa (el propio guardado queda fuera: aún no ha ocurrido)
+        timing = self._session_timing(session)
+        self._record_session_metrics(timing)
+        rtf = f"{timing['rtf']:.2f}" if timing["rtf"] is not None else "-"
+        print(f"⏱️  Parada → texto: {timing['stop_to_text']:.2f}s | RTF: {rtf}")
+        
+        # Guardar transcripción con toda la información
+        trans_filename = f"transcripcion_{session['timestamp']}"
+        with self.tracer.span("guardar_transcripcion", session["num"]):
+            trans_path = self.save_transcription(transcription, trans_filename, keywords, confidence_info, timing,
+                                                 session["capture"])
+        print(f"💾 Transcripción guardada: {trans_path}")
+        
+        # Guardar para mostrar en menú
+        self.last_transcription = transcription
+        self.last_transcription_file = trans_path
+        return session
+    
+    def _session_timing(self, session):
+        """Duraciones por etapa, factor de tiempo real y latencia desde que se paró la grabación"""
+        stages = self.tracer.durations(session["num"])
+        audio_seconds = session["audio_seconds"]
+        transcribe = stages.get("transcribir", stages.get("subtitulos_finalizar", 0.0))
+        return {
+            "stages": stages,
+            "audio_seconds": round(audio_seconds, 3),
+            "rtf": round(transcribe / audio_seconds, 4) if audio_seconds > 0 else None,
+            "stop_to_text": round(time.perf_counter() - session["stopped_at"], 4)
+        }
+    
+    def _record_session_metrics(self, timing):
+        """Acumular los tiempos de una sesión en las métricas del proceso"""
+        m = self.metrics
+        m.counter("sessions_total").inc()
+        m.counter("audio_seconds_total").inc(timing["audio_seconds"])
+        m.histogram("stop_to_text_seconds").observe(timing["stop_to_text"])
+        if "transcribir" in timing["stages"]:
+            m.histogram("transcription_seconds").observe(timing["stages"]["transcribir"])
+        if timing["rtf"] is not None:
+            m.histogram("rtf").observe(timing["rtf"])
+    
+    def _on_session_error(self, stage, session, e):
+        """Informar de un error en una etapa del pipeline"""
+        self.metrics.counter("session_errors_total").inc()
+        print(f"❌ Error en el proceso (sesión {session['num']}, etapa {stage}): {e}")
+        self.last_transcription = ""
+        self.last_transcription_file = ""
+    
+    def _on_session_dropped(self, session):
+        """Informar de una sesión descartada por la política drop_oldest"""
+        self.metrics.counter("sessions_dropped_total").inc()
+        print(f"⚠️  Sesión {session['num']} descartada: la transcripción va con retraso")
+        if self.archive_audio:
+            print(f"   El audio sigue archivado en audio/{session['audio_filename']}")
     
     def show_session_menu(self):
         """Mostrar menú entre sesiones"""
@@ -587,46 +1604,21 @@ class RealtimeTranscriber:
         print("-" * 50)
         print("Elige una opción (1/2/3/4/5)...")
         
-        option_selected = False
-        
-        while not option_selected:
-            # Detectar teclas con control de estado
-            if keyboard.is_pressed('1'):
-                print("✅ Nueva grabación seleccionada")
-                # Esperar a que se suelte la tecla
-                while keyboard.is_pressed('1'):
-                    time.sleep(0.1)
-                return "nueva"
-                
-            elif keyboard.is_pressed('2'):
-                print("✅ Mostrar transcripción seleccionada")
-                # Esperar a que se suelte la tecla
-                while keyboard.is_pressed('2'):
-                    time.sleep(0.1)
-                return "mostrar"
-                
-            elif keyboard.is_pressed('3'):
-                print("✅ Configuración seleccionada")
-                # Esperar a que se suelte la tecla
-                while keyboard.is_pressed('3'):
-                    time.sleep(0.1)
-                return "config"
-                
-            elif keyboard.is_pressed('4'):
-                print("✅ Volver al menú principal")
-                # Esperar a que se suelte la tecla
-                while keyboard.is_pressed('4'):
-                    time.sleep(0.1)
-                return "menu_principal"
-                
-            elif keyboard.is_pressed('5') or keyboard.is_pressed('esc'):
-                print("✅ Salir seleccionado")
-                # Esperar a que se suelte la tecla
-                while keyboard.is_pressed('5') or keyboard.is_pressed('esc'):
-                    time.sleep(0.1)
-                return "salir"
-            
-            time.sleep(0.1)
+        key = self.wait_for_key('1', '2', '3', '4', '5', 'esc')
+        if key == '1':
+            print("✅ Nueva grabación seleccionada")
+            return "nueva"
+        elif key == '2':
+            print("✅ Mostrar transcripción seleccionada")
+            return "mostrar"
+        elif key == '3':
+            print("✅ Configuración seleccionada")
+            return "config"
+        elif key == '4':
+            print("✅ Volver al menú principal")
+            return "menu_principal"
+        print("✅ Salir seleccionado")
+        return "salir"
     
     def show_config_menu(self):
         """Mostrar menú de configuración"""
@@ -635,33 +1627,35 @@ class RealtimeTranscriber:
             print("⚙️  CONFIGURACIÓN")
             print("="*50)
             print(f"1️⃣  Modelo Whisper: {self.model_size}")
-            print(f"2️⃣  Calidad de audio: {self.audio_quality} ({self.RATE}Hz)")
+            print(f"2️⃣  Calidad de audio: {self.audio_quality} ({self.DEVICE_RATE}Hz)")
             print(f"3️⃣  Gestionar palabras clave ({len(self.keywords)} actuales)")
-            print("4️⃣  Volver al menú principal")
+            print(f"4️⃣  Subtítulos en vivo: {'ON' if self.live_captions else 'OFF'}")
+            print(f"5️⃣  Archivar audio WAV: {'ON' if self.archive_audio else 'OFF'}")
+            print(f"6️⃣  Recortar silencios (VAD): {'ON' if self.silence_detection else 'OFF'}")
+            print(f"7️⃣  Parada automática por silencio: {'ON' if self.auto_stop else 'OFF'}")
+            print(f"8️⃣  Grabación larga (segmentos en disco): {'ON' if self.long_recording else 'OFF'}")
+            print("9️⃣  Volver al menú principal")
             print("-" * 50)
-            print("Elige una opción (1-4)...")
+            print("Elige una opción (1-9)...")
             
-            while True:
-                if keyboard.is_pressed('1'):
-                    while keyboard.is_pressed('1'): time.sleep(0.1)
-                    self.change_model()
-                    break
-                elif keyboard.is_pressed('2'):
-                    while keyboard.is_pressed('2'): time.sleep(0.1)
-                    self.change_audio_quality()
-                    break
-                elif keyboard.is_pressed('3'):
-                    while keyboard.is_pressed('3'): time.sleep(0.1)
-                    self.manage_keywords()
-                    break
-                elif keyboard.is_pressed('4') or keyboard.is_pressed('esc'):
-                    while keyboard.is_pressed('4') or keyboard.is_pressed('esc'): time.sleep(0.1)
-                    return
-                time.sleep(0.1)
+            actions = {
+                '1': self.change_model,
+                '2': self.change_audio_quality,
+                '3': self.manage_keywords,
+                '4': self.toggle_live_captions,
+                '5': self.toggle_archive_audio,
+                '6': self.toggle_silence_detection,
+                '7': self.toggle_auto_stop,
+                '8': self.toggle_long_recording
+            }
+            key = self.wait_for_key(*actions, '9', 'esc')
+            if key in ('9', 'esc'):
+                return
+            actions[key]()
     
     def change_model(self):
         """Cambiar modelo de Whisper"""
-        models = ["tiny", "base", "small", "medium", "large-v1", "large-v2", "large-v3", "turbo"]
+        models = self.MODELS
         
         print("\n" + "="*50)
         print("🧠 SELECCIONAR MODELO WHISPER")
@@ -686,35 +1680,24 @@ class RealtimeTranscriber:
         print("-" * 50)
         print("Elige un modelo (1-9)...")
         
-        while True:
-            for i, model in enumerate(models, 1):
-                if keyboard.is_pressed(str(i)):
-                    while keyboard.is_pressed(str(i)): time.sleep(0.1)
-                    
-                    if model != self.model_size:
-                        old_model = self.model_size
-                        self.model_size = model
-                        
-                        # Si ya había un modelo cargado, necesitamos recargarlo
-                        if self.model is not None:
-                            print(f"🔄 Cambiando de {old_model} a {model}...")
-                            print("⚠️  Se recargará el modelo en la próxima transcripción")
-                            self.model = None  # Forzar recarga
-                        
-                        print(f"✅ Modelo cambiado a: {model}")
-                    else:
-                        print(f"ℹ️  Ya estás usando el modelo {model}")
-                    
-                    time.sleep(1.5)
-                    return
-            
-            if keyboard.is_pressed('9') or keyboard.is_pressed('esc'):
-                while keyboard.is_pressed('9') or keyboard.is_pressed('esc'): time.sleep(0.1)
-                print("❌ Cambio de modelo cancelado")
-                time.sleep(1)
-                return
-            
-            time.sleep(0.1)
+        key = self.wait_for_key(*(str(i) for i in range(1, len(models) + 1)), '9', 'esc')
+        if key in ('9', 'esc'):
+            print("❌ Cambio de modelo cancelado")
+            time.sleep(1)
+            return
+        
+        model = models[int(key) - 1]
+        if model != self.model_size:
+            print(f"🔄 Cambiando de {self.model_size} a {model}...")
+            if self.switch_model(model):
+                print("⚡ Modelo ya en memoria, cambio instantáneo")
+            else:
+                print("⏳ El nuevo modelo se carga en segundo plano")
+            print(f"✅ Modelo cambiado a: {model}")
+        else:
+            print(f"ℹ️  Ya estás usando el modelo {model}")
+        
+        time.sleep(1.5)
 
     def change_audio_quality(self):
         """Cambiar calidad de audio"""
@@ -724,8 +1707,45 @@ class RealtimeTranscriber:
         
         self.audio_quality = qualities[next_index]
         self.setup_audio_config()
+        if self.always_open_stream:
+            self._ensure_persistent_capture()  # Se reabre solo si cambia la tasa o el bloque
         
-        print(f"✅ Calidad cambiada a: {self.audio_quality} ({self.RATE}Hz)")
+        print(f"✅ Calidad cambiada a: {self.audio_quality} ({self.DEVICE_RATE}Hz)")
+        time.sleep(1)
+    
+    def toggle_live_captions(self):
+        """Activar/desactivar subtítulos en vivo durante la grabación"""
+        self.live_captions = not self.live_captions
+        estado = "activados" if self.live_captions else "desactivados"
+        print(f"✅ Subtítulos en vivo {estado}")
+        time.sleep(1)
+    
+    def toggle_archive_audio(self):
+        """Activar/desactivar el archivado del WAV de cada sesión"""
+        self.archive_audio = not self.archive_audio
+        estado = "activado" if self.archive_audio else "desactivado"
+        print(f"✅ Archivado de audio {estado}")
+        time.sleep(1)
+    
+    def toggle_silence_detection(self):
+        """Activar/desactivar el recorte de silencios antes de transcribir"""
+        self.silence_detection = not self.silence_detection
+        estado = "activado" if self.silence_detection else "desactivado"
+        print(f"✅ Recorte de silencios (VAD) {estado}")
+        time.sleep(1)
+    
+    def toggle_auto_stop(self):
+        """Activar/desactivar la parada automática al detectar fin de frase"""
+        self.auto_stop = not self.auto_stop
+        estado = "activada" if self.auto_stop else "desactivada"
+        print(f"✅ Parada automática por silencio {estado}")
+        time.sleep(1)
+    
+    def toggle_long_recording(self):
+        """Activar/desactivar la grabación larga con segmentos en disco"""
+        self.long_recording = not self.long_recording
+        estado = "activada" if self.long_recording else "desactivada"
+        print(f"✅ Grabación larga {estado} (segmentos de {self.segment_seconds // 60} min)")
         time.sleep(1)
     
     def manage_keywords(self):
@@ -737,11 +1757,7 @@ class RealtimeTranscriber:
             print(f"    ... y {len(self.keywords) - 10} más")
         
         print("\nPresiona ENTER para continuar...")
-        while True:
-            if keyboard.is_pressed('enter'):
-                while keyboard.is_pressed('enter'): time.sleep(0.1)
-                break
-            time.sleep(0.1)
+        self.wait_for_key('enter')
     
     def show_last_transcription(self, transcription, file_path):
         """Mostrar la última transcripción"""
@@ -759,25 +1775,122 @@ class RealtimeTranscriber:
         print("="*60)
         print("Presiona ENTER para volver al menú...")
         
-        # Esperar ENTER específicamente
-        key_pressed = False
-        while not key_pressed:
-            if keyboard.is_pressed('enter'):
-                # Esperar a que se suelte la tecla
-                while keyboard.is_pressed('enter'):
-                    time.sleep(0.1)
-                key_pressed = True
-            time.sleep(0.1)
+        self.wait_for_key('enter')
             
     def cleanup(self):
-        """Limpiar recursos"""
-        if self.stream:
-            self.stream.close()
+        """Limpiar los recursos del modo de transcripción al volver al menú
+        
+        El micrófono persistente, el proceso de captura, el pool de audio largo
+        y PyAudio siguen vivos para la siguiente vez: se liberan en shutdown().
+        """
+        # Esperar a que terminen de escribirse los WAV pendientes
+        for thread in self._archive_threads:
+            thread.join()
+        self._archive_threads = []
+        
+        with self._stream_lock:
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+        
+    def shutdown(self):
+        """Liberar todos los recursos del transcriptor al salir del programa"""
+        self.cleanup()
+        
+        if self._long_audio_pool is not None:
+            self._long_audio_pool.shutdown()
+            self._long_audio_pool = None
+        
+        if self._capture_process is not None:
+            self._capture_process.close()
+            self._capture_process = None
+        with self._stream_lock:
+            self._close_persistent_capture()
         self.audio.terminate()
 
 def main():
     import sys
     
+    # --traza: guardar una traza Chrome/Perfetto de las etapas de cada sesión
+    chrome_trace = "--traza" in sys.argv
+    if chrome_trace:
+        sys.argv.remove("--traza")
+    
+    # --metricas-puerto N / --metricas-archivo RUTA: exportar métricas en formato Prometheus
+    metrics_options = {}
+    for flag in ("--metricas-puerto", "--metricas-archivo"):
+        if flag in sys.argv:
+            i = sys.argv.index(flag)
+            if i + 1 >= len(sys.argv):
+                print(f"❌ Falta el valor de {flag}")
+                return
+            metrics_options[flag] = sys.argv[i + 1]
+            del sys.argv[i:i + 2]
+    
+    # --diagnostico: repetir las comprobaciones del sistema aunque estén en caché
+    diagnostics = "--diagnostico" in sys.argv
+    if diagnostics:
+        sys.argv.remove("--diagnostico")
+    
+    # --captura-proceso: leer el micrófono en un proceso aparte (anillo en memoria compartida)
+    capture_process = "--captura-proceso" in sys.argv
+    if capture_process:
+        sys.argv.remove("--captura-proceso")
+    
+    # --captura-callback: captura por callback de PortAudio con contadores de bloques perdidos
+    # --latencia-ms N: bloque del dispositivo en ms / --buffer-captura S: anillo en segundos
+    capture_callback = "--captura-callback" in sys.argv
+    if capture_callback:
+        sys.argv.remove("--captura-callback")
+    capture_options = {}
+    for flag in ("--latencia-ms", "--buffer-captura"):
+        if flag in sys.argv:
+            i = sys.argv.index(flag)
+            if i + 1 >= len(sys.argv):
+                print(f"❌ Falta el valor de {flag}")
+                return
+            capture_options[flag] = float(sys.argv[i + 1])
+            del sys.argv[i:i + 2]
+    
+    # --micro-abierto: mantener el micrófono abierto entre sesiones, con pre-roll
+    # --preroll-ms N: audio previo a la tecla que se incluye en cada sesión
+    always_open = "--micro-abierto" in sys.argv
+    if always_open:
+        sys.argv.remove("--micro-abierto")
+    preroll_ms = None
+    if "--preroll-ms" in sys.argv:
+        i = sys.argv.index("--preroll-ms")
+        if i + 1 >= len(sys.argv):
+            print("❌ Falta el valor de --preroll-ms")
+            return
+        preroll_ms = float(sys.argv[i + 1])
+        del sys.argv[i:i + 2]
+    
+    # --procesos-audio-largo N: decodificar los trozos del audio largo en N procesos
+    long_audio_workers = None
+    if "--procesos-audio-largo" in sys.argv:
+        i = sys.argv.index("--procesos-audio-largo")
+        if i + 1 >= len(sys.argv):
+            print("❌ Falta el valor de --procesos-audio-largo")
+            return
+        long_audio_workers = int(sys.argv[i + 1])
+        del sys.argv[i:i + 2]
+    
+    # --headless: sin teclado, órdenes por stdin y señales
+    # --puerto-control N: órdenes por un socket local (implica --headless)
+    headless = "--headless" in sys.argv
+    if headless:
+        sys.argv.remove("--headless")
+    control_port = None
+    if "--puerto-control" in sys.argv:
+        i = sys.argv.index("--puerto-control")
+        if i + 1 >= len(sys.argv):
+            print("❌ Falta el valor de --puerto-control")
+            return
+        control_port = int(sys.argv[i + 1])
+        del sys.argv[i:i + 2]
+        headless = True
+    
     # Argumentos opcionales
     if len(sys.argv) == 1:
         # Sin argumentos
@@ -799,52 +1912,89 @@ def main():
     
     print(f"Configuración: Modelo={model_size}, Idioma={language}")
     
-    # VERIFICACIÓN INICIAL DEL SISTEMA
-    print("\n🔧 Verificando dependencias del sistema...")
-    
-    # Verificar ffmpeg
-    import subprocess
-    try:
-        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
+    # VERIFICACIÓN INICIAL DEL SISTEMA (cacheada: solo se repite si algo cambia)
+    checks, cached = get_system_checks(force=diagnostics)
+    if cached:
+        print("\n🔧 Dependencias del sistema verificadas (sin cambios desde la última ejecución)")
+    else:
+        print("\n🔧 Verificando dependencias del sistema...")
+        if checks["ffmpeg"] == "ok":
             print("✅ FFmpeg encontrado y funcionando")
-        else:
+        elif checks["ffmpeg"] == "warning":
             print("⚠️  FFmpeg encontrado pero puede tener problemas")
-    except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
+        if checks["librosa"]:
+            print("✅ Librosa disponible")
+        if checks["write_error"] is None:
+            print("✅ Permisos de escritura OK")
+    
+    if checks["ffmpeg"] == "missing":
         print("❌ FFmpeg NO encontrado o no funciona")
         print("💡 Instala FFmpeg desde: https://ffmpeg.org/download.html")
         print("   Y asegúrate de que esté en tu PATH del sistema")
         
-        response = input("\n¿Quieres continuar de todos modos? (s/n): ")
+        # Sin teclado no hay a quién preguntar (stdin son las órdenes): se continúa
+        response = "s" if headless else input("\n¿Quieres continuar de todos modos? (s/n): ")
         if response.lower() not in ['s', 'sí', 'si', 'y', 'yes']:
             print("👋 Saliendo del programa...")
             return
     
-    # Verificar librosa
-    try:
-        import librosa
-        print("✅ Librosa disponible")
-    except ImportError:
-        print("⚠️  Librosa no encontrado, instalando...")
-        try:
-            subprocess.run([sys.executable, '-m', 'pip', 'install', 'librosa'], check=True)
-            print("✅ Librosa instalado correctamente")
-        except subprocess.CalledProcessError:
-            print("❌ Error instalando librosa")
+    if not checks["librosa"]:
+        # Solo hace falta para el diagnóstico al transcribir archivos
+        if diagnostics:
+            print("⚠️  Librosa no encontrado, instalando...")
+            import subprocess
+            try:
+                subprocess.run([sys.executable, '-m', 'pip', 'install', 'librosa'], check=True)
+                print("✅ Librosa instalado correctamente")
+                invalidate_system_checks()
+            except subprocess.CalledProcessError:
+                print("❌ Error instalando librosa")
+        else:
+            print("⚠️  Librosa no encontrado (usa --diagnostico para instalarlo)")
     
-    # Verificar permisos de escritura
-    import tempfile
-    try:
-        with tempfile.NamedTemporaryFile(delete=True) as tmp:
-            tmp.write(b"test")
-        print("✅ Permisos de escritura OK")
-    except Exception as e:
-        print(f"❌ Problemas con permisos de escritura: {e}")
+    if checks["write_error"] is not None:
+        print(f"❌ Problemas con permisos de escritura: {checks['write_error']}")
     
     print("🚀 Iniciando transcriptor...")
     
     transcriber = RealtimeTranscriber(model_size, language)
-    transcriber.run_continuous()
+    transcriber.chrome_trace = chrome_trace
+    transcriber.diagnostics = diagnostics
+    if capture_callback:
+        transcriber.capture_mode = "callback"
+    if "--latencia-ms" in capture_options:
+        transcriber.input_latency_ms = capture_options["--latencia-ms"]
+    if "--buffer-captura" in capture_options:
+        transcriber.capture_buffer_seconds = capture_options["--buffer-captura"]
+    if preroll_ms is not None:
+        transcriber.preroll_ms = preroll_ms
+    if long_audio_workers is not None:
+        transcriber.long_audio_workers = long_audio_workers
+    if capture_process:
+        transcriber.enable_capture_process()
+    elif always_open:
+        transcriber.enable_always_open_stream()
+    if metrics_options:
+        port = metrics_options.get("--metricas-puerto")
+        transcriber.start_metrics_exporter(
+            port=int(port) if port else None,
+            path=metrics_options.get("--metricas-archivo")
+        )
+    try:
+        if headless:
+            channel = ControlChannel()
+            channel.install_signal_handlers()
+            if control_port is not None:
+                port = channel.listen_socket(control_port)
+                print(f"🔌 Órdenes por socket en 127.0.0.1:{port} (python control.py {port} start)")
+            else:
+                channel.listen_stdin()
+            transcriber.run_headless(channel)
+        else:
+            transcriber.run_continuous()
+    finally:
+        transcriber.metrics.stop_exporters()
+        transcriber.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
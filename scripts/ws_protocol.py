@@ -0,0 +1,185 @@
+import base64
+import hashlib
+import json
+import os
+import socket
+import struct
+import threading
+
+# WebSocket mínimo (RFC 6455) sobre la biblioteca estándar: lo justo para el
+# servidor local y el cliente de carga, sin dependencias nuevas
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+MAX_MESSAGE_BYTES = 16 * 2**20  # Un trozo de audio nunca se acerca a esto
+
+
+class ProtocolError(Exception):
+    """Trama WebSocket mal formada o demasiado grande"""
+
+
+def accept_key(key):
+    """Valor de Sec-WebSocket-Accept para la clave del cliente"""
+    return base64.b64encode(hashlib.sha1((key + GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def _read_exact(rfile, n):
+    data = rfile.read(n)
+    if data is None or len(data) < n:
+        raise EOFError
+    return data
+
+
+def encode_frame(opcode, payload, mask=False):
+    """Trama completa (FIN) con la carga; los clientes deben enmascarar"""
+    header = bytearray([0x80 | opcode])
+    mask_bit = 0x80 if mask else 0
+    length = len(payload)
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 2**16:
+        header.append(mask_bit | 126)
+        header += struct.pack("!H", length)
+    else:
+        header.append(mask_bit | 127)
+        header += struct.pack("!Q", length)
+    if mask:
+        key = os.urandom(4)
+        header += key
+        payload = _apply_mask(payload, key)
+    return bytes(header) + payload
+
+
+def _apply_mask(payload, key):
+    # XOR con la clave repetida, vectorizado con enteros grandes en lugar de byte a byte
+    repeated = (key * (len(payload) // 4 + 1))[:len(payload)]
+    return (int.from_bytes(payload, "little") ^ int.from_bytes(repeated, "little")).to_bytes(len(payload), "little")
+
+
+def read_frame(rfile):
+    """(fin, opcode, carga) de la siguiente trama; EOFError si se cierra la conexión"""
+    first, second = _read_exact(rfile, 2)
+    fin = bool(first & 0x80)
+    opcode = first & 0x0F
+    masked = bool(second & 0x80)
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _read_exact(rfile, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _read_exact(rfile, 8))[0]
+    if length > MAX_MESSAGE_BYTES:
+        raise ProtocolError(f"Trama demasiado grande ({length} bytes)")
+    key = _read_exact(rfile, 4) if masked else None
+    payload = _read_exact(rfile, length) if length else b""
+    if key is not None:
+        payload = _apply_mask(payload, key)
+    return fin, opcode, payload
+
+
+class WebSocket:
+    """
+    Conexión WebSocket ya establecida sobre un par de archivos (lectura, escritura)
+    
+    receive() junta los mensajes fragmentados y contesta los ping por su cuenta.
+    Los envíos están protegidos por un cerrojo, así que se puede enviar desde
+    varios hilos (p. ej. resultados desde un hilo y pong desde el lector).
+    """
+    
+    def __init__(self, rfile, wfile, mask=False, sock=None):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.mask = mask
+        self.closed = False
+        self._sock = sock
+        self._send_lock = threading.Lock()
+    
+    def _send(self, opcode, payload):
+        with self._send_lock:
+            if self.closed and opcode != OP_CLOSE:
+                raise ConnectionError("WebSocket cerrado")
+            self.wfile.write(encode_frame(opcode, payload, self.mask))
+            self.wfile.flush()
+    
+    def send_text(self, text):
+        self._send(OP_TEXT, text.encode("utf-8"))
+    
+    def send_json(self, obj):
+        self.send_text(json.dumps(obj, ensure_ascii=False))
+    
+    def send_binary(self, data):
+        self._send(OP_BINARY, bytes(data))
+    
+    def close(self, code=1000):
+        if self.closed:
+            return
+        try:
+            self._send(OP_CLOSE, struct.pack("!H", code))
+        except OSError:
+            pass
+        self.closed = True
+        if self._sock is not None:
+            self._sock.close()
+    
+    def receive(self):
+        """(OP_TEXT u OP_BINARY, carga) del siguiente mensaje; (OP_CLOSE, b"") al cerrar"""
+        parts = []
+        message_opcode = None
+        while True:
+            try:
+                fin, opcode, payload = read_frame(self.rfile)
+            except (EOFError, OSError):
+                return OP_CLOSE, b""
+            
+            if opcode == OP_PING:
+                self._send(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                if not self.closed:
+                    self.close()
+                return OP_CLOSE, payload
+            
+            if opcode != OP_CONTINUATION:
+                message_opcode = opcode
+            parts.append(payload)
+            if sum(len(p) for p in parts) > MAX_MESSAGE_BYTES:
+                raise ProtocolError("Mensaje demasiado grande")
+            if fin:
+                return message_opcode, b"".join(parts)
+
+
+def connect(host, port, path="/", timeout=None):
+    """Abrir una conexión WebSocket de cliente (ws://host:port/path)"""
+    sock = socket.create_connection((host, port), timeout=timeout)
+    key = base64.b64encode(os.urandom(16)).decode("ascii")
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {host}:{port}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\n"
+        "Sec-WebSocket-Version: 13\r\n\r\n"
+    )
+    sock.sendall(request.encode("ascii"))
+    rfile = sock.makefile("rb")
+    status = rfile.readline().decode("latin-1")
+    headers = {}
+    while True:
+        line = rfile.readline().decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    
+    if " 101 " not in status or headers.get("sec-websocket-accept") != accept_key(key):
+        sock.close()
+        raise ConnectionError(f"El servidor rechazó el WebSocket: {status.strip()}")
+    return WebSocket(rfile, sock.makefile("wb"), mask=True, sock=sock)
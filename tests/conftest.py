@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos viven sueltos en scripts/ y se importan por su nombre
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
@@ -0,0 +1,94 @@
+import numpy as np
+
+from audio_buffer import AudioBuffer, AudioRing
+from capture_process import SharedAudioRing
+
+
+def _samples(start, end):
+    return np.arange(start, end, dtype=np.int16)
+
+
+def test_audio_buffer_grows_and_keeps_order():
+    buffer = AudioBuffer(sample_rate=10, initial_seconds=1)
+    for start in range(0, 95, 19):
+        buffer.append(_samples(start, start + 19))
+    assert len(buffer) == 95
+    assert buffer.capacity >= 95
+    np.testing.assert_array_equal(buffer.view(), _samples(0, 95))
+    np.testing.assert_allclose(buffer.to_float32(10, 12), np.array([10, 11]) / 32768.0)
+
+
+def test_ring_wraps_around_without_losing_samples():
+    ring = AudioRing(10)
+    ring.write(_samples(0, 7))
+    samples, position, lost = ring.read_from(0)
+    np.testing.assert_array_equal(samples, _samples(0, 7))
+    assert (position, lost, ring.fill()) == (7, 0, 0)
+    
+    ring.write(_samples(7, 13))  # Cruza el final del anillo
+    assert ring.fill() == 6
+    samples, position, lost = ring.read_from(position)
+    np.testing.assert_array_equal(samples, _samples(7, 13))
+    assert (position, lost) == (13, 0)
+
+
+def test_ring_counts_overwritten_samples_as_lost():
+    ring = AudioRing(10)
+    for start in range(0, 25, 5):
+        ring.write(_samples(start, start + 5))
+    samples, position, lost = ring.read_from(0)
+    np.testing.assert_array_equal(samples, _samples(15, 25))
+    assert (position, lost) == (25, 15)
+
+
+def test_ring_write_larger_than_capacity_keeps_the_end():
+    ring = AudioRing(10)
+    ring.write(_samples(0, 3))
+    ring.write(_samples(3, 26))
+    samples, position, lost = ring.read_from(0)
+    np.testing.assert_array_equal(samples, _samples(16, 26))
+    assert (position, lost) == (26, 16)
+
+
+class _RacingHeader(np.ndarray):
+    """Cabecera cuya posición de escritura avanza `advance` muestras tras la primera lectura"""
+    
+    advance = 0
+    
+    def __getitem__(self, index):
+        value = super().__getitem__(index)
+        if index == 0 and self.advance:
+            advance, self.advance = self.advance, 0
+            self[0] = value + advance
+        return value
+
+
+def test_ring_drops_samples_overwritten_during_the_copy():
+    header = np.zeros(AudioRing.HEADER_SLOTS, dtype=np.int64).view(_RacingHeader)
+    ring = AudioRing(10, header=header)
+    ring.write(_samples(0, 10))
+    header.advance = 3  # El escritor publica 3 muestras más mientras el lector copia
+    samples, position, lost = ring.read_from(0)
+    np.testing.assert_array_equal(samples, _samples(3, 10))
+    assert (position, lost) == (10, 3)
+
+
+def test_shared_ring_is_visible_from_another_handle():
+    owner = SharedAudioRing(8)
+    reader = SharedAudioRing(8, name=owner.name)
+    try:
+        owner.write(_samples(0, 6))
+        samples, position, lost = reader.read_from(0)
+        np.testing.assert_array_equal(samples, _samples(0, 6))
+        
+        owner.write(_samples(6, 20))  # Da la vuelta y pisa lo no leído
+        samples, position, lost = reader.read_from(position)
+        np.testing.assert_array_equal(samples, _samples(12, 20))
+        assert (position, lost) == (20, 6)
+        assert owner.fill() == 0  # La posición de lectura también es compartida
+        
+        reader.set_failed()
+        assert owner.failed()
+    finally:
+        reader.close()
+        owner.close()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from audio_dsp import PolyphaseResampler
+
+
+def _signal(n, rate):
+    t = np.arange(n) / rate
+    rng = np.random.default_rng(0)
+    return (0.5 * np.sin(2 * np.pi * 440 * t) + 0.1 * rng.standard_normal(n)).astype(np.float32)
+
+
+@pytest.mark.parametrize("in_rate,out_rate", [(48000, 16000), (44100, 16000), (8000, 16000)])
+def test_chunked_output_matches_one_shot(in_rate, out_rate):
+    samples = _signal(in_rate // 2, in_rate)
+    expected = PolyphaseResampler(in_rate, out_rate).process(samples)
+    
+    resampler = PolyphaseResampler(in_rate, out_rate)
+    rng = np.random.default_rng(1)
+    pieces, pos = [], 0
+    while pos < len(samples):
+        size = int(rng.integers(1, 700))  # Incluye bloques más cortos que el filtro
+        pieces.append(resampler.process(samples[pos:pos + size]))
+        pos += size
+    chunked = np.concatenate(pieces)
+    
+    assert len(chunked) == len(expected)
+    np.testing.assert_allclose(chunked, expected, atol=1e-5)
+
+
+def test_output_length_follows_the_rate_ratio():
+    resampler = PolyphaseResampler(48000, 16000)
+    out = resampler.process(np.zeros(48000, dtype=np.float32))
+    # El retardo del filtro retiene unas pocas muestras hasta que llega más audio
+    assert 16000 - resampler.taps <= len(out) <= 16000
+
+
+def test_same_rate_is_passthrough():
+    samples = _signal(1000, 16000)
+    np.testing.assert_array_equal(PolyphaseResampler(16000, 16000).process(samples), samples)
+
+
+def test_reset_forgets_history():
+    samples = _signal(4800, 48000)
+    resampler = PolyphaseResampler(48000, 16000)
+    first = resampler.process(samples)
+    resampler.reset()
+    np.testing.assert_array_equal(resampler.process(samples), first)
+
+
+def test_process_int16_accepts_pcm_bytes():
+    samples = (_signal(4800, 48000) * 20000).astype(np.int16)
+    from_bytes = PolyphaseResampler(48000, 16000).process_int16(samples.tobytes())
+    from_array = PolyphaseResampler(48000, 16000).process_int16(samples)
+    assert from_bytes.dtype == np.int16
+    np.testing.assert_array_equal(from_bytes, from_array)
@@ -0,0 +1,61 @@
+import numpy as np
+
+from callback_capture import _INPUT_OVERFLOW, _INPUT_UNDERFLOW, CallbackCapture
+
+RATE = 1000
+BLOCK = 100
+
+
+def _block(start):
+    return np.arange(start, start + BLOCK, dtype=np.int16).tobytes()
+
+
+def _capture(buffer_seconds=1):
+    return CallbackCapture(audio=None, rate=RATE, frames_per_buffer=BLOCK, buffer_seconds=buffer_seconds)
+
+
+def test_reader_within_the_ring_loses_nothing():
+    capture = _capture()
+    for i in range(25):  # 2,5 vueltas al anillo, leyendo cada 4 bloques
+        capture._callback(_block(i * BLOCK), BLOCK, {}, 0)
+        if i % 4 == 3:
+            capture.read(timeout=0)
+    capture.read(timeout=0)
+    stats = capture.session_stats()
+    assert (stats["callbacks"], stats["lost_samples"]) == (25, 0)
+
+
+def test_slow_reader_counts_overwritten_samples():
+    capture = _capture()
+    for i in range(15):
+        capture._callback(_block(i * BLOCK), BLOCK, {}, 0)
+    samples = capture.read(timeout=0)
+    np.testing.assert_array_equal(samples, np.arange(500, 1500, dtype=np.int16))
+    assert capture.session_stats()["lost_samples"] == 500
+    assert capture.session_stats()["lost_seconds"] == 0.5
+
+
+def test_status_flags_are_counted():
+    capture = _capture()
+    capture._callback(_block(0), BLOCK, {}, _INPUT_OVERFLOW)
+    capture._callback(_block(0), BLOCK, {}, _INPUT_OVERFLOW | _INPUT_UNDERFLOW)
+    stats = capture.session_stats()
+    assert (stats["device_overflows"], stats["device_underflows"]) == (2, 1)
+
+
+def test_begin_session_preroll_and_counters():
+    capture = _capture()
+    for i in range(5):
+        capture._callback(_block(i * BLOCK), BLOCK, {}, _INPUT_OVERFLOW)
+    capture.read(timeout=0)
+    capture._callback(_block(500), BLOCK, {}, 0)
+    
+    # El pre-roll no vuelve a entregar lo que ya leyó la sesión anterior
+    assert capture.begin_session(preroll=300) == BLOCK
+    assert capture.session_stats()["device_overflows"] == 0
+    np.testing.assert_array_equal(capture.read(timeout=0), np.arange(500, 600, dtype=np.int16))
+    
+    for i in range(6, 20):
+        capture._callback(_block(i * BLOCK), BLOCK, {}, 0)
+    # Ni más allá de lo que aún guarda el anillo
+    assert capture.begin_session(preroll=5 * RATE) == RATE
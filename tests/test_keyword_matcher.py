@@ -0,0 +1,42 @@
+from keyword_matcher import KeywordMatcher, fold_text
+
+
+def test_fold_text_strips_accents_and_keeps_positions():
+    folded, index_map = fold_text("Reunión ÑANDÚ")
+    assert folded == "reunion ñandu"
+    assert len(index_map) == len(folded)
+    assert index_map[5] == 5  # la "o" sale de la "ó" original
+
+
+def test_matches_ignore_case_and_accents():
+    matcher = KeywordMatcher(["reunion", "PRESUPUESTO"])
+    text = "La Reunión trató el presupuesto."
+    matches = matcher.find_all(text)
+    assert [(kw, text[start:end]) for kw, start, end in matches] == [
+        ("reunion", "Reunión"),
+        ("PRESUPUESTO", "presupuesto"),
+    ]
+
+
+def test_variants_of_the_same_keyword_count_once():
+    matcher = KeywordMatcher(["reunión", "Reunion"])
+    assert len(matcher.find_all("reunion")) == 1
+
+
+def test_overlapping_matches_are_all_reported():
+    matcher = KeywordMatcher(["he", "she", "hers", "his"])
+    found = [(kw, start, end) for kw, start, end in matcher.find_all("ushers")]
+    assert found == [("she", 1, 4), ("hers", 2, 6), ("he", 2, 4)]
+
+
+def test_whole_words_skips_matches_inside_words():
+    matcher = KeywordMatcher(["sol"], whole_words=True)
+    assert matcher.find_all("soldado") == []
+    assert matcher.find_all("hace sol.") == [("sol", 5, 8)]
+
+
+def test_extract_returns_sentence_context():
+    matcher = KeywordMatcher(["plazo"])
+    found = matcher.extract("Hola a todos. El plazo termina el lunes! Gracias.")
+    assert found == [{"keyword": "plazo", "context": "El plazo termina el lunes",
+                      "position": 17, "end": 22}]
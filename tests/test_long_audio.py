@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from long_audio import iter_stream_chunks, merge_chunk_results, plan_chunks
+
+RATE = 1000  # Tasa baja: los tests trabajan con segundos sin arrays enormes
+
+
+def _audio_with_gaps(seconds, gaps):
+    """Ruido con silencios en los tramos `gaps` ((inicio, fin) en segundos)"""
+    audio = np.random.default_rng(0).uniform(-0.5, 0.5, int(seconds * RATE)).astype(np.float32)
+    for start, end in gaps:
+        audio[int(start * RATE):int(end * RATE)] = 0.0
+    return audio
+
+
+GAPS = [(9.8, 10.2), (19.8, 20.4), (29.9, 30.3)]
+
+
+def _in_gap(sample):
+    return any(start * RATE <= sample <= end * RATE for start, end in GAPS)
+
+
+def _read(audio):
+    return lambda start, end: audio[start:end]
+
+
+def test_plan_chunks_cuts_in_silence_and_covers_everything():
+    audio = _audio_with_gaps(40, GAPS)
+    chunks = plan_chunks(len(audio), RATE, _read(audio), chunk_seconds=10, search_seconds=2,
+                         overlap_seconds=0.5)
+    
+    assert chunks[0][2] == 0 and chunks[-1][3] == len(audio)
+    for (_, _, _, own_end), (_, _, next_start, _) in zip(chunks, chunks[1:]):
+        assert own_end == next_start  # Tramos propios contiguos, sin huecos ni duplicados
+        assert _in_gap(own_end)
+    for decode_start, decode_end, own_start, own_end in chunks:
+        assert decode_start == max(0, own_start - 500)
+        assert decode_end == min(len(audio), own_end + 500)
+
+
+def test_short_audio_is_a_single_chunk():
+    audio = _audio_with_gaps(5, [])
+    assert plan_chunks(len(audio), RATE, _read(audio), chunk_seconds=10) == [(0, 5000, 0, 5000)]
+
+
+@pytest.mark.parametrize("block_size", [1, 333, 4096, 100000])
+def test_stream_chunks_match_plan_chunks(block_size):
+    audio = _audio_with_gaps(40, GAPS)
+    planned = plan_chunks(len(audio), RATE, _read(audio), chunk_seconds=10, search_seconds=2,
+                          overlap_seconds=0.5)
+    
+    blocks = (audio[i:i + block_size] for i in range(0, len(audio), block_size))
+    streamed = list(iter_stream_chunks(blocks, RATE, chunk_seconds=10, search_seconds=2,
+                                       overlap_seconds=0.5))
+    
+    assert [chunk for _, chunk in streamed] == planned
+    for samples, (decode_start, decode_end, _, _) in streamed:
+        np.testing.assert_array_equal(samples, audio[decode_start:decode_end])
+
+
+def test_stream_chunks_of_empty_input():
+    assert list(iter_stream_chunks(iter([]), RATE)) == []
+
+
+def test_stream_cut_stays_inside_the_audio_already_read():
+    # Sin silencios y con bloques de una muestra: el corte no puede usar audio aún no leído
+    audio = _audio_with_gaps(25, [])
+    streamed = list(iter_stream_chunks((audio[i:i + 1] for i in range(len(audio))), RATE,
+                                       chunk_seconds=10, search_seconds=2, overlap_seconds=0.5))
+    for samples, (decode_start, decode_end, own_start, own_end) in streamed:
+        assert len(samples) == decode_end - decode_start
+        assert own_end - own_start <= 12 * RATE
+
+
+def _segment(start, end, text, **extra):
+    return dict({"start": start, "end": end, "text": text}, **extra)
+
+
+def test_merge_drops_overlap_segments_and_dedupes_the_seam():
+    # Trozo 1: propio 0-10 s, decodificado 0-11 s; trozo 2: propio 10-20 s, decodificado 9-20 s
+    chunks = [(0, 11 * RATE, 0, 10 * RATE), (9 * RATE, 20 * RATE, 10 * RATE, 20 * RATE)]
+    results = [
+        {"language": "es", "segments": [
+            _segment(0.0, 4.0, " Uno."),
+            _segment(8.0, 9.6, " el plazo termina"),
+            _segment(10.2, 10.9, " hoy"),  # Centro en el trozo 2: lo aporta el vecino
+        ]},
+        {"language": "es", "segments": [
+            _segment(0.0, 0.6, " termina"),  # Centro en el trozo 1: se descarta
+            _segment(0.6, 2.0, " plazo termina hoy"),  # Repite el final del trozo 1
+            _segment(3.0, 6.0, " Adiós.", words=[{"word": " Adiós.", "start": 3.0, "end": 6.0}]),
+        ]},
+    ]
+    merged = merge_chunk_results(results, chunks, RATE)
+    
+    assert [(s["start"], s["end"], s["text"]) for s in merged["segments"]] == [
+        (0.0, 4.0, " Uno."),
+        (8.0, 9.6, " el plazo termina"),
+        (9.6, 11.0, " hoy"),
+        (12.0, 15.0, " Adiós."),
+    ]
+    assert merged["text"] == " Uno. el plazo termina hoy Adiós."
+    assert merged["segments"][-1]["words"] == [{"word": " Adiós.", "start": 12.0, "end": 15.0}]
+    assert [s["id"] for s in merged["segments"]] == [0, 1, 2, 3]
+    assert merged["language"] == "es"
+
+
+def test_merge_skips_a_segment_that_only_repeats_the_seam():
+    chunks = [(0, 11 * RATE, 0, 10 * RATE), (9 * RATE, 20 * RATE, 10 * RATE, 20 * RATE)]
+    results = [
+        {"segments": [_segment(8.0, 9.9, " buenas tardes")]},
+        {"segments": [_segment(1.2, 2.0, " tardes"), _segment(2.5, 4.0, " a todos")]},
+    ]
+    merged = merge_chunk_results(results, chunks, RATE)
+    assert merged["text"] == " buenas tardes a todos"
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from pipeline import SessionPipeline
+
+
+class _GatedStage:
+    """Etapa que se queda en la primera sesión hasta que se abre la puerta"""
+    
+    def __init__(self):
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.seen = []
+    
+    def __call__(self, item):
+        self.started.set()
+        self.gate.wait(5)
+        self.seen.append(item)
+        return item
+
+
+def _gated_pipeline(backpressure, on_drop=None):
+    """Pipeline con la etapa ocupada en la sesión 1 y la sesión 2 llenando la cola"""
+    stage = _GatedStage()
+    done = []
+    pipeline = SessionPipeline([("lenta", stage), ("fin", done.append)], max_pending=1,
+                               backpressure=backpressure, on_drop=on_drop)
+    pipeline.submit(1)
+    assert stage.started.wait(5)
+    pipeline.submit(2)
+    assert pipeline.is_full()
+    return pipeline, stage, done
+
+
+def test_stages_keep_submission_order():
+    results = []
+    pipeline = SessionPipeline([("doble", lambda x: x * 2), ("guardar", results.append)], max_pending=4)
+    for i in range(10):
+        pipeline.submit(i)
+    assert pipeline.wait_idle(5)
+    pipeline.close()
+    assert results == [i * 2 for i in range(10)]
+
+
+def test_failed_item_skips_later_stages():
+    errors, results = [], []
+    
+    def stage(x):
+        if x == 1:
+            raise RuntimeError("fallo")
+        return x
+    
+    pipeline = SessionPipeline([("etapa", stage), ("guardar", results.append)],
+                               on_error=lambda name, item, e: errors.append((name, item, str(e))))
+    for i in range(3):
+        pipeline.submit(i)
+    assert pipeline.wait_idle(5)
+    pipeline.close()
+    assert results == [0, 2]
+    assert errors == [("etapa", 1, "fallo")]
+    assert pipeline.pending() == 0
+
+
+def test_block_waits_for_room_and_loses_nothing():
+    pipeline, stage, done = _gated_pipeline("block")
+    submitter = threading.Thread(target=pipeline.submit, args=(3,))
+    submitter.start()
+    time.sleep(0.1)
+    assert submitter.is_alive()  # La tercera sesión espera hueco
+    
+    stage.gate.set()
+    submitter.join(5)
+    assert not submitter.is_alive()
+    assert pipeline.wait_idle(5)
+    pipeline.close()
+    assert done == [1, 2, 3]
+    assert pipeline.dropped == 0
+
+
+def test_drop_oldest_discards_the_oldest_pending_session():
+    dropped = []
+    pipeline, stage, done = _gated_pipeline("drop_oldest", on_drop=dropped.append)
+    pipeline.submit(3)  # No espera: desplaza a la 2, que aún no había empezado
+    assert dropped == [2]
+    assert pipeline.dropped == 1
+    assert pipeline.pending() == 2
+    
+    stage.gate.set()
+    assert pipeline.wait_idle(5)
+    pipeline.close()
+    assert done == [1, 3]
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        SessionPipeline([("etapa", lambda x: x)], backpressure="otra")
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+from result_cache import EVICT_TO, ResultCache
+
+ENTRY = {"text": "x" * 280}  # ~300 bytes en disco
+
+
+def _cache(tmp_path, max_bytes):
+    return ResultCache(str(tmp_path / "cache"), max_size_mb=max_bytes / 2**20)
+
+
+def _put_aged(cache, key, age):
+    """Guardar una entrada y fecharla `age` segundos en el pasado (orden de uso determinista)"""
+    cache.put(key, ENTRY)
+    if os.path.exists(cache._path(key)):
+        stamp = 1_000_000 - age
+        os.utime(cache._path(key), (stamp, stamp))
+
+
+def _leftover_files(cache):
+    return [name for _, _, files in os.walk(cache.directory) for name in files]
+
+
+def test_roundtrip_and_numpy_values(tmp_path):
+    cache = _cache(tmp_path, 10_000)
+    cache.put("ab" * 32, {"text": "hola", "no_speech_prob": np.float32(0.25), "tokens": np.arange(3)})
+    assert cache.get("ab" * 32) == {"text": "hola", "no_speech_prob": 0.25, "tokens": [0, 1, 2]}
+    assert cache.get("cd" * 32) is None
+
+
+def test_key_depends_on_content_and_options_not_on_path(tmp_path):
+    first, second = tmp_path / "a.wav", tmp_path / "b.wav"
+    first.write_bytes(b"audio")
+    second.write_bytes(b"audio")
+    cache = _cache(tmp_path, 10_000)
+    key = cache.key_for_file(str(first), "base", "es", {"fp16": False})
+    assert cache.key_for_file(str(second), "base", "es", {"fp16": False}) == key
+    assert cache.key_for_file(str(first), "base", "es", {"fp16": True}) != key
+    assert cache.key_for_file(str(first), "small", "es", {"fp16": False}) != key
+
+
+def test_eviction_removes_least_recently_used_down_to_low_water(tmp_path):
+    cache = _cache(tmp_path, 1000)
+    for i, key in enumerate(["aa" * 32, "bb" * 32, "cc" * 32]):
+        _put_aged(cache, key, age=100 - i)
+    assert cache.get("aa" * 32) is not None  # Usar la más antigua la hace la más reciente
+    
+    _put_aged(cache, "dd" * 32, age=0)  # Se pasa del máximo: desaloja hasta EVICT_TO
+    
+    assert cache.get("bb" * 32) is None
+    assert cache.get("aa" * 32) is not None and cache.get("dd" * 32) is not None
+    assert cache.size_bytes() <= 1000 * EVICT_TO
+    assert cache._size == cache.size_bytes()
+
+
+def test_overwriting_an_entry_does_not_double_count(tmp_path):
+    cache = _cache(tmp_path, 10_000)
+    cache.put("aa" * 32, ENTRY)
+    cache.put("aa" * 32, ENTRY)
+    assert cache._size == cache.size_bytes()
+
+
+def test_untracked_writes_count_once_reported(tmp_path):
+    writer = _cache(tmp_path, 1000)  # Como un trabajador del modo lote
+    owner = _cache(tmp_path, 1000)
+    owner.put("aa" * 32, ENTRY)
+    for key in ["bb" * 32, "cc" * 32, "dd" * 32]:
+        writer.put(key, ENTRY, track=False)
+        assert writer._size is None
+        owner.track(key)
+    assert owner.size_bytes() <= 1000
+    assert owner._size == owner.size_bytes()
+
+
+def test_failed_write_keeps_previous_entry_and_leaves_no_temp_file(tmp_path):
+    cache = _cache(tmp_path, 10_000)
+    cache.put("aa" * 32, {"text": "antes"})
+    with pytest.raises(TypeError):
+        cache.put("aa" * 32, {"text": object()})
+    assert cache.get("aa" * 32) == {"text": "antes"}
+    assert not [name for name in _leftover_files(cache) if name.endswith(".tmp")]
+
+
+def test_corrupt_entry_reads_as_missing(tmp_path):
+    cache = _cache(tmp_path, 10_000)
+    cache.put("aa" * 32, ENTRY)
+    with open(cache._path("aa" * 32), "w", encoding="utf-8") as f:
+        f.write('{"text": ')
+    assert cache.get("aa" * 32) is None
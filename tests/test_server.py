@@ -0,0 +1,126 @@
+import http.client
+import io
+import json
+import threading
+from http.server import ThreadingHTTPServer
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import server
+
+
+class _FakeModel:
+    """Modelo mínimo: un único segmento que cubre todo el audio"""
+    
+    def transcribe(self, audio, **kwargs):
+        seconds = len(audio) / server.WHISPER_RATE
+        return {"text": " hola", "segments": [{"start": 0.0, "end": seconds, "text": " hola"}],
+                "language": kwargs.get("language")}
+
+
+class _FakeSocket:
+    def __init__(self):
+        self.sent = []
+    
+    def send_json(self, message):
+        self.sent.append(message)
+
+
+def _service():
+    service = server.TranscriptionService(language="es")
+    service.model_registry.load = lambda size, device=None: (_FakeModel(), False)
+    service.start()
+    return service
+
+
+def test_stream_session_transcribes_utterance():
+    service = _service()
+    try:
+        ws = _FakeSocket()
+        session = server.StreamSession(service, ws, endpoint_silence_sec=0.2, label="prueba")
+        
+        t = np.arange(server.WHISPER_RATE) / server.WHISPER_RATE
+        voice = (0.3 * 32767 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+        silence = np.zeros(server.WHISPER_RATE // 2, dtype=np.int16)
+        session.feed(voice)
+        session.feed(silence)
+        session.finish()
+    finally:
+        service.close()
+    
+    assert [m["type"] for m in ws.sent] == ["utterance"]
+    assert ws.sent[0]["text"] == "hola"
+    assert ws.sent[0]["utterance"] == 1
+
+
+@pytest.fixture
+def http_server():
+    service = _service()
+    args = SimpleNamespace(fin_frase=0.6, max_enunciado=30.0)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), server.make_handler(service, args))
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd.server_address[1]
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        service.close()
+
+
+def _request(port, method, path, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    try:
+        if body is None:
+            conn.putrequest(method, path)
+            for name, value in (headers or {}).items():
+                conn.putheader(name, value)
+            conn.endheaders()
+        else:
+            conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b"{}")
+    finally:
+        conn.close()
+
+
+def test_stream_rejects_bad_rate_before_upgrading(http_server):
+    headers = {"Upgrade": "websocket", "Connection": "Upgrade", "Sec-WebSocket-Key": "dGhlIHNhbXBsZSBub25jZQ=="}
+    for rate in ("abc", "0"):
+        status, body = _request(http_server, "GET", f"/stream?rate={rate}", headers=headers)
+        assert status == 400
+        assert "rate" in body["error"]
+
+
+def test_post_rejects_oversized_body_without_reading_it(http_server):
+    headers = {"Content-Length": str(server.MAX_BODY_BYTES + 1)}
+    status, body = _request(http_server, "POST", "/transcribe", headers=headers)
+    assert status == 413
+
+
+def test_post_rejects_bad_pcm_rate(http_server):
+    status, body = _request(http_server, "POST", "/transcribe?format=pcm16&rate=-8000", body=b"\0\0" * 100)
+    assert status == 400
+
+
+def test_post_transcribes_pcm(http_server):
+    t = np.arange(server.WHISPER_RATE) / server.WHISPER_RATE
+    voice = (0.3 * 32767 * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    status, body = _request(http_server, "POST", "/transcribe?format=pcm16", body=voice.tobytes())
+    assert status == 200
+    assert body["text"] == "hola"
+
+
+class _DeadPipe(io.BytesIO):
+    def write(self, data):
+        raise BrokenPipeError(32, "Broken pipe")
+
+
+def test_decoder_feed_reports_dead_ffmpeg_as_value_error():
+    decoder = server.FfmpegStreamDecoder.__new__(server.FfmpegStreamDecoder)
+    decoder._proc = SimpleNamespace(stdin=_DeadPipe())
+    with pytest.raises(ValueError, match="ffmpeg"):
+        decoder.feed(b"webm")